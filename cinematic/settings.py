@@ -173,4 +173,71 @@ SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 SESSION_COOKIE_AGE = 3600  # 1 час в секундах
 SESSION_COOKIE_SECURE = False  # True для HTTPS в продакшене
 SESSION_COOKIE_HTTPONLY = True
-SESSION_SAVE_EVERY_REQUEST = True  # Важно: сохранять сессию при каждом запросе
\ No newline at end of file
+SESSION_SAVE_EVERY_REQUEST = True  # Важно: сохранять сессию при каждом запросе
+# Кэш схем залов: алиас из CACHES для общего кэша между процессами
+# (None - схемы в памяти процесса, версии для инвалидации в кэше 'default')
+SEAT_LAYOUT_CACHE = None
+
+# Временные брони мест при оформлении покупки
+SEAT_HOLD_TTL = 10 * 60  # секунды
+SEAT_HOLD_MAX_SEATS = 10  # мест на пользователя в одном сеансе
+SEAT_HOLD_SWEEP_BATCH = 500  # истекших броней за одну очистку
+SEAT_HOLD_CACHE = 'default'  # алиас из CACHES для общего хранилища (None - память процесса, для тестов)
+
+# Кэш главной страницы для анонимных посетителей
+HOME_PAGE_CACHE = 'default'  # алиас из CACHES
+HOME_PAGE_CACHE_TTL = 60  # секунды (0 - кэш отключен)
+
+# Агрегаты продаж по дням (DailySalesRollup) для отчетов
+SALES_ROLLUP_ENABLED = True
+
+# Фоновые задания отчетов админки
+REPORT_JOB_WORKERS = 2  # потоков в процессе (0 - отчет строится в запросе)
+REPORT_JOB_CACHE_TTL = 5 * 60  # секунды: готовый отчет отдается повторным запросам
+REPORT_JOB_TIMEOUT = 10 * 60  # секунды: после этого незавершенное задание считается потерянным
+
+# Готовые PDF и QR-коды билетов (каталог в MEDIA_ROOT)
+TICKET_ARTIFACTS_DIR = 'ticket_artifacts'
+TICKET_RENDER_WORKERS = 2  # процессов для пакетной отрисовки билетов (0 - в текущем процессе)
+
+# Экспорт логов операций в PDF
+LOG_EXPORT_PDF_MAX_ROWS = 20000  # больше записей - только в CSV/JSON
+LOG_EXPORT_PDF_CHUNK_ROWS = 200  # строк в одной таблице PDF
+LOG_EXPORT_PDF_PROGRESS_CHUNKS = 10  # ход экспорта в журнал каждые N таблиц (0 - только итог)
+
+# Журнал операций: запись пачками в фоновом потоке
+OPERATION_LOG_ASYNC = True  # False - запись сразу в запросе
+OPERATION_LOG_BATCH_SIZE = 100  # записей в одном bulk_create
+OPERATION_LOG_FLUSH_INTERVAL = 2  # секунды: максимальная задержка записи
+OPERATION_LOG_QUEUE_SIZE = 10000  # при переполнении очереди запись идет сразу
+OPERATION_LOG_SPOOL_DIR = os.path.join(BASE_DIR, 'logs', 'operation_log')  # записи при недоступной БД
+OPERATION_LOG_COMPACT = True  # описания и User-Agent хранятся в справочниках (LogTemplate, UserAgent)
+
+# Тесты: журнал операций и запросы бота выполняются в транзакции теста
+TEST_RUNNER = 'cinematic.test_runner.CinemaTestRunner'
+
+# Секционирование и хранение журнала операций (команда partition_operation_logs)
+OPERATION_LOG_PARTITIONS_AHEAD = 2  # месяцев: секции создаются заранее
+OPERATION_LOG_RETENTION_MONTHS = 12  # полных месяцев хранится в БД
+OPERATION_LOG_ARCHIVE_DIR = os.path.join(BASE_DIR, 'logs', 'archive')  # архивы старых месяцев (.jsonl.gz)
+
+# Уведомления Telegram: очередь в БД, отправляет процесс бота (run_bot)
+TELEGRAM_NOTIFICATION_BATCH_SIZE = 50  # уведомлений за один проход
+TELEGRAM_NOTIFICATION_POLL_INTERVAL = 2  # секунды между проверками пустой очереди
+TELEGRAM_NOTIFICATION_MAX_ATTEMPTS = 5  # попыток до отказа (задержка 1, 2, 4, ... минут)
+TELEGRAM_NOTIFICATION_CLAIM_TIMEOUT = 5 * 60  # секунды: зависшие отправки возвращаются в очередь
+TELEGRAM_REMINDER_WINDOWS = [24 * 60, 60]  # минуты до начала сеанса: напоминания в Telegram
+TELEGRAM_REMINDER_INTERVAL = 60  # секунды между проверками напоминаний
+TELEGRAM_REMINDER_CATCHUP = 15 * 60  # секунды: после запуска бота проверяются пропущенные напоминания
+
+# Исходящие сообщения бота (OutboundSender): лимиты Telegram и повторы
+TELEGRAM_SEND_RATE = 25  # сообщений в секунду на бота (лимит Telegram - 30)
+TELEGRAM_SEND_CHAT_RATE = 1  # сообщений в секунду в один чат
+TELEGRAM_SEND_CHAT_BURST = 3  # сообщений подряд в один чат без ожидания
+TELEGRAM_SEND_WORKERS = 8  # одновременных запросов к Telegram
+TELEGRAM_SEND_MAX_RETRIES = 5  # повторов при 429 и сетевых ошибках (задержка 1, 2, 4, ... секунд)
+
+# Доступ к БД из обработчиков бота (BotDataAccess)
+TELEGRAM_DB_WORKERS = 8  # потоков для запросов (0 - общий поток sync_to_async)
+TELEGRAM_USER_CACHE_TTL = 60  # секунды: пользователь по chat id (отвязка на сайте видна боту через TTL)
+TELEGRAM_USER_CACHE_SIZE = 10000  # chat id в кэше процесса (вытесняются давно не использованные)
@@ -0,0 +1,21 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class CinemaTestRunner(DiscoverRunner):
+    """
+    Запуск тестов проекта
+
+    Журнал операций в тестах пишется сразу, а запросы Telegram-бота идут в
+    общем потоке sync_to_async: фоновый поток записи журнала и пул потоков бота
+    работают через свои соединения с БД, вне транзакции теста.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._settings_override = override_settings(OPERATION_LOG_ASYNC=False, TELEGRAM_DB_WORKERS=0)
+        self._settings_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._settings_override.disable()
+        super().teardown_test_environment(**kwargs)
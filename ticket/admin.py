@@ -1,4 +1,7 @@
+import io
 import os
+import zipfile
+from datetime import datetime, time, timedelta
 from django.contrib import admin
 from django.contrib import messages
 from django.contrib.auth.admin import UserAdmin
@@ -15,11 +18,12 @@ from .forms import ReportFilterForm, MovieForm, ScreeningAdminForm
 from .logging_utils import OperationLogger
 from .models import BackupManager, PasswordResetRequest, PendingRegistration, Report, OperationLog, AgeRating, \
     TicketStatus
-from .models import Hall, Movie, Screening, Seat, Ticket, User, Genre
-from .report_utils import ReportGenerator
+from .models import Hall, Movie, Screening, Seat, Ticket, User, Genre, ReportJob, TelegramNotification
+from .report_job_utils import ReportJobService
+from .ticket_artifact_utils import TicketArtifactStore, TicketBatchRenderer
 from django import forms
 from django.core.exceptions import ValidationError
-from django.http import JsonResponse, HttpResponseRedirect
+from django.http import Http404, JsonResponse, HttpResponseRedirect
 from django.urls import reverse
 
 
@@ -275,6 +279,60 @@ class ScreeningAdmin(LoggingModelAdmin):
     is_active_screening.boolean = True
     is_active_screening.short_description = 'Активный'
 
+    actions = ['export_tickets_pdf']
+
+    def export_tickets_pdf(self, request, queryset):
+        """Выгрузить PDF всех активных билетов выбранных сеансов одним ZIP-архивом"""
+        tickets = Ticket.objects.filter(
+            screening__in=queryset,
+            status__code='active'
+        ).select_related(*TicketArtifactStore.TICKET_RELATED).order_by('screening__start_time', 'id')
+        ticket_groups = TicketBatchRenderer.group_tickets(tickets)
+
+        if not ticket_groups:
+            self.message_user(request, 'На выбранных сеансах нет активных билетов', messages.WARNING)
+            return
+
+        # Группы отрисовываются параллельно и попадают в архив по мере готовности
+        archive = io.BytesIO()
+        exported, errors = 0, []
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            for item in TicketBatchRenderer.render(ticket_groups):
+                group_key = TicketArtifactStore.group_key(item.tickets[0])
+                if item.error:
+                    errors.append(group_key)
+                    continue
+                screening = item.tickets[0].screening
+                local_time = timezone.localtime(screening.start_time)
+                zip_file.writestr(
+                    f"{local_time.strftime('%Y%m%d_%H%M')}_{screening.hall.name}/{group_key}.pdf",
+                    item.pdf
+                )
+                exported += 1
+
+        OperationLogger.log_operation(
+            request=request,
+            action_type='EXPORT',
+            module_type='TICKETS',
+            description=f'Выгрузка PDF билетов: {exported} файлов, сеансов: {queryset.count()}',
+            additional_data={
+                'screenings': list(queryset.values_list('pk', flat=True)),
+                'errors': errors
+            }
+        )
+
+        if errors:
+            self.message_user(request, f'❌ Не удалось отрисовать билеты: {", ".join(errors)}', messages.ERROR)
+            if not exported:
+                return
+
+        response = HttpResponse(archive.getvalue(), content_type='application/zip')
+        filename = f"tickets_{timezone.localtime().strftime('%Y%m%d_%H%M%S')}.zip"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    export_tickets_pdf.short_description = "🎫 Выгрузить билеты сеансов (PDF)"
+
     def save_model(self, request, obj, form, change):
         """Переопределяем сохранение для логирования"""
         # Цена уже рассчитана в save() модели
@@ -306,9 +364,25 @@ class SeatAdmin(LoggingModelAdmin):
     def has_delete_permission(self, request, obj=None):
         return request.user.is_superuser
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        Hall.invalidate_seat_layout(obj.hall_id)
+
+    def delete_model(self, request, obj):
+        hall_id = obj.hall_id
+        super().delete_model(request, obj)
+        Hall.invalidate_seat_layout(hall_id)
+
+    def delete_queryset(self, request, queryset):
+        hall_ids = set(queryset.values_list('hall_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for hall_id in hall_ids:
+            Hall.invalidate_seat_layout(hall_id)
+
     def delete_selected(self, request, queryset):
         """Кастомное удаление с логированием"""
         count = queryset.count()
+        hall_ids = set(queryset.values_list('hall_id', flat=True))
         for seat in queryset:
             # Логируем удаление
             from .logging_utils import OperationLogger
@@ -320,6 +394,8 @@ class SeatAdmin(LoggingModelAdmin):
             )
 
         queryset.delete()
+        for hall_id in hall_ids:
+            Hall.invalidate_seat_layout(hall_id)
         self.message_user(
             request,
             f'✅ Удалено мест: {count}',
@@ -464,6 +540,21 @@ class PasswordResetRequestAdmin(LoggingModelAdmin):
     is_expired.short_description = 'Просрочен'
 
 
+@admin.register(TelegramNotification)
+class TelegramNotificationAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'user', 'kind', 'status', 'attempts', 'sent_at')
+    list_filter = ('status', 'kind', 'created_at')
+    search_fields = ('user__email', 'chat_id', 'dedup_key')
+    readonly_fields = ('created_at', 'sent_at', 'claimed_at')
+    list_select_related = ('user',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 # Функции для actions
 def create_full_backup(modeladmin, request, queryset):
     """Action для создания полного бэкапа"""
@@ -789,16 +880,21 @@ class ReportAdmin(LoggingModelAdmin):
         urls = super().get_urls()
         custom_urls = [
             path('', self.admin_site.admin_view(self.reports_view), name='ticket_reports'),
+            path('job/<int:job_id>/', self.admin_site.admin_view(self.report_job_status_view),
+                 name='ticket_report_job'),
+            path('job/<int:job_id>/pdf/', self.admin_site.admin_view(self.report_job_pdf_view),
+                 name='ticket_report_job_pdf'),
         ]
         return custom_urls + urls
 
     def reports_view(self, request):
-        """Страница отчетов в админке"""
+        """Страница отчетов в админке (отчет строится фоновым заданием)"""
         form = ReportFilterForm(request.GET or None)
         context = {
             'form': form,
             'report_data': None,
             'report_type': None,
+            'job': None,
             'title': 'Отчеты кинотеатра',
             **self.admin_site.each_context(request),
         }
@@ -816,36 +912,8 @@ class ReportAdmin(LoggingModelAdmin):
                 'end_date': end_date
             }
 
-            # Логируем просмотр отчета
-            OperationLogger.log_operation(
-                request=request,
-                action_type='VIEW',
-                module_type='REPORTS',
-                description=f'Просмотр отчета: {report_type}',
-                additional_data={
-                    'period': period,
-                    'start_date': str(start_date) if start_date else None,
-                    'end_date': str(end_date) if end_date else None
-                }
-            )
-
-            if report_type == 'revenue':
-                context['report_data'] = ReportGenerator.get_revenue_stats(period, start_date, end_date)
-            elif report_type == 'movies':
-                context['report_data'] = ReportGenerator.get_popular_movies(start_date=start_date, end_date=end_date)
-            elif report_type == 'halls':
-                context['report_data'] = ReportGenerator.get_hall_occupancy(start_date=start_date, end_date=end_date)
-            elif report_type == 'sales':
-                context['report_data'] = ReportGenerator.get_sales_statistics(start_date=start_date, end_date=end_date)
-
-        # Обработка экспорта в PDF
-        if request.method == 'POST' and 'export_pdf' in request.POST:
-            if form.is_valid():
-                report_type = form.cleaned_data['report_type']
-                period = form.cleaned_data['period']
-                start_date = form.cleaned_data['start_date']
-                end_date = form.cleaned_data['end_date']
-
+            export_pdf = request.method == 'POST' and 'export_pdf' in request.POST
+            if export_pdf:
                 # Логируем экспорт отчета
                 OperationLogger.log_report_export(
                     request=request,
@@ -857,43 +925,65 @@ class ReportAdmin(LoggingModelAdmin):
                         'end_date': str(end_date) if end_date else None
                     }
                 )
-
-                # Получаем данные для отчета
-                if report_type == 'revenue':
-                    report_data = ReportGenerator.get_revenue_stats(period, start_date, end_date)
-                    report_title = f"Финансовая статистика ({period})"
-                elif report_type == 'movies':
-                    report_data = ReportGenerator.get_popular_movies(start_date=start_date, end_date=end_date)
-                    report_title = "Популярные фильмы"
-                elif report_type == 'halls':
-                    report_data = ReportGenerator.get_hall_occupancy(start_date=start_date, end_date=end_date)
-                    report_title = "Загруженность залов"
-                elif report_type == 'sales':
-                    report_data = ReportGenerator.get_sales_statistics(start_date=start_date, end_date=end_date)
-                    report_title = "Статистика продаж"
-                else:
-                    report_data = []
-                    report_title = "Отчет"
-
-                # Генерируем PDF
-                try:
-                    from .pdf_utils import generate_pdf_report
-                    pdf_buffer = generate_pdf_report(report_data, report_type, report_title, {
+            else:
+                # Логируем просмотр отчета
+                OperationLogger.log_operation(
+                    request=request,
+                    action_type='VIEW',
+                    module_type='REPORTS',
+                    description=f'Просмотр отчета: {report_type}',
+                    additional_data={
                         'period': period,
-                        'start_date': start_date,
-                        'end_date': end_date
-                    })
+                        'start_date': str(start_date) if start_date else None,
+                        'end_date': str(end_date) if end_date else None
+                    }
+                )
 
-                    response = HttpResponse(pdf_buffer.getvalue(), content_type='application/pdf')
-                    filename = f"отчет_{report_type}_{timezone.now().strftime('%Y%m%d_%H%M')}.pdf"
-                    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-                    return response
+            # Одинаковые запросы получают готовый результат из кэша заданий
+            job = ReportJobService.enqueue(report_type, period, start_date, end_date, user=request.user)
+            context['job'] = job
 
-                except Exception as e:
-                    messages.error(request, f'Ошибка при генерации PDF: {str(e)}')
+            if job.status == 'done':
+                job = ReportJob.objects.get(pk=job.pk)
+                context['job'] = job
+                context['report_data'] = job.result
+
+                if export_pdf:
+                    if job.pdf:
+                        return self._pdf_response(job)
+                    messages.error(request, job.error or 'Ошибка при генерации PDF')
+            elif job.status == 'failed':
+                messages.error(request, f'Ошибка при построении отчета: {job.error}')
+            elif export_pdf:
+                messages.info(request, 'Отчет формируется, PDF будет доступен после завершения.')
 
         return render(request, 'ticket/admin/reports.html', context)
 
+    def _pdf_response(self, job):
+        response = HttpResponse(bytes(job.pdf), content_type='application/pdf')
+        filename = f"отчет_{job.report_type}_{timezone.localtime(job.finished_at).strftime('%Y%m%d_%H%M')}.pdf"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    def report_job_status_view(self, request, job_id):
+        """Статус фонового задания отчета (для опроса со страницы отчетов)"""
+        job = ReportJob.objects.filter(pk=job_id).defer('result', 'pdf').first()
+        if job is None:
+            return JsonResponse({'error': 'Задание не найдено'}, status=404)
+        return JsonResponse({
+            'id': job.pk,
+            'status': job.status,
+            'is_finished': job.is_finished,
+            'error': job.error,
+        })
+
+    def report_job_pdf_view(self, request, job_id):
+        """PDF готового отчета"""
+        job = ReportJob.objects.filter(pk=job_id, status='done').first()
+        if job is None or not job.pdf:
+            raise Http404('PDF отчета не найден')
+        return self._pdf_response(job)
+
     def changelist_view(self, request, extra_context=None):
         """Перенаправляем на страницу отчетов при входе в раздел"""
         return self.reports_view(request)
@@ -911,22 +1001,35 @@ class OperationLogAdmin(admin.ModelAdmin):
         'action_type', 'module_type', 'timestamp', 'user'
     ]
     search_fields = [
-        'description', 'user__email', 'object_repr',
+        'description', 'template__text', 'template_params', 'user__email', 'object_repr',
         'ip_address', 'additional_data'
     ]
     readonly_fields = [
         'timestamp', 'user', 'action_type', 'module_type',
-        'description', 'ip_address', 'user_agent', 'object_id',
+        'description_display', 'ip_address', 'user_agent_display', 'object_id',
         'object_repr', 'additional_data_display'
     ]
+    exclude = ['description', 'user_agent', 'template', 'template_params', 'user_agent_ref']
+    list_select_related = ['user', 'template']
     date_hierarchy = 'timestamp'
     list_per_page = 50
 
     def description_short(self, obj):
-        return obj.description[:60] + '...' if len(obj.description) > 60 else obj.description
+        description = obj.get_description()
+        return description[:60] + '...' if len(description) > 60 else description
 
     description_short.short_description = 'Описание'
 
+    def description_display(self, obj):
+        return obj.get_description()
+
+    description_display.short_description = 'Описание'
+
+    def user_agent_display(self, obj):
+        return obj.get_user_agent() or '-'
+
+    user_agent_display.short_description = 'User Agent'
+
     def object_repr_short(self, obj):
         return obj.object_repr[:30] + '...' if obj.object_repr and len(obj.object_repr) > 30 else obj.object_repr
 
@@ -992,6 +1095,8 @@ class OperationLogAdmin(admin.ModelAdmin):
                 return LogExporter.export_logs_to_csv(queryset)
             elif format_type == 'json':
                 return LogExporter.export_logs_to_json(queryset)
+            elif format_type == 'jsonl':
+                return LogExporter.export_logs_to_jsonl(queryset)
             elif format_type == 'pdf':
                 return LogExporter.export_logs_to_pdf(queryset)
 
@@ -1001,11 +1106,13 @@ class OperationLogAdmin(admin.ModelAdmin):
         """Получение queryset для экспорта на основе фильтров"""
         queryset = OperationLog.objects.all()
 
-        # Фильтр по дате
+        # Фильтр по дате: диапазон по timestamp (индекс и отсечение секций журнала)
         if filters.get('start_date'):
-            queryset = queryset.filter(timestamp__date__gte=filters['start_date'])
+            start = timezone.make_aware(datetime.combine(filters['start_date'], time.min))
+            queryset = queryset.filter(timestamp__gte=start)
         if filters.get('end_date'):
-            queryset = queryset.filter(timestamp__date__lte=filters['end_date'])
+            end = timezone.make_aware(datetime.combine(filters['end_date'] + timedelta(days=1), time.min))
+            queryset = queryset.filter(timestamp__lt=end)
 
         # Фильтр по типу действия
         if filters.get('action_type'):
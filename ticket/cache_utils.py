@@ -0,0 +1,158 @@
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class HomePageCache:
+    """
+    Кэш готовой HTML-страницы главной для анонимных посетителей
+
+    Ключ строится из фильтров (дата, зал, жанр, возраст, поиск), текущей даты,
+    временного интервала и версии. Версия меняется при сохранении/удалении
+    сеансов, фильмов, залов, жанров и возрастных рейтингов, а интервал
+    (HOME_PAGE_CACHE_TTL) убирает из выдачи начавшиеся сеансы.
+    """
+
+    VERSION_KEY = 'home_page_version'
+    PAGE_KEY = 'home_page:{version}:{bucket}:{digest}'
+    FILTER_PARAMS = ('date', 'hall', 'genre', 'age_rating', 'search')
+
+    @staticmethod
+    def get_ttl():
+        return getattr(settings, 'HOME_PAGE_CACHE_TTL', 60)
+
+    @staticmethod
+    def _cache():
+        return caches[getattr(settings, 'HOME_PAGE_CACHE', 'default')]
+
+    @staticmethod
+    def _version(cache):
+        version = cache.get(HomePageCache.VERSION_KEY)
+        if version is None:
+            cache.add(HomePageCache.VERSION_KEY, uuid.uuid4().hex, None)
+            version = cache.get(HomePageCache.VERSION_KEY)
+        return version
+
+    @staticmethod
+    def is_cacheable(request):
+        """Кэшируем только анонимные GET-запросы без непрочитанных сообщений"""
+        if HomePageCache.get_ttl() <= 0 or request.method != 'GET':
+            return False
+        if 'messages' in request.COOKIES:
+            return False
+        # Без cookie сессии пользователь точно анонимный - обходимся без запроса к БД
+        if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+            return True
+        return not request.user.is_authenticated
+
+    @staticmethod
+    def get_key(request):
+        """Ключ кэша для запроса (None - страницу не кэшируем)"""
+        if not HomePageCache.is_cacheable(request):
+            return None
+
+        ttl = HomePageCache.get_ttl()
+        today = timezone.localtime(timezone.now()).date().isoformat()
+        filters = '|'.join([today] + [request.GET.get(name, '') for name in HomePageCache.FILTER_PARAMS])
+        digest = hashlib.md5(filters.encode('utf-8')).hexdigest()
+
+        try:
+            version = HomePageCache._version(HomePageCache._cache())
+        except Exception as e:
+            logger.error(f"Error reading home page cache version: {e}")
+            return None
+
+        return HomePageCache.PAGE_KEY.format(version=version, bucket=int(time.time() // ttl), digest=digest)
+
+    @staticmethod
+    def get(key):
+        try:
+            return HomePageCache._cache().get(key)
+        except Exception as e:
+            logger.error(f"Error reading home page cache: {e}")
+            return None
+
+    @staticmethod
+    def set(key, content):
+        try:
+            HomePageCache._cache().set(key, content, HomePageCache.get_ttl())
+        except Exception as e:
+            logger.error(f"Error writing home page cache: {e}")
+
+    @staticmethod
+    def invalidate():
+        """Сбросить все закэшированные варианты главной страницы"""
+        try:
+            HomePageCache._cache().set(HomePageCache.VERSION_KEY, uuid.uuid4().hex, None)
+        except Exception as e:
+            logger.error(f"Error invalidating home page cache: {e}")
+
+
+class TelegramUserCache:
+    """
+    Привязанные пользователи по Telegram chat id в памяти процесса (LRU + TTL)
+
+    Хранится и отсутствие привязки (None), чтобы сообщения непривязанных чатов
+    тоже не шли в БД. Запись сбрасывается при привязке и отвязке в самом боте;
+    изменения из других процессов (отвязка или новый код на сайте) кэш бота не
+    видит, и до них проходит не больше TELEGRAM_USER_CACHE_TTL секунд.
+    """
+
+    _local = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_ttl():
+        return getattr(settings, 'TELEGRAM_USER_CACHE_TTL', 60)
+
+    @staticmethod
+    def get_size():
+        return getattr(settings, 'TELEGRAM_USER_CACHE_SIZE', 10000)
+
+    @staticmethod
+    def get(chat_id):
+        """(найдено, пользователь или None)"""
+        chat_id = int(chat_id)
+        with TelegramUserCache._lock:
+            entry = TelegramUserCache._local.get(chat_id)
+            if entry is None:
+                return False, None
+            user, expires_at = entry
+            if expires_at < time.monotonic():
+                del TelegramUserCache._local[chat_id]
+                return False, None
+            TelegramUserCache._local.move_to_end(chat_id)
+            return True, user
+
+    @staticmethod
+    def set(chat_id, user):
+        ttl = TelegramUserCache.get_ttl()
+        if ttl <= 0:
+            return
+        chat_id = int(chat_id)
+        with TelegramUserCache._lock:
+            TelegramUserCache._local[chat_id] = (user, time.monotonic() + ttl)
+            TelegramUserCache._local.move_to_end(chat_id)
+            while len(TelegramUserCache._local) > TelegramUserCache.get_size():
+                TelegramUserCache._local.popitem(last=False)
+
+    @staticmethod
+    def invalidate(chat_id):
+        if chat_id in (None, ''):
+            return
+        with TelegramUserCache._lock:
+            TelegramUserCache._local.pop(int(chat_id), None)
+
+    @staticmethod
+    def clear():
+        """Очистить кэш процесса"""
+        with TelegramUserCache._lock:
+            TelegramUserCache._local.clear()
@@ -1,190 +1,239 @@
 # ticket/export_utils.py - ИСПРАВЛЕННАЯ ВЕРСИЯ
 
+import csv
 import json
-import os
-from io import BytesIO
+import logging
+import tempfile
 from django.conf import settings
-from django.http import HttpResponse
+from django.http import FileResponse, StreamingHttpResponse
 from django.utils import timezone
-from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import ParagraphStyle
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer
+from .pdf_resources import PdfResources
 
+logger = logging.getLogger(__name__)
 
 class LogExporter:
     """Утилита для экспорта логов в различные форматы"""
 
+    # Записей за один проход серверного курсора
+    EXPORT_CHUNK_SIZE = 2000
+
+    CSV_HEADER = ['Время', 'Пользователь', 'Действие', 'Модуль', 'Описание', 'Объект', 'ID объекта',
+                  'IP адрес', 'User Agent', 'Дополнительные данные']
+
+    @staticmethod
+    def _iterate_logs(queryset):
+        """Логи потоком (пользователь и справочники загружаются тем же запросом)"""
+        return queryset.select_related('user', 'template', 'user_agent_ref').iterator(chunk_size=LogExporter.EXPORT_CHUNK_SIZE)
+
+    @staticmethod
+    def _log_to_dict(log):
+        return {
+            'timestamp': log.timestamp.isoformat(),
+            'user': log.user.email if log.user else None,
+            'action_type': log.action_type,
+            'action_type_display': log.get_action_type_display(),
+            'module_type': log.module_type,
+            'module_type_display': log.get_module_type_display(),
+            'description': log.get_description(),
+            'object_repr': log.object_repr,
+            'object_id': log.object_id,
+            'ip_address': log.ip_address,
+            'user_agent': log.get_user_agent(),
+            'additional_data': log.additional_data
+        }
+
+    @staticmethod
+    def _streaming_response(content, content_type, filename):
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
     @staticmethod
     def export_logs_to_json(queryset, filename=None):
-        """Экспорт логов в JSON"""
+        """Экспорт логов в JSON (массив формируется потоком)"""
         if filename is None:
             filename = f"logs_export_{timezone.now().strftime('%Y%m%d_%H%M')}.json"
 
-        logs_data = []
-        for log in queryset:
-            log_data = {
-                'timestamp': log.timestamp.isoformat(),
-                'user': log.user.email if log.user else None,
-                'action_type': log.action_type,
-                'action_type_display': log.get_action_type_display(),
-                'module_type': log.module_type,
-                'module_type_display': log.get_module_type_display(),
-                'description': log.description,
-                'object_repr': log.object_repr,
-                'object_id': log.object_id,
-                'ip_address': log.ip_address,
-                'user_agent': log.user_agent,
-                'additional_data': log.additional_data
-            }
-            logs_data.append(log_data)
-
-        response = HttpResponse(
-            json.dumps(logs_data, ensure_ascii=False, indent=2),
-            content_type='application/json; charset=utf-8'
-        )
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
+        def generate():
+            separator = '[\n'
+            for log in LogExporter._iterate_logs(queryset):
+                yield separator + json.dumps(LogExporter._log_to_dict(log), ensure_ascii=False, indent=2)
+                separator = ',\n'
+            yield '[]\n' if separator == '[\n' else '\n]\n'
+
+        return LogExporter._streaming_response(generate(), 'application/json; charset=utf-8', filename)
+
+    @staticmethod
+    def export_logs_to_jsonl(queryset, filename=None):
+        """Экспорт логов в JSON Lines (одна запись - одна строка)"""
+        if filename is None:
+            filename = f"logs_export_{timezone.now().strftime('%Y%m%d_%H%M')}.jsonl"
+
+        def generate():
+            for log in LogExporter._iterate_logs(queryset):
+                yield json.dumps(LogExporter._log_to_dict(log), ensure_ascii=False) + '\n'
+
+        return LogExporter._streaming_response(generate(), 'application/x-ndjson; charset=utf-8', filename)
+
+    @staticmethod
+    def export_logs_to_csv(queryset, filename=None):
+        """Экспорт логов в CSV потоком"""
+        if filename is None:
+            filename = f"logs_export_{timezone.now().strftime('%Y%m%d_%H%M')}.csv"
+
+        class Echo:
+            """Буфер csv.writer, возвращающий записанную строку"""
+
+            def write(self, value):
+                return value
+
+        writer = csv.writer(Echo())
+
+        def generate():
+            # BOM, чтобы Excel открыл кириллицу в UTF-8
+            yield '\ufeff' + writer.writerow(LogExporter.CSV_HEADER)
+            for log in LogExporter._iterate_logs(queryset):
+                yield writer.writerow([
+                    timezone.localtime(log.timestamp).strftime('%d.%m.%Y %H:%M:%S'),
+                    log.user.email if log.user else 'Система',
+                    log.get_action_type_display(),
+                    log.get_module_type_display(),
+                    log.get_description(),
+                    log.object_repr or '',
+                    log.object_id if log.object_id is not None else '',
+                    log.ip_address or '',
+                    log.get_user_agent() or '',
+                    json.dumps(log.additional_data, ensure_ascii=False) if log.additional_data else '',
+                ])
+
+        return LogExporter._streaming_response(generate(), 'text/csv; charset=utf-8', filename)
+
+    PDF_HEADER = ['Время', 'Пользователь', 'Действие', 'Модуль', 'Описание', 'Объект']
+
+    # Фиксированные ширины столбцов (в points)
+    PDF_COL_WIDTHS = [60, 90, 70, 70, 180, 100]  # Сумма: 570pt (вмещается в A4 с отступами)
+
+    @staticmethod
+    def get_pdf_max_rows():
+        return getattr(settings, 'LOG_EXPORT_PDF_MAX_ROWS', 20000)
+
+    @staticmethod
+    def get_pdf_chunk_rows():
+        return getattr(settings, 'LOG_EXPORT_PDF_CHUNK_ROWS', 200)
+
+    @staticmethod
+    def get_pdf_progress_chunks():
+        return getattr(settings, 'LOG_EXPORT_PDF_PROGRESS_CHUNKS', 10)
+
+    @staticmethod
+    def _pdf_row(log, cell_style):
+        """Строка таблицы логов с переносом длинного текста"""
+        description = LogExporter._format_text_for_wrapping(log.get_description(), 120)
+        object_repr = LogExporter._format_text_for_wrapping(log.object_repr or '-', 60)
+        user_email = log.user.email if log.user else 'Система'
+
+        return [
+            Paragraph(log.timestamp.strftime('%d.%m.%Y<br/>%H:%M'), cell_style),
+            Paragraph(user_email, cell_style),
+            Paragraph(log.get_action_type_display(), cell_style),
+            Paragraph(log.get_module_type_display(), cell_style),
+            Paragraph(description, cell_style),
+            Paragraph(object_repr, cell_style),
+        ]
+
+    @staticmethod
+    def _pdf_table(rows):
+        table = Table([LogExporter.PDF_HEADER] + rows, colWidths=LogExporter.PDF_COL_WIDTHS, repeatRows=1)
+        table.setStyle(PdfResources.table_style('logs'))
+        return table
 
     @staticmethod
     def export_logs_to_pdf(queryset, filename=None):
-        """Экспорт логов в PDF с фиксированными ширинами столбцов и переносом текста"""
+        """
+        Экспорт логов в PDF с фиксированными ширинами столбцов и переносом текста
+
+        Таблица строится частями по LOG_EXPORT_PDF_CHUNK_ROWS строк (время верстки
+        ReportLab растет быстрее числа строк одной таблицы), в PDF попадает не больше
+        LOG_EXPORT_PDF_MAX_ROWS записей. Каждые LOG_EXPORT_PDF_PROGRESS_CHUNKS частей
+        и по окончании подготовки таблиц в журнал пишется ход экспорта. Документ
+        пишется во временный файл.
+        """
         if filename is None:
             filename = f"logs_export_{timezone.now().strftime('%Y%m%d_%H%M')}.pdf"
 
-        buffer = BytesIO()
+        max_rows = LogExporter.get_pdf_max_rows()
+        chunk_rows = LogExporter.get_pdf_chunk_rows()
+
+        output = tempfile.TemporaryFile()
         # Книжная ориентация с увеличенными отступами
-        doc = SimpleDocTemplate(buffer, pagesize=A4,
+        doc = SimpleDocTemplate(output, pagesize=A4,
                                 rightMargin=20, leftMargin=20, topMargin=30, bottomMargin=30)
         elements = []
 
         # Регистрируем шрифты
         has_custom_font = LogExporter._register_custom_fonts()
+        cell_style = LogExporter._get_cell_style(has_custom_font)
 
         # Заголовок
-        title_style = ParagraphStyle(
-            name='CustomTitle',
-            fontName='DejaVuSans' if has_custom_font else 'Helvetica-Bold',
-            fontSize=16,
-            spaceAfter=25,
-            alignment=1,
-            textColor=colors.black
-        )
+        title_style = PdfResources.style('log_title')
 
         title_text = Paragraph(f"Экспорт логов операций - {timezone.now().strftime('%d.%m.%Y %H:%M')}", title_style)
         elements.append(title_text)
 
         # Статистика
-        stats_style = ParagraphStyle(
-            name='StatsStyle',
-            fontName='DejaVuSans' if has_custom_font else 'Helvetica',
-            fontSize=10,
-            spaceAfter=20,
-            alignment=1
-        )
-
         total_logs = queryset.count()
-        stats_text = Paragraph(f"Всего записей: {total_logs}", stats_style)
-        elements.append(stats_text)
+        export_rows = min(total_logs, max_rows)
+        stats_text = f"Всего записей: {total_logs}"
+        if export_rows < total_logs:
+            stats_text += f" (в PDF - первые {export_rows}, полные данные - в CSV или JSON Lines)"
+        elements.append(Paragraph(stats_text, PdfResources.style('log_stats')))
 
         # Таблица логов
-        if queryset.exists():
-            # Создаем данные таблицы с форматированием текста для переноса
-            table_data = [['Время', 'Пользователь', 'Действие', 'Модуль', 'Описание', 'Объект']]
-
-            for log in queryset:
-                # Форматируем текст с переносами
-                description = LogExporter._format_text_for_wrapping(log.description, 120)
-                object_repr = LogExporter._format_text_for_wrapping(log.object_repr or '-', 60)
-                user_email = log.user.email if log.user else 'Система'
-
-                # Создаем Paragraph объекты для автоматического переноса текста
-                time_para = Paragraph(log.timestamp.strftime('%d.%m.%Y<br/>%H:%M'),
-                                      LogExporter._get_cell_style(has_custom_font))
-                user_para = Paragraph(user_email, LogExporter._get_cell_style(has_custom_font))
-                action_para = Paragraph(log.get_action_type_display(),
-                                        LogExporter._get_cell_style(has_custom_font))
-                module_para = Paragraph(log.get_module_type_display(),
-                                        LogExporter._get_cell_style(has_custom_font))
-                desc_para = Paragraph(description, LogExporter._get_cell_style(has_custom_font))
-                object_para = Paragraph(object_repr, LogExporter._get_cell_style(has_custom_font))
-
-                table_data.append([
-                    time_para,
-                    user_para,
-                    action_para,
-                    module_para,
-                    desc_para,
-                    object_para
-                ])
-
-            # Фиксированные ширины столбцов (в points)
-            col_widths = [60, 90, 70, 70, 180, 100]  # Сумма: 570pt (вмещается в A4 с отступами)
-
-            table = Table(table_data, colWidths=col_widths, repeatRows=1)
-            table.setStyle(TableStyle([
-                # Заголовок таблицы
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E86AB')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-                ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
-                ('FONTNAME', (0, 0), (-1, 0), 'DejaVuSans' if has_custom_font else 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 9),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-                ('TOPPADDING', (0, 0), (-1, 0), 10),
-
-                # Стиль для данных
-                ('ALIGN', (0, 1), (-1, -1), 'LEFT'),
-                ('VALIGN', (0, 1), (-1, -1), 'TOP'),
-                ('FONTNAME', (0, 1), (-1, -1), 'DejaVuSans' if has_custom_font else 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -1), 8),
-
-                # Отступы в ячейках
-                ('LEFTPADDING', (0, 0), (-1, -1), 6),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-                ('TOPPADDING', (0, 0), (-1, -1), 5),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-
-                # Границы и фон
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F8F9FA')]),
-            ]))
-
-            elements.append(table)
+        if export_rows:
+            rows = []
+            done = 0
+            chunks = 0
+            progress_chunks = LogExporter.get_pdf_progress_chunks()
+            has_additional_data = False
+            for log in LogExporter._iterate_logs(queryset[:export_rows]):
+                rows.append(LogExporter._pdf_row(log, cell_style))
+                has_additional_data = has_additional_data or bool(log.additional_data)
+
+                if len(rows) == chunk_rows:
+                    elements.append(LogExporter._pdf_table(rows))
+                    done += len(rows)
+                    chunks += 1
+                    rows = []
+                    if progress_chunks > 0 and chunks % progress_chunks == 0:
+                        logger.info(f"Logs PDF export: {done} of {export_rows} rows prepared")
+
+            if rows:
+                elements.append(LogExporter._pdf_table(rows))
+                done += len(rows)
+            logger.info(f"Logs PDF export: {done} of {export_rows} rows prepared, building document")
 
             # Добавляем информацию о дополнительных данных
-            if any(log.additional_data for log in queryset):
-                info_style = ParagraphStyle(
-                    name='InfoStyle',
-                    fontName='DejaVuSans' if has_custom_font else 'Helvetica-Oblique',
-                    fontSize=7,
-                    spaceAfter=10,
-                    alignment=0,
-                    textColor=colors.grey,
-                    leftIndent=10
-                )
+            if has_additional_data:
+                info_style = PdfResources.style('log_info')
                 elements.append(Spacer(1, 15))
                 elements.append(Paragraph("* Для просмотра полных данных используйте JSON экспорт", info_style))
 
         else:
-            no_data_style = ParagraphStyle(
-                name='NoDataStyle',
-                fontName='DejaVuSans' if has_custom_font else 'Helvetica',
-                fontSize=12,
-                spaceAfter=20,
-                alignment=1,
-                textColor=colors.grey
-            )
+            no_data_style = PdfResources.style('log_no_data')
             elements.append(Paragraph("Нет данных для экспорта", no_data_style))
 
-        doc.build(elements)
-        buffer.seek(0)
+        try:
+            doc.build(elements)
+        except Exception:
+            output.close()
+            raise
+        logger.info(f"Logs PDF export built: {export_rows} of {total_logs} rows")
 
-        response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
+        output.seek(0)
+        # FileResponse отдает файл частями и закрывает его после отправки
+        return FileResponse(output, as_attachment=True, filename=filename, content_type='application/pdf')
 
     @staticmethod
     def _format_text_for_wrapping(text, max_length):
@@ -228,38 +277,21 @@ class LogExporter:
         return "<br/>".join(result)
 
     @staticmethod
-    def _get_cell_style(has_custom_font):
-        """Возвращает стиль для ячеек таблицы"""
-        return ParagraphStyle(
-            name='CellStyle',
-            fontName='DejaVuSans' if has_custom_font else 'Helvetica',
-            fontSize=8,
-            leading=9,  # Межстрочный интервал
-            leftIndent=0,
-            rightIndent=0,
-            wordWrap='LTR',  # Исправлено: строка вместо булева значения
-            spaceBefore=0,
-            spaceAfter=0
-        )
+    def _get_cell_style(has_custom_font=True):
+        """Возвращает стиль для ячеек таблицы (общий для всех экспортов)"""
+        return PdfResources.style('log_cell')
 
     @staticmethod
     def _register_custom_fonts():
-        """Регистрация кастомных шрифтов для PDF"""
-        try:
-            fonts_dir = os.path.join(settings.BASE_DIR, 'ticket', 'fonts')
-            dejavu_sans_path = os.path.join(fonts_dir, 'DejaVuSans.ttf')
-
-            if os.path.exists(dejavu_sans_path):
-                pdfmetrics.registerFont(TTFont('DejaVuSans', dejavu_sans_path))
-                return True
-            return False
-        except Exception:
-            return False
+        """Регистрация кастомных шрифтов для PDF (один раз на процесс)"""
+        return PdfResources.register_fonts()
 
     @staticmethod
     def get_export_formats():
         """Возвращает доступные форматы экспорта"""
         return [
+            ('csv', 'CSV'),
             ('json', 'JSON'),
+            ('jsonl', 'JSON Lines'),
             ('pdf', 'PDF'),
         ]
\ No newline at end of file
@@ -705,9 +705,11 @@ class ReportFilterForm(forms.Form):
     ]
 
     PERIOD_CHOICES = [
+        ('hourly', 'По часам'),
         ('daily', 'По дням'),
         ('weekly', 'По неделям'),
         ('monthly', 'По месяцам'),
+        ('weekday', 'По дням недели'),
     ]
 
     report_type = forms.ChoiceField(
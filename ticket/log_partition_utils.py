@@ -0,0 +1,303 @@
+import gzip
+import json
+import logging
+import os
+import re
+from datetime import datetime, time
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import OperationLog
+
+logger = logging.getLogger(__name__)
+
+
+class OperationLogPartitions:
+    """
+    Помесячное секционирование журнала операций и хранение старых записей
+
+    В PostgreSQL таблица OperationLog преобразуется в секционированную по
+    timestamp (PARTITION BY RANGE, секция на календарный месяц в TIME_ZONE), и
+    запросы с фильтром по времени читают только нужные секции. Первичный ключ
+    секционированной таблицы - (id, timestamp), для Django ключом остается id.
+
+    Записи старше OPERATION_LOG_RETENTION_MONTHS месяцев выгружаются в
+    OPERATION_LOG_ARCHIVE_DIR (JSON Lines + gzip), после чего секция удаляется.
+    Записи без месячной секции (секция по умолчанию, другие СУБД) архивируются
+    и удаляются построчно за те же месяцы.
+    """
+
+    TABLE = OperationLog._meta.db_table
+    DEFAULT_PARTITION = f"{TABLE}_default"
+    PARTITION_PATTERN = re.compile(rf'^{re.escape(TABLE)}_p(\d{{4}})(\d{{2}})$')
+
+    ARCHIVE_FIELDS = ('id', 'timestamp', 'user_id', 'action_type', 'module_type', 'ip_address', 'object_id',
+                      'object_repr', 'additional_data')
+
+    @staticmethod
+    def get_retention_months():
+        return getattr(settings, 'OPERATION_LOG_RETENTION_MONTHS', 12)
+
+    @staticmethod
+    def get_months_ahead():
+        return getattr(settings, 'OPERATION_LOG_PARTITIONS_AHEAD', 2)
+
+    @staticmethod
+    def get_archive_dir():
+        return getattr(settings, 'OPERATION_LOG_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'logs', 'archive'))
+
+    @staticmethod
+    def is_supported():
+        return connection.vendor == 'postgresql'
+
+    @staticmethod
+    def month_start(value):
+        """Первое число месяца для даты или момента времени (в TIME_ZONE)"""
+        if isinstance(value, datetime):
+            value = timezone.localtime(value).date()
+        return value.replace(day=1)
+
+    @staticmethod
+    def add_months(month, count):
+        index = month.year * 12 + month.month - 1 + count
+        return month.replace(year=index // 12, month=index % 12 + 1)
+
+    @staticmethod
+    def month_bounds(month):
+        """Границы месяца: [начало, начало следующего месяца)"""
+        return (
+            timezone.make_aware(datetime.combine(month, time.min)),
+            timezone.make_aware(datetime.combine(OperationLogPartitions.add_months(month, 1), time.min)),
+        )
+
+    @staticmethod
+    def partition_name(month):
+        return f"{OperationLogPartitions.TABLE}_p{month:%Y%m}"
+
+    @staticmethod
+    def is_partitioned():
+        if not OperationLogPartitions.is_supported():
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+                "WHERE c.relname = %s AND c.relnamespace = to_regnamespace(current_schema())",
+                [OperationLogPartitions.TABLE]
+            )
+            return cursor.fetchone() is not None
+
+    @staticmethod
+    def get_partitions():
+        """Месячные секции: {первое число месяца: имя таблицы}"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT child.relname FROM pg_inherits i "
+                "JOIN pg_class parent ON parent.oid = i.inhparent "
+                "JOIN pg_class child ON child.oid = i.inhrelid "
+                "WHERE parent.relname = %s AND parent.relnamespace = to_regnamespace(current_schema())",
+                [OperationLogPartitions.TABLE]
+            )
+            partitions = {}
+            for (name,) in cursor.fetchall():
+                match = OperationLogPartitions.PARTITION_PATTERN.match(name)
+                if match:
+                    partitions[datetime(int(match.group(1)), int(match.group(2)), 1).date()] = name
+            return partitions
+
+    @staticmethod
+    def _create_partition(cursor, month):
+        table = OperationLogPartitions.TABLE
+        default = OperationLogPartitions.DEFAULT_PARTITION
+        name = OperationLogPartitions.partition_name(month)
+        start, end = OperationLogPartitions.month_bounds(month)
+        bounds = f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+
+        cursor.execute("SELECT to_regclass(%s)", [f'"{default}"'])
+        if cursor.fetchone()[0] is None:
+            cursor.execute(f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}" {bounds}')
+            return
+
+        # Записи месяца могли попасть в секцию по умолчанию, и тогда CREATE ... PARTITION OF
+        # падает: создаем таблицу отдельно, переносим в нее эти записи и только потом подключаем
+        with transaction.atomic():
+            cursor.execute(f'CREATE TABLE "{name}" (LIKE "{table}" INCLUDING DEFAULTS INCLUDING STORAGE)')
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM "{default}" WHERE "timestamp" >= %s AND "timestamp" < %s RETURNING *) '
+                f'INSERT INTO "{name}" SELECT * FROM moved',
+                [start, end]
+            )
+            if cursor.rowcount:
+                logger.info(f"Moved {cursor.rowcount} operation log rows from {default} to {name}")
+            cursor.execute(f'ALTER TABLE "{table}" ATTACH PARTITION "{name}" {bounds}')
+
+    @staticmethod
+    def ensure_partitions(months_ahead=None):
+        """Создать секции с текущего месяца на months_ahead месяцев вперед"""
+        if not OperationLogPartitions.is_partitioned():
+            return []
+
+        months_ahead = OperationLogPartitions.get_months_ahead() if months_ahead is None else months_ahead
+        current = OperationLogPartitions.month_start(timezone.now())
+        existing = OperationLogPartitions.get_partitions()
+        created = []
+        with connection.cursor() as cursor:
+            for offset in range(months_ahead + 1):
+                month = OperationLogPartitions.add_months(current, offset)
+                if month not in existing:
+                    OperationLogPartitions._create_partition(cursor, month)
+                    created.append(OperationLogPartitions.partition_name(month))
+        return created
+
+    @staticmethod
+    def convert(months_ahead=None):
+        """
+        Преобразовать таблицу журнала в секционированную (однократно)
+
+        Данные копируются в новую таблицу в одной транзакции, на время
+        преобразования таблица журнала блокируется.
+        """
+        if not OperationLogPartitions.is_supported():
+            raise RuntimeError('Partitioning requires PostgreSQL')
+        if OperationLogPartitions.is_partitioned():
+            return 0
+
+        table = OperationLogPartitions.TABLE
+        legacy = f"{table}_legacy"
+        months_ahead = OperationLogPartitions.get_months_ahead() if months_ahead is None else months_ahead
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE "{table}" IN ACCESS EXCLUSIVE MODE')
+            cursor.execute(f'SELECT MIN("timestamp") FROM "{table}"')
+            first = cursor.fetchone()[0]
+
+            cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{legacy}"')
+            cursor.execute(
+                f'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS INCLUDING IDENTITY '
+                f'INCLUDING STORAGE INCLUDING COMMENTS) PARTITION BY RANGE ("timestamp")'
+            )
+
+            current = OperationLogPartitions.month_start(timezone.now())
+            month = OperationLogPartitions.month_start(first) if first else current
+            last = OperationLogPartitions.add_months(current, months_ahead)
+            while month <= last:
+                OperationLogPartitions._create_partition(cursor, month)
+                month = OperationLogPartitions.add_months(month, 1)
+            # Страховка: запись вне созданных секций не должна падать
+            cursor.execute(
+                f'CREATE TABLE "{OperationLogPartitions.DEFAULT_PARTITION}" PARTITION OF "{table}" DEFAULT'
+            )
+
+            cursor.execute(f'INSERT INTO "{table}" SELECT * FROM "{legacy}"')
+            copied = cursor.rowcount
+
+            # Счетчик id продолжает нумерацию старой таблицы
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+            sequence = cursor.fetchone()[0]
+            if sequence is None:
+                # Столбец serial: последовательность принадлежит старой таблице
+                cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [legacy])
+                sequence = cursor.fetchone()[0]
+                cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY "{table}"."id"')
+            cursor.execute(f'SELECT setval(%s, COALESCE((SELECT MAX("id") FROM "{table}"), 0) + 1, false)',
+                           [sequence])
+
+            cursor.execute(f'DROP TABLE "{legacy}"')
+
+            # Ограничения создаются после удаления старой таблицы (имена не должны совпадать).
+            # Ключ секционированной таблицы обязан включать столбец секционирования
+            cursor.execute(f'ALTER TABLE "{table}" ADD PRIMARY KEY ("id", "timestamp")')
+            for field in OperationLog._meta.concrete_fields:
+                if field.many_to_one:
+                    cursor.execute(
+                        f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_{field.column}_fk" '
+                        f'FOREIGN KEY ("{field.column}") REFERENCES "{field.related_model._meta.db_table}" ("id") '
+                        f'DEFERRABLE INITIALLY DEFERRED'
+                    )
+
+            # Индексы модели создаются на родительской таблице и наследуются секциями
+            with connection.schema_editor(atomic=False) as editor:
+                for index in OperationLog._meta.indexes:
+                    editor.add_index(OperationLog, index)
+
+        logger.info(f"Operation log converted to partitioned table: {copied} rows")
+        return copied
+
+    @staticmethod
+    def get_archive_path(month):
+        return os.path.join(OperationLogPartitions.get_archive_dir(), f"operation_log_{month:%Y%m}.jsonl.gz")
+
+    @staticmethod
+    def _archive_month(month):
+        """Выгрузить записи месяца в файл, возвращает число записей"""
+        start, end = OperationLogPartitions.month_bounds(month)
+        path = OperationLogPartitions.get_archive_path(month)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        logs = OperationLog.objects.filter(
+            timestamp__gte=start, timestamp__lt=end
+        ).select_related('template', 'user_agent_ref').order_by('id')
+        count = 0
+        temp_path = f"{path}.tmp"
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as archive:
+            for log in logs.iterator(chunk_size=5000):
+                # Архив самодостаточен: описание и User-Agent без ссылок на справочники
+                row = {field: getattr(log, field) for field in OperationLogPartitions.ARCHIVE_FIELDS}
+                row['description'] = log.get_description()
+                row['user_agent'] = log.get_user_agent()
+                archive.write(json.dumps(row, ensure_ascii=False, cls=DjangoJSONEncoder) + '\n')
+                count += 1
+        if count:
+            # Повторная выгрузка месяца не затирает предыдущий архив
+            if os.path.exists(path):
+                path = path.replace('.jsonl.gz', f"_{timezone.now():%Y%m%d%H%M%S}.jsonl.gz")
+            os.replace(temp_path, path)
+        else:
+            os.remove(temp_path)
+        return count
+
+    @staticmethod
+    def apply_retention(retention_months=None, archive=True, dry_run=False):
+        """
+        Удалить записи старше срока хранения (предварительно выгрузив в архив)
+
+        Returns:
+            list: [(месяц, записей), ...] обработанные месяцы
+        """
+        retention_months = (OperationLogPartitions.get_retention_months()
+                            if retention_months is None else retention_months)
+        cutoff = OperationLogPartitions.add_months(
+            OperationLogPartitions.month_start(timezone.now()), -retention_months
+        )
+        partitioned = OperationLogPartitions.is_partitioned()
+        partitions = OperationLogPartitions.get_partitions() if partitioned else {}
+
+        # Месяцы без секции (в том числе записи, попавшие в секцию по умолчанию) удаляются построчно
+        months = {month for month in partitions if month < cutoff}
+        first = OperationLog.objects.order_by('timestamp').values_list('timestamp', flat=True).first()
+        month = OperationLogPartitions.month_start(first) if first else cutoff
+        while month < cutoff:
+            months.add(month)
+            month = OperationLogPartitions.add_months(month, 1)
+
+        processed = []
+        for month in sorted(months):
+            start, end = OperationLogPartitions.month_bounds(month)
+            if dry_run:
+                processed.append((month, OperationLog.objects.filter(timestamp__gte=start, timestamp__lt=end).count()))
+                continue
+
+            with transaction.atomic():
+                count = OperationLogPartitions._archive_month(month) if archive else None
+                if month in partitions:
+                    name = partitions[month]
+                    with connection.cursor() as cursor:
+                        cursor.execute(f'ALTER TABLE "{OperationLogPartitions.TABLE}" DETACH PARTITION "{name}"')
+                        cursor.execute(f'DROP TABLE "{name}"')
+                else:
+                    deleted, _ = OperationLog.objects.filter(timestamp__gte=start, timestamp__lt=end).delete()
+                    count = deleted if count is None else count
+            processed.append((month, count))
+            logger.info(f"Operation log for {month:%Y-%m} archived and removed: {count} rows")
+
+        return processed
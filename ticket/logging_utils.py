@@ -1,11 +1,289 @@
+import atexit
+import json
 import logging
+import os
+import hashlib
+import queue
+import re
+import threading
+import time
+import uuid
+from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.db import IntegrityError, close_old_connections
 from django.utils import timezone
-from .models import OperationLog
+from django.utils.dateparse import parse_datetime
+from .models import LogTemplate, OperationLog, User, UserAgent
 
 logger = logging.getLogger(__name__)
 
 
+class OperationLogBuffer:
+    """
+    Буфер записи журнала операций
+
+    Записи попадают в очередь процесса, фоновый поток сохраняет их пачками
+    (bulk_create) по OPERATION_LOG_BATCH_SIZE записей или раз в
+    OPERATION_LOG_FLUSH_INTERVAL секунд. Если БД недоступна, пачка дописывается
+    в файл в OPERATION_LOG_SPOOL_DIR и загружается при следующей удачной записи.
+    Остаток очереди сохраняется при завершении процесса.
+    """
+
+    SPOOL_FIELDS = ('user_id', 'action_type', 'module_type', 'ip_address', 'object_id', 'object_repr',
+                    'additional_data')
+
+    _queue = None
+    _thread = None
+    _pid = None
+    _lock = threading.Lock()
+    _flush_lock = threading.Lock()
+
+    @staticmethod
+    def is_enabled():
+        return getattr(settings, 'OPERATION_LOG_ASYNC', True)
+
+    @staticmethod
+    def get_batch_size():
+        return getattr(settings, 'OPERATION_LOG_BATCH_SIZE', 100)
+
+    @staticmethod
+    def get_flush_interval():
+        return getattr(settings, 'OPERATION_LOG_FLUSH_INTERVAL', 2)
+
+    @staticmethod
+    def get_spool_dir():
+        return getattr(settings, 'OPERATION_LOG_SPOOL_DIR', os.path.join(settings.BASE_DIR, 'logs', 'operation_log'))
+
+    @staticmethod
+    def add(log_entry):
+        """Поставить запись в очередь (без буфера или при переполнении - сохранить сразу)"""
+        if OperationLogBuffer.is_enabled():
+            try:
+                OperationLogBuffer._get_queue().put_nowait(log_entry)
+                return
+            except queue.Full:
+                logger.warning("Operation log queue is full, writing synchronously")
+        OperationLogBuffer.write([log_entry])
+
+    @staticmethod
+    def _get_queue():
+        """Очередь и поток записи текущего процесса (после fork создаются заново)"""
+        if OperationLogBuffer._pid != os.getpid():
+            with OperationLogBuffer._lock:
+                if OperationLogBuffer._pid != os.getpid():
+                    OperationLogBuffer._queue = queue.Queue(
+                        maxsize=getattr(settings, 'OPERATION_LOG_QUEUE_SIZE', 10000)
+                    )
+                    OperationLogBuffer._thread = threading.Thread(
+                        target=OperationLogBuffer._writer_loop,
+                        name='operation-log-writer',
+                        daemon=True
+                    )
+                    OperationLogBuffer._thread.start()
+                    if OperationLogBuffer._pid is None:
+                        atexit.register(OperationLogBuffer.flush)
+                    OperationLogBuffer._pid = os.getpid()
+        return OperationLogBuffer._queue
+
+    @staticmethod
+    def _writer_loop():
+        log_queue = OperationLogBuffer._queue
+        while True:
+            batch = [log_queue.get()]
+            deadline = time.monotonic() + OperationLogBuffer.get_flush_interval()
+            while len(batch) < OperationLogBuffer.get_batch_size():
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(log_queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            close_old_connections()
+            try:
+                OperationLogBuffer.write(batch)
+            finally:
+                close_old_connections()
+
+    @staticmethod
+    def _drain():
+        batch = []
+        if OperationLogBuffer._queue is not None and OperationLogBuffer._pid == os.getpid():
+            while True:
+                try:
+                    batch.append(OperationLogBuffer._queue.get_nowait())
+                except queue.Empty:
+                    break
+        return batch
+
+    @staticmethod
+    def flush():
+        """Сохранить все записи из очереди (завершение процесса, тесты)"""
+        batch = OperationLogBuffer._drain()
+        while batch:
+            OperationLogBuffer.write(batch[:OperationLogBuffer.get_batch_size()])
+            batch = batch[OperationLogBuffer.get_batch_size():]
+
+    @staticmethod
+    def write(batch):
+        """Сохранить пачку записей (при ошибке БД - в файл)"""
+        with OperationLogBuffer._flush_lock:
+            try:
+                OperationLogBuffer._bulk_create(batch)
+            except Exception as e:
+                logger.error(f"Error writing {len(batch)} operation logs, spooling to disk: {e}")
+                OperationLogBuffer._spool(batch)
+                return False
+
+            OperationLogBuffer._replay_spool()
+            return True
+
+    @staticmethod
+    def _bulk_create(entries):
+        try:
+            OperationLogCompactor.compact(entries)
+            OperationLog.objects.bulk_create(entries)
+        except IntegrityError:
+            # Пользователь мог быть удален, пока запись ждала в очереди
+            user_ids = {entry.user_id for entry in entries if entry.user_id}
+            existing = set(User.objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+            for entry in entries:
+                if entry.user_id not in existing:
+                    entry.user = None
+            OperationLog.objects.bulk_create(entries)
+
+    @staticmethod
+    def _spool(batch):
+        spool_dir = OperationLogBuffer.get_spool_dir()
+        path = os.path.join(spool_dir, f"{int(time.time())}_{os.getpid()}_{uuid.uuid4().hex[:8]}.jsonl")
+        try:
+            os.makedirs(spool_dir, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as spool_file:
+                for entry in batch:
+                    data = {field: getattr(entry, field) for field in OperationLogBuffer.SPOOL_FIELDS}
+                    data['description'] = entry.get_description()
+                    data['user_agent'] = entry.get_user_agent()
+                    data['timestamp'] = entry.timestamp.isoformat()
+                    spool_file.write(json.dumps(data, ensure_ascii=False, default=str) + '\n')
+        except Exception as e:
+            logger.error(f"Error spooling operation logs to {path}: {e}")
+
+    @staticmethod
+    def _replay_spool():
+        """Загрузить в БД записи, отложенные в файлы"""
+        spool_dir = OperationLogBuffer.get_spool_dir()
+        if not os.path.isdir(spool_dir):
+            return
+
+        for name in sorted(os.listdir(spool_dir)):
+            path = os.path.join(spool_dir, name)
+            try:
+                with open(path, encoding='utf-8') as spool_file:
+                    entries = []
+                    for line in spool_file:
+                        data = json.loads(line)
+                        data['timestamp'] = parse_datetime(data['timestamp'])
+                        entries.append(OperationLog(**data))
+                OperationLogBuffer._bulk_create(entries)
+                os.remove(path)
+                logger.info(f"Replayed {len(entries)} spooled operation logs from {name}")
+            except Exception as e:
+                logger.error(f"Error replaying operation log spool {name}: {e}")
+                return
+
+
+class OperationLogCompactor:
+    """
+    Компактное хранение журнала операций (OPERATION_LOG_COMPACT)
+
+    Описание раскладывается на шаблон и параметры: числа, даты, email и текст в
+    кавычках становятся параметрами, остальной текст - шаблоном. Шаблоны и строки
+    User-Agent хранятся один раз в справочниках (LogTemplate, UserAgent), запись
+    журнала ссылается на них. Справочники заполняются при сохранении пачки.
+    """
+
+    PARAM_PATTERN = re.compile(
+        r"'[^']*'"
+        r'|"[^"]*"'
+        r'|«[^»]*»'
+        r'|[\w.+-]+@[\w-]+(?:\.[\w-]+)+'
+        r'|\d+(?:[.:,/-]\d+)*'
+    )
+
+    @staticmethod
+    def is_enabled():
+        return getattr(settings, 'OPERATION_LOG_COMPACT', True)
+
+    @staticmethod
+    def split_description(description):
+        """Описание → (шаблон для str.format, параметры)"""
+        parts, params = [], []
+        position = 0
+        for match in OperationLogCompactor.PARAM_PATTERN.finditer(description):
+            parts.append(description[position:match.start()].replace('{', '{{').replace('}', '}}'))
+            parts.append('{}')
+            params.append(match.group())
+            position = match.end()
+        parts.append(description[position:].replace('{', '{{').replace('}', '}}'))
+        return ''.join(parts), params
+
+    @staticmethod
+    def get_hash(value):
+        return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def intern(model, hash_field, value_field, values):
+        """Строки справочника: {хэш: объект} (недостающие создаются)"""
+        values = {OperationLogCompactor.get_hash(value): value for value in values}
+        if not values:
+            return {}
+
+        def load():
+            return {
+                getattr(obj, hash_field): obj
+                for obj in model.objects.filter(**{f'{hash_field}__in': list(values)})
+            }
+
+        found = load()
+        missing = [
+            model(**{hash_field: value_hash, value_field: value})
+            for value_hash, value in values.items() if value_hash not in found
+        ]
+        if missing:
+            # Параллельный процесс мог создать те же строки
+            model.objects.bulk_create(missing, ignore_conflicts=True)
+            found = load()
+        return found
+
+    @staticmethod
+    def compact(entries):
+        """Перевести несохраненные записи на справочники"""
+        if not OperationLogCompactor.is_enabled():
+            return
+
+        entries = [entry for entry in entries if entry.template_id is None and entry.description]
+        if not entries:
+            return
+
+        splits = [OperationLogCompactor.split_description(entry.description) for entry in entries]
+        templates = OperationLogCompactor.intern(
+            LogTemplate, 'text_hash', 'text', {template for template, _ in splits}
+        )
+        user_agents = OperationLogCompactor.intern(
+            UserAgent, 'value_hash', 'value', {entry.user_agent for entry in entries if entry.user_agent}
+        )
+
+        get_hash = OperationLogCompactor.get_hash
+        for entry, (template, params) in zip(entries, splits):
+            entry.template = templates[get_hash(template)]
+            entry.template_params = params
+            entry.description = ''
+            if entry.user_agent:
+                entry.user_agent_ref = user_agents[get_hash(entry.user_agent)]
+                entry.user_agent = None
+
+
 class OperationLogger:
     """Утилита для логирования операций в системе"""
 
@@ -57,10 +335,10 @@ class OperationLogger:
                 additional_data=additional_data,
                 timestamp=timezone.now()
             )
-            log_entry.save()
+            OperationLogBuffer.add(log_entry)
 
             # Также пишем в системный лог
-            logger.info(f"Operation logged: {action_type} - {module_type} - {description}")
+            logger.debug(f"Operation logged: {action_type} - {module_type} - {description}")
 
             return log_entry
 
@@ -156,7 +434,7 @@ class OperationLogger:
                              additional_data=None):
         """Логирование системных операций (без request)"""
         try:
-            OperationLog.objects.create(
+            OperationLogBuffer.add(OperationLog(
                 user=None,  # Системная операция
                 action_type=action_type,
                 module_type=module_type,
@@ -165,7 +443,7 @@ class OperationLogger:
                 object_repr=object_repr,
                 additional_data=additional_data,
                 timestamp=timezone.now()
-            )
-            logger.info(f"System operation logged: {action_type} - {module_type} - {description}")
+            ))
+            logger.debug(f"System operation logged: {action_type} - {module_type} - {description}")
         except Exception as e:
             logger.error(f"Error logging system operation: {e}")
\ No newline at end of file
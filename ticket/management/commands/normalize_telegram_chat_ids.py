@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from ticket.models import User
+
+
+class Command(BaseCommand):
+    help = ('Prepare User.telegram_chat_id for the integer unique column: unlink invalid '
+            'and duplicate chat ids (run before migrate)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only show what would be changed'
+        )
+
+    @staticmethod
+    def read_rows():
+        """[(id, chat id, подтвержден), ...] пользователей с chat id"""
+        table = User._meta.db_table
+        column = User._meta.get_field('telegram_chat_id').column
+
+        # Читаем столбец напрямую: до миграции он строковый
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT "id", "{column}", "is_telegram_verified" FROM "{table}" '
+                f'WHERE "{column}" IS NOT NULL ORDER BY "id"'
+            )
+            return cursor.fetchall()
+
+    @staticmethod
+    def plan(rows):
+        """
+        Изменения для строк read_rows()
+
+        Returns:
+            tuple: (некорректные id пользователей, [(id пользователя, chat id), ...] к приведению,
+                    id пользователей с дублирующимся chat id)
+        """
+        invalid, normalized, owners = [], [], {}
+        for user_id, value, verified in rows:
+            try:
+                chat_id = int(str(value).strip())
+            except ValueError:
+                invalid.append(user_id)
+                continue
+            if str(value) != str(chat_id):
+                normalized.append((user_id, chat_id))
+            owners.setdefault(chat_id, []).append((verified, user_id))
+
+        # Чат остается за подтвердившим привязку аккаунтом (при равенстве - за последним)
+        duplicates = []
+        for chat_id, users in owners.items():
+            users.sort()
+            duplicates.extend(user_id for _, user_id in users[:-1])
+        return invalid, normalized, duplicates
+
+    def handle(self, *args, **options):
+        table = User._meta.db_table
+        column = User._meta.get_field('telegram_chat_id').column
+        rows = self.read_rows()
+        invalid, normalized, duplicates = self.plan(rows)
+
+        self.stdout.write(
+            f"🔎 Chat id: {len(rows)}, некорректных: {len(invalid)}, "
+            f"к приведению: {len(normalized)}, дубликатов: {len(duplicates)}"
+        )
+        if options['dry_run']:
+            return
+
+        unlinked = set(invalid) | set(duplicates)
+        with transaction.atomic(), connection.cursor() as cursor:
+            if unlinked:
+                User.objects.filter(pk__in=unlinked).update(
+                    telegram_chat_id=None, is_telegram_verified=False
+                )
+            for user_id, chat_id in normalized:
+                if user_id not in unlinked:
+                    cursor.execute(f'UPDATE "{table}" SET "{column}" = %s WHERE "id" = %s', [str(chat_id), user_id])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Telegram chat ids normalized: {len(unlinked)} unlinked, {len(normalized)} rewritten')
+        )
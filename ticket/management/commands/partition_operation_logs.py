@@ -0,0 +1,81 @@
+from django.core.management.base import BaseCommand, CommandError
+from ticket.log_partition_utils import OperationLogPartitions
+
+
+class Command(BaseCommand):
+    help = 'Maintain monthly partitions of the operation log and archive entries past the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help='Convert the operation log table into a partitioned table (PostgreSQL, one-time)'
+        )
+        parser.add_argument(
+            '--noinput', '--no-input',
+            action='store_false',
+            dest='interactive',
+            help='Do not ask for confirmation before --convert'
+        )
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=None,
+            help='Create partitions for N months ahead (default - OPERATION_LOG_PARTITIONS_AHEAD)'
+        )
+        parser.add_argument(
+            '--retention-months',
+            type=int,
+            default=None,
+            help='Keep N full months of logs (default - OPERATION_LOG_RETENTION_MONTHS, 0 - keep all)'
+        )
+        parser.add_argument(
+            '--no-archive',
+            action='store_true',
+            help='Remove old entries without writing them to the archive'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show which months would be archived without changing anything'
+        )
+
+    def handle(self, *args, **options):
+        if options['convert']:
+            if not OperationLogPartitions.is_supported():
+                raise CommandError('Partitioning requires PostgreSQL')
+            self.stdout.write(self.style.WARNING(
+                "⚠️ Таблица журнала будет пересоздана и заблокирована на время копирования. "
+                "Сделайте резервную копию и проверьте преобразование на копии базы."
+            ))
+            if options['interactive'] and input("Продолжить? (yes/no): ").strip().lower() != 'yes':
+                raise CommandError('Conversion cancelled')
+            self.stdout.write("🗂 Преобразование журнала операций в секционированную таблицу...")
+            copied = OperationLogPartitions.convert(months_ahead=options['months_ahead'])
+            self.stdout.write(f"   Перенесено записей: {copied}")
+
+        if OperationLogPartitions.is_partitioned():
+            created = OperationLogPartitions.ensure_partitions(months_ahead=options['months_ahead'])
+            for name in created:
+                self.stdout.write(f"➕ Создана секция {name}")
+        elif OperationLogPartitions.is_supported():
+            self.stdout.write("⚠️ Таблица журнала не секционирована (запустите команду с --convert)")
+
+        retention_months = options['retention_months']
+        if retention_months is None:
+            retention_months = OperationLogPartitions.get_retention_months()
+
+        processed = []
+        if retention_months > 0:
+            processed = OperationLogPartitions.apply_retention(
+                retention_months=retention_months,
+                archive=not options['no_archive'],
+                dry_run=options['dry_run']
+            )
+            for month, count in processed:
+                prefix = '🔍 Будет архивирован' if options['dry_run'] else '📦 Архивирован'
+                self.stdout.write(f"{prefix} {month:%m.%Y}: {count} записей")
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Operation log maintenance finished: {len(processed)} months past retention')
+        )
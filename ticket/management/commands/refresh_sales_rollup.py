@@ -0,0 +1,50 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from ticket.rollup_utils import SalesRollup
+
+
+class Command(BaseCommand):
+    help = 'Refresh pre-aggregated daily sales (DailySalesRollup)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Rebuild rollup for the whole sales history'
+        )
+        parser.add_argument(
+            '--from',
+            dest='from_date',
+            type=str,
+            help='Refresh starting from specific date (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--to',
+            dest='to_date',
+            type=str,
+            help='Refresh up to specific date (YYYY-MM-DD), default - today'
+        )
+
+    def parse_date(self, value):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Invalid date: {value} (expected YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        start_date = self.parse_date(options['from_date']) if options.get('from_date') else None
+        end_date = self.parse_date(options['to_date']) if options.get('to_date') else None
+
+        # По умолчанию - инкрементально: с последнего пересчитанного дня
+        if not options.get('full') and start_date is None:
+            state = SalesRollup.get_state()
+            if state and state.refreshed_until:
+                start_date = state.refreshed_until
+
+        self.stdout.write(f"🔄 Пересчет агрегатов продаж с {start_date or 'начала'} по {end_date or 'сегодня'}...")
+
+        rows = SalesRollup.refresh(start_date=start_date, end_date=end_date)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Sales rollup refreshed: {rows} rows')
+        )
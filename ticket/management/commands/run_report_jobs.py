@@ -0,0 +1,33 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from ticket.report_job_utils import ReportJobService
+
+
+class Command(BaseCommand):
+    help = 'Run queued report jobs (e.g. left pending after a restart) and clean up old ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Maximum number of jobs to run'
+        )
+        parser.add_argument(
+            '--cleanup-days',
+            type=int,
+            default=1,
+            help='Delete jobs older than N days (0 - keep all)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("📊 Выполнение заданий отчетов из очереди...")
+        processed = ReportJobService.process_pending(limit=options.get('limit'))
+
+        deleted = 0
+        if options['cleanup_days'] > 0:
+            deleted = ReportJobService.cleanup(timedelta(days=options['cleanup_days']))
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Report jobs processed: {processed}, old jobs deleted: {deleted}')
+        )
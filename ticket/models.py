@@ -3,7 +3,7 @@ logger = logging.getLogger(__name__)
 from audioop import reverse
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from datetime import timedelta
 from django.core.exceptions import ValidationError
@@ -46,7 +46,9 @@ class User(AbstractUser):
     number = models.CharField(max_length=20)
 
     # Telegram fields
-    telegram_chat_id = models.CharField(max_length=15, blank=True, null=True)
+    # Один чат - один аккаунт. Перед миграцией со строкового столбца:
+    # python manage.py normalize_telegram_chat_ids
+    telegram_chat_id = models.BigIntegerField(blank=True, null=True, unique=True)
     telegram_username = models.CharField(max_length=32, blank=True, null=True)
     is_telegram_verified = models.BooleanField(default=False)
     telegram_verification_code = models.CharField(max_length=10, blank=True, null=True)
@@ -248,7 +250,9 @@ class Hall(models.Model):
         except Exception as e:
             logger.error(f"Error in cascade delete for hall {self.name}: {e}")
 
+        hall_id = self.pk
         super().delete(*args, **kwargs)
+        Hall.invalidate_seat_layout(hall_id)
 
     def save(self, *args, **kwargs):
         logger.info(f"Сохранение зала {self.name}, новый: {self._state.adding}")
@@ -258,6 +262,17 @@ class Hall(models.Model):
             logger.info(f"Создаю места для нового зала {self.name}")
             self.create_seats()
 
+        Hall.invalidate_seat_layout(self.pk)
+
+    @staticmethod
+    def invalidate_seat_layout(hall_id):
+        """Сбросить кэшированную схему мест зала (сейчас и после фиксации транзакции)"""
+        from django.db import transaction
+        from .seat_utils import HallLayoutCache
+
+        HallLayoutCache.invalidate(hall_id)
+        transaction.on_commit(lambda: HallLayoutCache.invalidate(hall_id))
+
     def create_seats(self):
         logger.info(f"Создание мест для зала {self.name}: {self.rows} рядов × {self.seats_per_row} мест")
         for row in range(1, self.rows + 1):
@@ -388,8 +403,10 @@ class Screening(models.Model):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         # Сохраняем старые значения, но только если они существуют
-        self._old_hall = self.hall if self.pk else None
+        # (id зала, а не объект - иначе каждый загруженный сеанс делает запрос к залу)
+        self._old_hall_id = self.hall_id if self.pk else None
         self._old_start_time = self.start_time if self.pk else None
+        self._old_price = self.price if self.pk else None
 
     def clean(self):
         # ВАЖНО: Сначала рассчитываем end_time если нужно
@@ -510,8 +527,8 @@ class Screening(models.Model):
                 self.price = 350
         else:
             # Для существующего объекта проверяем, изменились ли зал или время
-            if self._old_hall is not None or self._old_start_time is not None:
-                if (self.hall != self._old_hall) or (self.start_time != self._old_start_time):
+            if self._old_hall_id is not None or self._old_start_time is not None:
+                if (self.hall_id != self._old_hall_id) or (self.start_time != self._old_start_time):
                     if self.hall and self.start_time:
                         self.price = self.calculate_ticket_price()
 
@@ -519,10 +536,16 @@ class Screening(models.Model):
         self.clean()
         super().save(*args, **kwargs)
 
+        # Агрегаты продаж хранят выручку по старой цене - до пересчета отчеты строятся по билетам
+        if self._old_price is not None and self.price != self._old_price:
+            from .rollup_utils import SalesRollup
+            SalesRollup.mark_stale(f'price of screening {self.pk} changed')
+
         # Обновляем старые значения
         if self.pk:
-            self._old_hall = self.hall
+            self._old_hall_id = self.hall_id
             self._old_start_time = self.start_time
+            self._old_price = self.price
 
     def __str__(self):
         if self.movie and self.hall and self.start_time:
@@ -676,6 +699,9 @@ class Ticket(models.Model):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        # Статус на момент загрузки (сохранения) - обработчики post_save видят смену статуса
+        self._loaded_status_id = self.status_id if self.pk else None
+
         # Устанавливаем статус по умолчанию при создании
         if not self.pk and not self.status_id:
             try:
@@ -689,23 +715,28 @@ class Ticket(models.Model):
         # Автоматически устанавливаем статус при первом сохранении
         if not self.pk and not self.status_id:
             try:
-                active_status = TicketStatus.objects.filter(code='active', is_active=True).first()
-                if active_status:
-                    self.status = active_status
-                else:
-                    # Создаем статус по умолчанию, если его нет
-                    active_status = TicketStatus.objects.create(
-                        code='active',
-                        name='Активный',
-                        description='Билет активен и действителен',
-                        is_active=True,
-                        can_be_refunded=True
-                    )
-                    self.status = active_status
+                self.status = Ticket.get_active_status()
             except Exception as e:
                 logger.error(f"Error setting default ticket status: {e}")
 
         super().save(*args, **kwargs)
+        # Обновляется после всех обработчиков post_save
+        self._loaded_status_id = self.status_id
+
+    @staticmethod
+    def get_active_status():
+        """Статус 'active' для новых билетов (создается, если его нет)"""
+        active_status = TicketStatus.objects.filter(code='active', is_active=True).first()
+        if not active_status:
+            # Создаем статус по умолчанию, если его нет
+            active_status = TicketStatus.objects.create(
+                code='active',
+                name='Активный',
+                description='Билет активен и действителен',
+                is_active=True,
+                can_be_refunded=True
+            )
+        return active_status
 
     def can_be_refunded(self):
         """Проверяет, можно ли вернуть билет с учетом всех условий"""
@@ -829,6 +860,58 @@ def create_hall_seats(sender, instance, created, **kwargs):
                     row=row,
                     number=seat_num
                 )
+        Hall.invalidate_seat_layout(instance.pk)
+
+
+@receiver(post_save, sender=Ticket)
+def invalidate_ticket_artifacts_on_save(sender, instance, created, raw=False, **kwargs):
+    """Готовые PDF/QR группы устаревают при смене статуса билета (возврат)"""
+    if raw or created or instance._loaded_status_id == instance.status_id:
+        return
+    from django.db import transaction
+    from .ticket_artifact_utils import TicketArtifactStore
+
+    group_key = TicketArtifactStore.group_key(instance)
+    transaction.on_commit(lambda: TicketArtifactStore.invalidate(group_key))
+
+
+@receiver(post_delete, sender=Ticket)
+def invalidate_ticket_artifacts_on_delete(sender, instance, **kwargs):
+    from django.db import transaction
+    from .ticket_artifact_utils import TicketArtifactStore
+
+    group_key = TicketArtifactStore.group_key(instance)
+    transaction.on_commit(lambda: TicketArtifactStore.invalidate(group_key))
+
+
+@receiver(post_save, sender=Ticket)
+def update_sales_rollup_on_save(sender, instance, created, raw=False, **kwargs):
+    """Поддержание агрегатов продаж при покупке и смене статуса билета"""
+    if raw:
+        return
+    from .rollup_utils import SalesRollup
+
+    if created:
+        SalesRollup.record_tickets([instance])
+    elif instance._loaded_status_id != instance.status_id:
+        SalesRollup.record_status_change(instance, instance._loaded_status_id)
+
+
+@receiver(post_delete, sender=Ticket)
+def update_sales_rollup_on_delete(sender, instance, **kwargs):
+    from .rollup_utils import SalesRollup
+    SalesRollup.record_tickets([instance], delta=-1, status_id=instance._loaded_status_id or instance.status_id)
+
+
+def invalidate_home_page_cache(sender, **kwargs):
+    """Сброс кэша главной страницы при изменении афиши"""
+    from .cache_utils import HomePageCache
+    HomePageCache.invalidate()
+
+
+for _model in (Screening, Movie, Hall, Genre, AgeRating):
+    post_save.connect(invalidate_home_page_cache, sender=_model, dispatch_uid=f'home_page_cache_save_{_model.__name__}')
+    post_delete.connect(invalidate_home_page_cache, sender=_model, dispatch_uid=f'home_page_cache_delete_{_model.__name__}')
 
 
 class BackupManager(models.Model):
@@ -1002,6 +1085,178 @@ class Report(models.Model):
         return "Система отчетности"
 
 
+class DailySalesRollup(models.Model):
+    """Предагрегированные продажи за день: (дата покупки, фильм, зал, статус) → билеты и выручка"""
+    date = models.DateField(verbose_name='Дата покупки')
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, verbose_name='Фильм')
+    hall = models.ForeignKey(Hall, on_delete=models.CASCADE, verbose_name='Зал')
+    status = models.ForeignKey(TicketStatus, on_delete=models.CASCADE, verbose_name='Статус билета')
+    tickets_sold = models.IntegerField(default=0, verbose_name='Билетов')
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Выручка')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Продажи за день"
+        verbose_name_plural = "Продажи по дням"
+        unique_together = ('date', 'movie', 'hall', 'status')
+        indexes = [
+            models.Index(fields=['date']),
+            models.Index(fields=['status', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.movie_id}/{self.hall_id}/{self.status_id}: {self.tickets_sold}"
+
+
+class SalesRollupState(models.Model):
+    """Покрытие таблицы DailySalesRollup (одна запись)"""
+    covered_from = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name='Покрыто с даты',
+        help_text='Пусто - с первой продажи'
+    )
+    refreshed_until = models.DateField(null=True, blank=True, verbose_name='Пересчитано по дату')
+    refreshed_at = models.DateTimeField(null=True, blank=True, verbose_name='Последний пересчет')
+
+    class Meta:
+        verbose_name = "Состояние агрегатов продаж"
+        verbose_name_plural = "Состояние агрегатов продаж"
+
+    def __str__(self):
+        return f"Агрегаты продаж с {self.covered_from or 'начала'} по {self.refreshed_until}"
+
+    def covers(self, start_date=None, end_date=None):
+        """Покрывает ли таблица агрегатов период (дни после пересчета поддерживаются хуками билетов)"""
+        if self.refreshed_until is None:
+            return False
+        if self.covered_from is None:
+            return True
+        return start_date is not None and start_date >= self.covered_from
+
+
+class ReportJob(models.Model):
+    """Фоновое построение отчета: данные и PDF хранятся под хэшем параметров"""
+
+    STATUS_CHOICES = [
+        ('pending', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Готов'),
+        ('failed', 'Ошибка'),
+    ]
+
+    key = models.CharField(max_length=64, verbose_name='Хэш параметров')
+    report_type = models.CharField(max_length=20, verbose_name='Тип отчета')
+    period = models.CharField(max_length=20, blank=True, verbose_name='Период')
+    start_date = models.DateField(null=True, blank=True, verbose_name='Начальная дата')
+    end_date = models.DateField(null=True, blank=True, verbose_name='Конечная дата')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name='Статус')
+    title = models.CharField(max_length=200, blank=True, verbose_name='Заголовок')
+    result = models.JSONField(null=True, blank=True, verbose_name='Данные отчета')
+    pdf = models.BinaryField(null=True, blank=True, verbose_name='PDF')
+    error = models.TextField(blank=True, verbose_name='Ошибка')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                     verbose_name='Запросил')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создан')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Начат')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Завершен')
+
+    class Meta:
+        verbose_name = "Задание отчета"
+        verbose_name_plural = "Задания отчетов"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['key', 'status']),
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.report_type} {self.start_date or '...'} - {self.end_date or '...'} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
+
+
+class TelegramNotification(models.Model):
+    """Очередь уведомлений Telegram: веб-процесс добавляет, процесс бота отправляет"""
+
+    KIND_CHOICES = [
+        ('purchase', 'Покупка билетов'),
+        ('reminder', 'Напоминание о сеансе'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'В очереди'),
+        ('sending', 'Отправляется'),
+        ('sent', 'Отправлено'),
+        ('failed', 'Ошибка'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='telegram_notifications',
+        verbose_name='Пользователь'
+    )
+    chat_id = models.CharField(max_length=32, verbose_name='Telegram chat id')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name='Тип')
+    text = models.TextField(verbose_name='Текст')
+    payload = models.JSONField(null=True, blank=True, verbose_name='Данные')
+    # Ключ однократной отправки (напоминания): повторная постановка в очередь игнорируется
+    dedup_key = models.CharField(max_length=100, null=True, blank=True, unique=True, verbose_name='Ключ')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending', verbose_name='Статус')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')
+    error = models.TextField(blank=True, default='', verbose_name='Ошибка')
+    available_at = models.DateTimeField(default=timezone.now, verbose_name='Отправить после')
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name='Отправлено')
+
+    class Meta:
+        verbose_name = 'Уведомление Telegram'
+        verbose_name_plural = 'Уведомления Telegram'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} → {self.chat_id} ({self.get_status_display()})"
+
+
+class UserAgent(models.Model):
+    """Уникальные строки User-Agent журнала операций"""
+    value = models.TextField(verbose_name='User Agent')
+    value_hash = models.CharField(max_length=64, unique=True, verbose_name='Хэш')
+
+    class Meta:
+        verbose_name = 'User Agent'
+        verbose_name_plural = 'User Agents'
+
+    def __str__(self):
+        return self.value[:100]
+
+
+class LogTemplate(models.Model):
+    """Шаблон описания операции (значения подставляются из OperationLog.template_params)"""
+    text = models.TextField(verbose_name='Шаблон')
+    text_hash = models.CharField(max_length=64, unique=True, verbose_name='Хэш')
+
+    class Meta:
+        verbose_name = 'Шаблон описания'
+        verbose_name_plural = 'Шаблоны описаний'
+
+    def __str__(self):
+        return self.text[:100]
+
+    def render(self, params):
+        try:
+            return self.text.format(*(params or []))
+        except (IndexError, KeyError, ValueError):
+            return self.text
+
+
 class OperationLog(models.Model):
     """Модель для логирования операций в системе"""
 
@@ -1047,9 +1302,27 @@ class OperationLog(models.Model):
         choices=MODULE_TYPES,
         verbose_name='Модуль'
     )
-    description = models.TextField(verbose_name='Описание')
+    description = models.TextField(blank=True, default='', verbose_name='Описание')
     ip_address = models.GenericIPAddressField(null=True, blank=True, verbose_name='IP адрес')
     user_agent = models.TextField(null=True, blank=True, verbose_name='User Agent')
+    # Компактное хранение (OPERATION_LOG_COMPACT): вместо description и user_agent
+    template = models.ForeignKey(
+        LogTemplate,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='Шаблон описания'
+    )
+    template_params = models.JSONField(null=True, blank=True, verbose_name='Параметры описания')
+    user_agent_ref = models.ForeignKey(
+        UserAgent,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name='User Agent (справочник)'
+    )
     object_id = models.IntegerField(null=True, blank=True, verbose_name='ID объекта')
     object_repr = models.CharField(max_length=100, null=True, blank=True, verbose_name='Объект')
     additional_data = models.JSONField(null=True, blank=True, verbose_name='Дополнительные данные')
@@ -1069,6 +1342,17 @@ class OperationLog(models.Model):
     def __str__(self):
         return f"{self.get_action_type_display()} - {self.get_module_type_display()} - {self.timestamp.strftime('%d.%m.%Y %H:%M')}"
 
+    def get_description(self):
+        """Описание операции (из шаблона при компактном хранении)"""
+        if self.template_id:
+            return self.template.render(self.template_params)
+        return self.description
+
+    def get_user_agent(self):
+        if self.user_agent_ref_id:
+            return self.user_agent_ref.value
+        return self.user_agent
+
     def get_additional_data_display(self):
         """Форматированный вывод дополнительных данных"""
         if self.additional_data:
@@ -0,0 +1,235 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import TelegramNotification, Ticket
+
+logger = logging.getLogger(__name__)
+
+
+class TelegramNotificationQueue:
+    """
+    Очередь уведомлений Telegram в БД
+
+    Веб-процесс только добавляет запись (без обращений к Telegram), процесс бота
+    (run_bot) забирает пачки записей и отправляет их в своем event loop.
+    Неудачная отправка повторяется с растущей задержкой.
+    """
+
+    @staticmethod
+    def get_max_attempts():
+        return getattr(settings, 'TELEGRAM_NOTIFICATION_MAX_ATTEMPTS', 5)
+
+    @staticmethod
+    def get_claim_timeout():
+        return getattr(settings, 'TELEGRAM_NOTIFICATION_CLAIM_TIMEOUT', 5 * 60)
+
+    @staticmethod
+    def format_purchase(tickets):
+        """Текст уведомления о покупке билетов"""
+        if not tickets:
+            return ""
+
+        screening = tickets[0].screening
+
+        # Правильно конвертируем время в локальный часовой пояс
+        local_start_time = timezone.localtime(screening.start_time)
+
+        seats_info = ", ".join([f"Ряд {t.seat.row}-{t.seat.number}" for t in tickets])
+        total_price = sum(t.screening.price for t in tickets)
+
+        message = (
+            "🎫 <b>Покупка билетов подтверждена!</b>\n\n"
+            f"<b>Фильм:</b> {screening.movie.title}\n"
+            f"<b>Дата и время:</b> {local_start_time.strftime('%d.%m.%Y %H:%M')}\n"
+            f"<b>Зал:</b> {screening.hall.name}\n"
+            f"<b>Места:</b> {seats_info}\n"
+            f"<b>Общая стоимость:</b> {total_price} ₽\n\n"
+            "📥 <b>Скачать билеты:</b> Нажмите '🎫 Мои билеты' в боте\n\n"
+            "Или перейдите в личный кабинет на сайте для скачивания."
+        )
+        return message
+
+    @staticmethod
+    def get_reminder_windows():
+        """За сколько минут до начала сеанса отправляются напоминания"""
+        return getattr(settings, 'TELEGRAM_REMINDER_WINDOWS', [24 * 60, 60])
+
+    @staticmethod
+    def format_window(minutes):
+        if minutes % (24 * 60) == 0:
+            days = minutes // (24 * 60)
+            return "завтра" if days == 1 else f"через {days} дн."
+        if minutes % 60 == 0:
+            hours = minutes // 60
+            return "через час" if hours == 1 else f"через {hours} ч."
+        return f"через {minutes} мин."
+
+    @staticmethod
+    def format_reminder(tickets, minutes):
+        """Текст напоминания о сеансе"""
+        screening = tickets[0].screening
+        local_start_time = timezone.localtime(screening.start_time)
+        seats_info = ", ".join([f"Ряд {t.seat.row}-{t.seat.number}" for t in tickets])
+
+        return (
+            f"⏰ <b>Напоминание: сеанс {TelegramNotificationQueue.format_window(minutes)}</b>\n\n"
+            f"<b>Фильм:</b> {screening.movie.title}\n"
+            f"<b>Дата и время:</b> {local_start_time.strftime('%d.%m.%Y %H:%M')}\n"
+            f"<b>Зал:</b> {screening.hall.name}\n"
+            f"<b>Места:</b> {seats_info}\n\n"
+            "📥 Билеты можно скачать в разделе '🎫 Мои билеты'"
+        )
+
+    @staticmethod
+    def enqueue_reminders(since, until):
+        """
+        Поставить в очередь напоминания о сеансах, для которых момент
+        отправки (start_time - окно) попадает в интервал (since, until]
+
+        Все окна проверяются одним запросом по индексу Screening.start_time,
+        поэтому нагрузка зависит от числа билетов в интервале, а не от
+        расписания. Напоминание - одно на группу билетов и окно (dedup_key),
+        повторный проход по тому же интервалу (после перезапуска) ничего не
+        добавляет.
+
+        Returns:
+            int: число новых напоминаний
+        """
+        windows = TelegramNotificationQueue.get_reminder_windows()
+        if not windows or until <= since:
+            return 0
+
+        ranges = Q()
+        for minutes in windows:
+            ranges |= Q(
+                screening__start_time__gt=since + timedelta(minutes=minutes),
+                screening__start_time__lte=until + timedelta(minutes=minutes)
+            )
+        tickets = (
+            Ticket.objects.filter(ranges)
+            .filter(status__code='active', user__is_telegram_verified=True, user__telegram_chat_id__isnull=False)
+            .select_related('screening__movie', 'screening__hall', 'seat', 'user')
+            .order_by('screening__start_time', 'seat__row', 'seat__number')
+        )
+
+        groups = {}
+        for ticket in tickets:
+            key = ticket.group_id or f"single_{ticket.pk}"
+            groups.setdefault(key, []).append(ticket)
+
+        notifications = []
+        for key, group in groups.items():
+            first = group[0]
+            before = first.screening.start_time
+            for minutes in windows:
+                send_at = before - timedelta(minutes=minutes)
+                if not since < send_at <= until:
+                    continue
+                notifications.append(TelegramNotification(
+                    user=first.user,
+                    chat_id=first.user.telegram_chat_id,
+                    kind='reminder',
+                    text=TelegramNotificationQueue.format_reminder(group, minutes),
+                    payload={
+                        'ticket_id': first.id,
+                        'group_id': first.group_id,
+                        'ticket_count': len(group),
+                        'movie_title': first.screening.movie.title,
+                        'minutes_before': minutes,
+                    },
+                    dedup_key=f"reminder:{minutes}:{key}"
+                ))
+        if not notifications:
+            return 0
+
+        existing = set(TelegramNotification.objects.filter(
+            dedup_key__in=[n.dedup_key for n in notifications]
+        ).values_list('dedup_key', flat=True))
+        notifications = [n for n in notifications if n.dedup_key not in existing]
+        # ignore_conflicts - на случай параллельного прохода
+        TelegramNotification.objects.bulk_create(notifications, ignore_conflicts=True)
+        return len(notifications)
+
+    @staticmethod
+    def enqueue(user, kind, text, payload=None):
+        """Добавить уведомление (None - Telegram не привязан)"""
+        if not (user.is_telegram_verified and user.telegram_chat_id):
+            return None
+        return TelegramNotification.objects.create(
+            user=user,
+            chat_id=user.telegram_chat_id,
+            kind=kind,
+            text=text,
+            payload=payload
+        )
+
+    @staticmethod
+    def enqueue_purchase(user, tickets):
+        if not tickets or not (user.is_telegram_verified and user.telegram_chat_id):
+            return None
+
+        # Места и сеанс для текста - одним запросом
+        tickets = list(
+            Ticket.objects.filter(pk__in=[t.pk for t in tickets])
+            .select_related('screening__movie', 'screening__hall', 'seat')
+            .order_by('seat__row', 'seat__number')
+        )
+        return TelegramNotificationQueue.enqueue(
+            user,
+            'purchase',
+            TelegramNotificationQueue.format_purchase(tickets),
+            payload={
+                'ticket_id': tickets[0].id,
+                'group_id': tickets[0].group_id,
+                'ticket_count': len(tickets),
+                'movie_title': tickets[0].screening.movie.title,
+            }
+        )
+
+    @staticmethod
+    def claim(limit):
+        """Забрать пачку уведомлений к отправке (одно уведомление - одному исполнителю)"""
+        now = timezone.now()
+        with transaction.atomic():
+            notifications = list(
+                TelegramNotification.objects.select_for_update(skip_locked=True)
+                .select_related('user')
+                .filter(status='pending', available_at__lte=now)
+                .order_by('available_at', 'id')[:limit]
+            )
+            if notifications:
+                TelegramNotification.objects.filter(pk__in=[n.pk for n in notifications]).update(
+                    status='sending', claimed_at=now
+                )
+        return notifications
+
+    @staticmethod
+    def mark_sent(notification):
+        TelegramNotification.objects.filter(pk=notification.pk).update(
+            status='sent', sent_at=timezone.now(), attempts=notification.attempts + 1, error=''
+        )
+
+    @staticmethod
+    def mark_failed(notification, error, retry=True, retry_after=None):
+        """Ошибка отправки: повтор с задержкой 2^попытка минут или окончательный отказ"""
+        attempts = notification.attempts + 1
+        if retry and attempts < TelegramNotificationQueue.get_max_attempts():
+            delay = timedelta(seconds=retry_after) if retry_after else timedelta(minutes=2 ** (attempts - 1))
+            TelegramNotification.objects.filter(pk=notification.pk).update(
+                status='pending', attempts=attempts, error=str(error), available_at=timezone.now() + delay
+            )
+            return False
+
+        TelegramNotification.objects.filter(pk=notification.pk).update(
+            status='failed', attempts=attempts, error=str(error)
+        )
+        return True
+
+    @staticmethod
+    def release_stale():
+        """Вернуть в очередь уведомления, оставшиеся в отправке после падения бота"""
+        cutoff = timezone.now() - timedelta(seconds=TelegramNotificationQueue.get_claim_timeout())
+        return TelegramNotification.objects.filter(status='sending', claimed_at__lt=cutoff).update(status='pending')
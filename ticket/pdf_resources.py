@@ -0,0 +1,233 @@
+import logging
+import os
+import threading
+from django.conf import settings
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import TableStyle
+
+logger = logging.getLogger(__name__)
+
+
+class PdfResources:
+    """
+    Общие ресурсы ReportLab для билетов, отчетов и экспорта логов
+
+    Шрифты регистрируются один раз на процесс, стили абзацев и таблиц создаются
+    при первом обращении и дальше переиспользуются (ReportLab их не изменяет).
+    """
+
+    FONT_FILES = {
+        'DejaVuSans': 'DejaVuSans.ttf',
+        'DejaVuSans-Bold': 'DejaVuSans-Bold.ttf',
+    }
+
+    # Роль шрифта → (шрифт DejaVu, запасной встроенный шрифт)
+    FONT_ROLES = {
+        'regular': ('DejaVuSans', 'Helvetica'),
+        'bold': ('DejaVuSans-Bold', 'Helvetica-Bold'),
+        'heading': ('DejaVuSans', 'Helvetica-Bold'),
+        'italic': ('DejaVuSans', 'Helvetica-Oblique'),
+    }
+
+    PARAGRAPH_STYLES = {
+        # Билеты
+        'ticket_header': {'font': 'bold', 'fontSize': 12, 'alignment': TA_CENTER,
+                          'textColor': colors.black, 'spaceAfter': 6},
+        'ticket_title': {'font': 'bold', 'fontSize': 10, 'alignment': TA_LEFT,
+                         'textColor': colors.black, 'spaceAfter': 4},
+        'ticket_info': {'font': 'regular', 'fontSize': 9, 'alignment': TA_LEFT,
+                        'textColor': colors.black, 'spaceAfter': 3},
+        'ticket_small': {'font': 'regular', 'fontSize': 7, 'alignment': TA_CENTER, 'textColor': colors.grey},
+        'ticket_seat': {'font': 'bold', 'fontSize': 9, 'alignment': TA_CENTER, 'textColor': colors.black},
+        # Отчеты
+        'report_title': {'font': 'heading', 'fontSize': 14, 'spaceAfter': 20, 'alignment': TA_CENTER,
+                         'textColor': colors.black},
+        'report_filter': {'font': 'regular', 'fontSize': 9, 'spaceAfter': 15, 'alignment': TA_CENTER},
+        'report_period': {'font': 'regular', 'fontSize': 9, 'spaceAfter': 8, 'alignment': TA_CENTER},
+        'report_total': {'font': 'heading', 'fontSize': 10, 'spaceAfter': 6, 'textColor': colors.black,
+                         'alignment': TA_CENTER},
+        'report_share': {'font': 'heading', 'fontSize': 10, 'spaceBefore': 5, 'spaceAfter': 5,
+                         'textColor': colors.HexColor('#28A745'), 'alignment': TA_CENTER},
+        'report_cell': {'font': 'regular', 'fontSize': 9, 'wordWrap': 'CJK', 'alignment': TA_CENTER,
+                        'spaceBefore': 4, 'spaceAfter': 4},
+        'report_cell_bold': {'font': 'heading', 'fontSize': 9, 'wordWrap': 'CJK', 'alignment': TA_CENTER,
+                             'spaceBefore': 4, 'spaceAfter': 4},
+        # Экспорт логов
+        'log_title': {'font': 'heading', 'fontSize': 16, 'spaceAfter': 25, 'alignment': TA_CENTER,
+                      'textColor': colors.black},
+        'log_stats': {'font': 'regular', 'fontSize': 10, 'spaceAfter': 20, 'alignment': TA_CENTER},
+        'log_cell': {'font': 'regular', 'fontSize': 8, 'leading': 9, 'leftIndent': 0, 'rightIndent': 0,
+                     'wordWrap': 'LTR', 'spaceBefore': 0, 'spaceAfter': 0},
+        'log_info': {'font': 'italic', 'fontSize': 7, 'spaceAfter': 10, 'alignment': TA_LEFT,
+                     'textColor': colors.grey, 'leftIndent': 10},
+        'log_no_data': {'font': 'regular', 'fontSize': 12, 'spaceAfter': 20, 'alignment': TA_CENTER,
+                        'textColor': colors.grey},
+    }
+
+    _REPORT_TABLE = [
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ('BOX', (0, 0), (-1, -1), 1, colors.black),
+        # Чередование цветов строк
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [None, colors.HexColor('#F8F9FA')]),
+    ]
+
+    @staticmethod
+    def _report_table(header_background, header_text, padding):
+        return [
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(header_background)),
+            ('TEXTCOLOR', (0, 0), (-1, 0), header_text),
+            *PdfResources._REPORT_TABLE,
+            ('LEFTPADDING', (0, 0), (-1, -1), padding),
+            ('RIGHTPADDING', (0, 0), (-1, -1), padding),
+            ('TOPPADDING', (0, 0), (-1, -1), padding),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), padding),
+        ]
+
+    _lock = threading.RLock()
+    _fonts = None
+    _paragraph_styles = {}
+    _table_styles = {}
+
+    @staticmethod
+    def register_fonts():
+        """
+        Зарегистрировать шрифты DejaVu (один раз на процесс)
+
+        Returns:
+            bool: доступен ли основной шрифт с кириллицей
+        """
+        if PdfResources._fonts is None:
+            with PdfResources._lock:
+                if PdfResources._fonts is None:
+                    fonts_dir = os.path.join(settings.BASE_DIR, 'ticket', 'fonts')
+                    registered = set()
+                    for font_name, file_name in PdfResources.FONT_FILES.items():
+                        path = os.path.join(fonts_dir, file_name)
+                        try:
+                            if os.path.exists(path):
+                                pdfmetrics.registerFont(TTFont(font_name, path))
+                                registered.add(font_name)
+                        except Exception as e:
+                            logger.error(f"Error registering font {font_name}: {e}")
+                    PdfResources._fonts = frozenset(registered)
+        return 'DejaVuSans' in PdfResources._fonts
+
+    @staticmethod
+    def font(role='regular'):
+        """Имя шрифта для роли с учетом доступных шрифтов"""
+        PdfResources.register_fonts()
+        custom, fallback = PdfResources.FONT_ROLES[role]
+        return custom if custom in PdfResources._fonts else fallback
+
+    @staticmethod
+    def style(name):
+        """Именованный стиль абзаца из PARAGRAPH_STYLES"""
+        style = PdfResources._paragraph_styles.get(name)
+        if style is None:
+            attrs = dict(PdfResources.PARAGRAPH_STYLES[name])
+            style = PdfResources._build_style(name, PdfResources.font(attrs.pop('font')), attrs)
+        return style
+
+    @staticmethod
+    def cell_style(font_name, font_size, alignment=TA_CENTER):
+        """Стиль ячейки таблицы отчета с полным переносом текста"""
+        key = f'cell:{font_name}:{font_size}:{alignment}'
+        style = PdfResources._paragraph_styles.get(key)
+        if style is None:
+            style = PdfResources._build_style(key, font_name, {
+                'fontSize': font_size,
+                'alignment': alignment,
+                'wordWrap': 'CJK',
+                'spaceBefore': 2,
+                'spaceAfter': 2,
+            })
+        return style
+
+    @staticmethod
+    def _build_style(key, font_name, attrs):
+        with PdfResources._lock:
+            if key not in PdfResources._paragraph_styles:
+                PdfResources._paragraph_styles[key] = ParagraphStyle(name=key, fontName=font_name, **attrs)
+            return PdfResources._paragraph_styles[key]
+
+    @staticmethod
+    def sample_style(name='Normal'):
+        """Стиль из стандартного набора ReportLab"""
+        key = f'sample:{name}'
+        style = PdfResources._paragraph_styles.get(key)
+        if style is None:
+            with PdfResources._lock:
+                style = PdfResources._paragraph_styles.setdefault(key, getSampleStyleSheet()[name])
+        return style
+
+    @staticmethod
+    def table_style(name):
+        """Статичный стиль таблицы (билеты, отчеты, логи)"""
+        style = PdfResources._table_styles.get(name)
+        if style is not None:
+            return style
+
+        if name == 'ticket_seats':
+            commands = [
+                ('FONTNAME', (0, 0), (-1, 0), PdfResources.font('bold')),
+                ('FONTSIZE', (0, 0), (-1, 0), 9),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ]
+        elif name == 'ticket_divider':
+            commands = [('LINEABOVE', (0, 0), (-1, -1), 1, colors.black)]
+        elif name == 'centered':
+            commands = [('ALIGN', (0, 0), (-1, -1), 'CENTER')]
+        elif name == 'report_revenue':
+            commands = PdfResources._report_table('#2E86AB', colors.whitesmoke, 4)
+        elif name == 'report_movies':
+            commands = PdfResources._report_table('#28A745', colors.whitesmoke, 4)
+        elif name == 'report_halls':
+            commands = PdfResources._report_table('#FFC107', colors.black, 4)
+        elif name == 'report_sales':
+            commands = PdfResources._report_table('#6F42C1', colors.whitesmoke, 6)
+        elif name == 'logs':
+            commands = [
+                # Заголовок таблицы
+                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E86AB')),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+                ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
+                ('FONTNAME', (0, 0), (-1, 0), PdfResources.font('heading')),
+                ('FONTSIZE', (0, 0), (-1, 0), 9),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+                ('TOPPADDING', (0, 0), (-1, 0), 10),
+                # Стиль для данных
+                ('ALIGN', (0, 1), (-1, -1), 'LEFT'),
+                ('VALIGN', (0, 1), (-1, -1), 'TOP'),
+                ('FONTNAME', (0, 1), (-1, -1), PdfResources.font('regular')),
+                ('FONTSIZE', (0, 1), (-1, -1), 8),
+                # Отступы в ячейках
+                ('LEFTPADDING', (0, 0), (-1, -1), 6),
+                ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+                ('TOPPADDING', (0, 0), (-1, -1), 5),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+                # Границы и фон
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F8F9FA')]),
+            ]
+        else:
+            raise KeyError(name)
+
+        with PdfResources._lock:
+            return PdfResources._table_styles.setdefault(name, TableStyle(commands))
+
+    @staticmethod
+    def reset():
+        """Сбросить кэш стилей (шрифты ReportLab остаются зарегистрированными)"""
+        with PdfResources._lock:
+            PdfResources._fonts = None
+            PdfResources._paragraph_styles = {}
+            PdfResources._table_styles = {}
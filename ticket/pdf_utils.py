@@ -1,28 +1,14 @@
 from io import BytesIO
 from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-import os
-from django.conf import settings
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer
+from reportlab.lib.enums import TA_CENTER
 from reportlab.lib.units import mm
+from .pdf_resources import PdfResources
 
 
 def register_custom_fonts():
-    """Регистрация кастомных шрифтов"""
-    try:
-        fonts_dir = os.path.join(settings.BASE_DIR, 'ticket', 'fonts')
-        dejavu_sans_path = os.path.join(fonts_dir, 'DejaVuSans.ttf')
-
-        if os.path.exists(dejavu_sans_path):
-            pdfmetrics.registerFont(TTFont('DejaVuSans', dejavu_sans_path))
-            return True
-        return False
-    except Exception:
-        return False
+    """Регистрация кастомных шрифтов (один раз на процесс)"""
+    return PdfResources.register_fonts()
 
 
 def generate_pdf_report(data, report_type, title, filters):
@@ -37,14 +23,7 @@ def generate_pdf_report(data, report_type, title, filters):
     has_custom_font = register_custom_fonts()
 
     # Заголовок
-    title_style = ParagraphStyle(
-        name='CustomTitle',
-        fontName='DejaVuSans' if has_custom_font else 'Helvetica-Bold',
-        fontSize=14,
-        spaceAfter=20,
-        alignment=TA_CENTER,
-        textColor=colors.black
-    )
+    title_style = PdfResources.style('report_title')
 
     title_text = Paragraph(f"<b>Отчет кинотеатра: {title}</b>", title_style)
     elements.append(title_text)
@@ -57,13 +36,7 @@ def generate_pdf_report(data, report_type, title, filters):
         if filters.get('end_date'):
             filter_text += f"по {filters['end_date']}"
 
-        filter_style = ParagraphStyle(
-            name='FilterStyle',
-            fontName='DejaVuSans' if has_custom_font else 'Helvetica',
-            fontSize=9,
-            spaceAfter=15,
-            alignment=TA_CENTER
-        )
+        filter_style = PdfResources.style('report_filter')
         elements.append(Paragraph(filter_text, filter_style))
 
     # Генерация таблицы в зависимости от типа отчета
@@ -83,16 +56,7 @@ def generate_pdf_report(data, report_type, title, filters):
 
 def create_wrapped_text(text, font_name='Helvetica', font_size=9, alignment=TA_CENTER, width=None):
     """Создает Paragraph с переносом текста"""
-    wrap_style = ParagraphStyle(
-        name='WrapStyle',
-        fontName=font_name,
-        fontSize=font_size,
-        alignment=alignment,
-        wordWrap='CJK',  # Полный перенос текста
-        spaceBefore=2,
-        spaceAfter=2
-    )
-    return Paragraph(str(text), wrap_style)
+    return Paragraph(str(text), PdfResources.cell_style(font_name, font_size, alignment))
 
 
 def generate_revenue_table(data, has_custom_font, period):
@@ -100,29 +64,25 @@ def generate_revenue_table(data, has_custom_font, period):
     elements = []
 
     if not data:
-        elements.append(Paragraph("Нет данных для отображения", getSampleStyleSheet()['Normal']))
+        elements.append(Paragraph("Нет данных для отображения", PdfResources.sample_style('Normal')))
         return elements
 
     # Описание периода
     period_map = {
+        'hourly': 'по часам',
         'daily': 'по дням',
         'weekly': 'по неделям',
-        'monthly': 'по месяцам'
+        'monthly': 'по месяцам',
+        'weekday': 'по дням недели'
     }
     period_text = period_map.get(period, '')
 
     if period_text:
-        period_style = ParagraphStyle(
-            name='PeriodStyle',
-            fontName='DejaVuSans' if has_custom_font else 'Helvetica',
-            fontSize=9,
-            spaceAfter=8,
-            alignment=TA_CENTER
-        )
+        period_style = PdfResources.style('report_period')
         elements.append(Paragraph(f"<i>Отчет {period_text}</i>", period_style))
 
     # Заголовки таблицы
-    font_name = 'DejaVuSans' if has_custom_font else 'Helvetica-Bold'
+    font_name = PdfResources.font('heading')
     table_data = [[
         create_wrapped_text('Период', font_name, 9, TA_CENTER),
         create_wrapped_text('Выручка (руб.)', font_name, 9, TA_CENTER),
@@ -131,9 +91,11 @@ def generate_revenue_table(data, has_custom_font, period):
     ]]
 
     # Данные таблицы
-    normal_font = 'DejaVuSans' if has_custom_font else 'Helvetica'
+    normal_font = PdfResources.font('regular')
     for item in data:
-        if 'date' in item and item['date']:
+        if item.get('label'):
+            period_display = item['label']
+        elif 'date' in item and item['date']:
             period_display = item['date'].strftime('%d.%m.%Y')
         elif 'week' in item:
             period_display = f"Неделя {int(item['week'])}, {int(item['year'])}"
@@ -157,26 +119,8 @@ def generate_revenue_table(data, has_custom_font, period):
     # Создание таблицы с правильными ширинами
     table = Table(table_data, colWidths=[60 * mm, 40 * mm, 40 * mm, 40 * mm])
 
-    # Стили таблицы
-    table_style = TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E86AB')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('BOX', (0, 0), (-1, -1), 1, colors.black),
-        ('LEFTPADDING', (0, 0), (-1, -1), 4),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-        ('TOPPADDING', (0, 0), (-1, -1), 4),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-    ])
-
-    # Чередование цветов строк
-    for i in range(1, len(table_data)):
-        if i % 2 == 0:
-            table_style.add('BACKGROUND', (0, i), (-1, i), colors.HexColor('#F8F9FA'))
-
-    table.setStyle(table_style)
+    # Стили таблицы (с чередованием цветов строк)
+    table.setStyle(PdfResources.table_style('report_revenue'))
     elements.append(table)
     elements.append(Spacer(1, 10 * mm))
 
@@ -185,14 +129,7 @@ def generate_revenue_table(data, has_custom_font, period):
     total_tickets = sum(item.get('tickets_sold', 0) for item in data)
     total_avg = total_revenue / total_tickets if total_tickets > 0 else 0
 
-    total_style = ParagraphStyle(
-        name='TotalStyle',
-        fontName='DejaVuSans' if has_custom_font else 'Helvetica-Bold',
-        fontSize=10,
-        spaceAfter=6,
-        textColor=colors.black,
-        alignment=TA_CENTER
-    )
+    total_style = PdfResources.style('report_total')
 
     elements.append(Paragraph(f"<b>Общая выручка:</b> {total_revenue:.2f} руб.", total_style))
     elements.append(Paragraph(f"<b>Всего билетов:</b> {total_tickets}", total_style))
@@ -206,11 +143,11 @@ def generate_movies_table(data, has_custom_font):
     elements = []
 
     if not data:
-        elements.append(Paragraph("Нет данных для отображения", getSampleStyleSheet()['Normal']))
+        elements.append(Paragraph("Нет данных для отображения", PdfResources.sample_style('Normal')))
         return elements
 
     # Заголовки таблицы
-    font_name = 'DejaVuSans' if has_custom_font else 'Helvetica-Bold'
+    font_name = PdfResources.font('heading')
     table_data = [[
         create_wrapped_text('№', font_name, 9, TA_CENTER),
         create_wrapped_text('Фильм', font_name, 9, TA_CENTER),
@@ -221,7 +158,7 @@ def generate_movies_table(data, has_custom_font):
     ]]
 
     # Данные таблицы
-    normal_font = 'DejaVuSans' if has_custom_font else 'Helvetica'
+    normal_font = PdfResources.font('regular')
     for idx, movie in enumerate(data, 1):
         title = str(movie.get('title', 'Без названия'))
         genre = str(movie.get('genre', ''))
@@ -241,26 +178,8 @@ def generate_movies_table(data, has_custom_font):
     # Создание таблицы с правильными ширинами
     table = Table(table_data, colWidths=[15 * mm, 55 * mm, 30 * mm, 35 * mm, 40 * mm, 30 * mm])
 
-    # Стили таблицы
-    table_style = TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#28A745')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('BOX', (0, 0), (-1, -1), 1, colors.black),
-        ('LEFTPADDING', (0, 0), (-1, -1), 4),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-        ('TOPPADDING', (0, 0), (-1, -1), 4),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-    ])
-
-    # Чередование цветов строк
-    for i in range(1, len(table_data)):
-        if i % 2 == 0:
-            table_style.add('BACKGROUND', (0, i), (-1, i), colors.HexColor('#F8F9FA'))
-
-    table.setStyle(table_style)
+    # Стили таблицы (с чередованием цветов строк)
+    table.setStyle(PdfResources.table_style('report_movies'))
     elements.append(table)
     elements.append(Spacer(1, 8 * mm))
 
@@ -268,14 +187,7 @@ def generate_movies_table(data, has_custom_font):
     total_tickets = sum(m.get('tickets_sold', 0) for m in data)
     total_revenue = sum(m.get('total_revenue', 0) for m in data)
 
-    total_style = ParagraphStyle(
-        name='MovieTotalStyle',
-        fontName='DejaVuSans' if has_custom_font else 'Helvetica-Bold',
-        fontSize=10,
-        spaceAfter=6,
-        textColor=colors.black,
-        alignment=TA_CENTER
-    )
+    total_style = PdfResources.style('report_total')
 
     elements.append(Paragraph(f"<b>Всего билетов:</b> {total_tickets}", total_style))
     elements.append(Paragraph(f"<b>Общая выручка:</b> {total_revenue:.2f} руб.", total_style))
@@ -288,11 +200,11 @@ def generate_halls_table(data, has_custom_font):
     elements = []
 
     if not data:
-        elements.append(Paragraph("Нет данных для отображения", getSampleStyleSheet()['Normal']))
+        elements.append(Paragraph("Нет данных для отображения", PdfResources.sample_style('Normal')))
         return elements
 
     # Заголовки таблицы
-    font_name = 'DejaVuSans' if has_custom_font else 'Helvetica-Bold'
+    font_name = PdfResources.font('heading')
     table_data = [[
         create_wrapped_text('Зал', font_name, 9, TA_CENTER),
         create_wrapped_text('Всего мест', font_name, 9, TA_CENTER),
@@ -303,7 +215,7 @@ def generate_halls_table(data, has_custom_font):
     ]]
 
     # Данные таблицы
-    normal_font = 'DejaVuSans' if has_custom_font else 'Helvetica'
+    normal_font = PdfResources.font('regular')
     for hall in data:
         hall_name = str(hall.get('name', ''))
         total_seats = hall.get('total_seats', 0)
@@ -324,26 +236,8 @@ def generate_halls_table(data, has_custom_font):
     # Создание таблицы с правильными ширинами
     table = Table(table_data, colWidths=[35 * mm, 25 * mm, 25 * mm, 35 * mm, 35 * mm, 35 * mm])
 
-    # Стили таблицы
-    table_style = TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#FFC107')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('BOX', (0, 0), (-1, -1), 1, colors.black),
-        ('LEFTPADDING', (0, 0), (-1, -1), 4),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-        ('TOPPADDING', (0, 0), (-1, -1), 4),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-    ])
-
-    # Чередование цветов строк
-    for i in range(1, len(table_data)):
-        if i % 2 == 0:
-            table_style.add('BACKGROUND', (0, i), (-1, i), colors.HexColor('#F8F9FA'))
-
-    table.setStyle(table_style)
+    # Стили таблицы (с чередованием цветов строк)
+    table.setStyle(PdfResources.table_style('report_halls'))
     elements.append(table)
     elements.append(Spacer(1, 8 * mm))
 
@@ -353,14 +247,7 @@ def generate_halls_table(data, has_custom_font):
         total_revenue = sum(h.get('total_revenue', 0) for h in data)
         total_tickets = sum(h.get('sold_tickets', 0) for h in data)
 
-        total_style = ParagraphStyle(
-            name='HallTotalStyle',
-            fontName='DejaVuSans' if has_custom_font else 'Helvetica-Bold',
-            fontSize=10,
-            spaceAfter=6,
-            textColor=colors.black,
-            alignment=TA_CENTER
-        )
+        total_style = PdfResources.style('report_total')
 
         elements.append(Paragraph(f"<b>Средняя загруженность:</b> {avg_occupancy:.1f}%", total_style))
         elements.append(Paragraph(f"<b>Общая выручка:</b> {total_revenue:.2f} руб.", total_style))
@@ -374,29 +261,12 @@ def generate_sales_table(data, has_custom_font):
     elements = []
 
     if not data:
-        elements.append(Paragraph("Нет данных для отображения", getSampleStyleSheet()['Normal']))
+        elements.append(Paragraph("Нет данных для отображения", PdfResources.sample_style('Normal')))
         return elements
 
     # Стиль для ячеек с переносом текста
-    cell_style = ParagraphStyle(
-        name='CellStyle',
-        fontName='DejaVuSans' if has_custom_font else 'Helvetica',
-        fontSize=9,
-        wordWrap='CJK',  # Полный перенос текста
-        alignment=TA_CENTER,
-        spaceBefore=4,
-        spaceAfter=4
-    )
-
-    cell_style_bold = ParagraphStyle(
-        name='CellStyleBold',
-        fontName='DejaVuSans' if has_custom_font else 'Helvetica-Bold',
-        fontSize=9,
-        wordWrap='CJK',
-        alignment=TA_CENTER,
-        spaceBefore=4,
-        spaceAfter=4
-    )
+    cell_style = PdfResources.style('report_cell')
+    cell_style_bold = PdfResources.style('report_cell_bold')
 
     # Создаем данные таблицы с использованием Paragraph для полного переноса
     popular_movie = str(data.get('popular_movie', ''))
@@ -431,26 +301,8 @@ def generate_sales_table(data, has_custom_font):
     # Создание таблицы
     table = Table(table_data, colWidths=[80 * mm, 80 * mm])
 
-    # Стили таблицы
-    table_style = TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#6F42C1')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('BOX', (0, 0), (-1, -1), 1, colors.black),
-        ('LEFTPADDING', (0, 0), (-1, -1), 6),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-        ('TOPPADDING', (0, 0), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-    ])
-
-    # Чередование цветов строк
-    for i in range(1, len(table_data)):
-        if i % 2 == 0:
-            table_style.add('BACKGROUND', (0, i), (-1, i), colors.HexColor('#F8F9FA'))
-
-    table.setStyle(table_style)
+    # Стили таблицы (с чередованием цветов строк)
+    table.setStyle(PdfResources.table_style('report_sales'))
     elements.append(table)
     elements.append(Spacer(1, 10 * mm))
 
@@ -461,15 +313,7 @@ def generate_sales_table(data, has_custom_font):
     if total_tickets > 0:
         share_percent = (popular_tickets / total_tickets) * 100
 
-        share_style = ParagraphStyle(
-            name='ShareStyle',
-            fontName='DejaVuSans' if has_custom_font else 'Helvetica-Bold',
-            fontSize=10,
-            spaceBefore=5,
-            spaceAfter=5,
-            textColor=colors.HexColor('#28A745'),
-            alignment=TA_CENTER
-        )
+        share_style = PdfResources.style('report_share')
 
         elements.append(Paragraph(f"<b>Доля популярного фильма:</b> {share_percent:.1f}% от всех продаж", share_style))
 
@@ -0,0 +1,218 @@
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from .models import ReportJob
+from .report_utils import ReportGenerator
+
+logger = logging.getLogger(__name__)
+
+
+class ReportJobService:
+    """
+    Фоновое построение отчетов админки
+
+    Запрос ставит задание (тип, период, даты) в очередь ReportJob, локальный пул
+    потоков строит данные и PDF. Готовый результат хранится под хэшем параметров
+    REPORT_JOB_CACHE_TTL секунд: одинаковые запросы получают его без пересчета.
+    Задания, оставшиеся в очереди после перезапуска, выполняет команда run_report_jobs.
+    """
+
+    REPORT_TITLES = {
+        'revenue': 'Финансовая статистика',
+        'movies': 'Популярные фильмы',
+        'halls': 'Загруженность залов',
+        'sales': 'Статистика продаж',
+    }
+
+    _executor = None
+    _executor_lock = threading.Lock()
+
+    @staticmethod
+    def get_workers():
+        return getattr(settings, 'REPORT_JOB_WORKERS', 2)
+
+    @staticmethod
+    def get_cache_ttl():
+        return getattr(settings, 'REPORT_JOB_CACHE_TTL', 300)
+
+    @staticmethod
+    def get_timeout():
+        return getattr(settings, 'REPORT_JOB_TIMEOUT', 10 * 60)
+
+    @staticmethod
+    def get_key(report_type, period=None, start_date=None, end_date=None):
+        """Хэш параметров отчета (период влияет только на отчет о выручке)"""
+        params = {
+            'report_type': report_type,
+            'period': (period or 'daily') if report_type == 'revenue' else '',
+            'start_date': start_date.isoformat() if start_date else None,
+            'end_date': end_date.isoformat() if end_date else None,
+        }
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def build_report(report_type, period=None, start_date=None, end_date=None):
+        """Данные и заголовок отчета"""
+        if report_type == 'revenue':
+            data = ReportGenerator.get_revenue_stats(period or 'daily', start_date, end_date)
+            return data, f"{ReportJobService.REPORT_TITLES['revenue']} ({period or 'daily'})"
+        if report_type == 'movies':
+            data = ReportGenerator.get_popular_movies(start_date=start_date, end_date=end_date)
+        elif report_type == 'halls':
+            data = ReportGenerator.get_hall_occupancy(start_date=start_date, end_date=end_date)
+        elif report_type == 'sales':
+            data = ReportGenerator.get_sales_statistics(start_date=start_date, end_date=end_date)
+        else:
+            return [], "Отчет"
+        return data, ReportJobService.REPORT_TITLES[report_type]
+
+    @staticmethod
+    def _to_json(value):
+        """Данные отчета → JSON (даты - ISO, длительности - как в шаблонах)"""
+        if isinstance(value, dict):
+            return {key: ReportJobService._to_json(item) for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [ReportJobService._to_json(item) for item in value]
+        if isinstance(value, (date, datetime)):
+            return value.isoformat()
+        if isinstance(value, timedelta):
+            return str(value)
+        if isinstance(value, Decimal):
+            return float(value)
+        return value
+
+    @staticmethod
+    def find_job(key):
+        """Свежий готовый или выполняющийся отчет с такими же параметрами"""
+        now = timezone.now()
+        jobs = ReportJob.objects.filter(key=key).defer('result', 'pdf')
+        job = jobs.filter(
+            status='done',
+            finished_at__gte=now - timedelta(seconds=ReportJobService.get_cache_ttl())
+        ).order_by('-finished_at').first()
+        if job:
+            return job
+        return jobs.filter(
+            status__in=('pending', 'running'),
+            created_at__gte=now - timedelta(seconds=ReportJobService.get_timeout())
+        ).order_by('-created_at').first()
+
+    @staticmethod
+    def enqueue(report_type, period=None, start_date=None, end_date=None, user=None):
+        """
+        Поставить отчет в очередь (или вернуть готовый из кэша)
+
+        Returns:
+            ReportJob: задание; при REPORT_JOB_WORKERS = 0 отчет строится сразу
+        """
+        key = ReportJobService.get_key(report_type, period, start_date, end_date)
+        job = ReportJobService.find_job(key)
+        if job:
+            return job
+
+        job = ReportJob.objects.create(
+            key=key,
+            report_type=report_type,
+            period=(period or 'daily') if report_type == 'revenue' else '',
+            start_date=start_date,
+            end_date=end_date,
+            requested_by=user if user is not None and user.is_authenticated else None
+        )
+
+        if ReportJobService.get_workers() <= 0:
+            ReportJobService.run(job.pk)
+            job.refresh_from_db()
+        else:
+            job_id = job.pk
+            transaction.on_commit(lambda: ReportJobService.submit(job_id))
+        return job
+
+    @staticmethod
+    def get_executor():
+        with ReportJobService._executor_lock:
+            if ReportJobService._executor is None:
+                ReportJobService._executor = ThreadPoolExecutor(
+                    max_workers=ReportJobService.get_workers(),
+                    thread_name_prefix='report-job'
+                )
+            return ReportJobService._executor
+
+    @staticmethod
+    def submit(job_id):
+        ReportJobService.get_executor().submit(ReportJobService._run_in_thread, job_id)
+
+    @staticmethod
+    def _run_in_thread(job_id):
+        close_old_connections()
+        try:
+            ReportJobService.run(job_id)
+        finally:
+            close_old_connections()
+
+    @staticmethod
+    def run(job_id):
+        """Построить отчет задания (задание забирает только один исполнитель)"""
+        claimed = ReportJob.objects.filter(pk=job_id, status='pending').update(
+            status='running', started_at=timezone.now()
+        )
+        if not claimed:
+            return False
+
+        job = ReportJob.objects.get(pk=job_id)
+        try:
+            data, title = ReportJobService.build_report(
+                job.report_type, job.period, job.start_date, job.end_date
+            )
+        except Exception as e:
+            logger.error(f"Error building report job {job_id}: {e}")
+            ReportJob.objects.filter(pk=job_id).update(
+                status='failed', error=str(e), finished_at=timezone.now()
+            )
+            return False
+
+        pdf = None
+        error = ''
+        try:
+            from .pdf_utils import generate_pdf_report
+            pdf = generate_pdf_report(data, job.report_type, title, {
+                'period': job.period,
+                'start_date': job.start_date,
+                'end_date': job.end_date
+            }).getvalue()
+        except Exception as e:
+            # Данные отчета доступны и без PDF
+            logger.error(f"Error generating PDF for report job {job_id}: {e}")
+            error = f'Ошибка при генерации PDF: {e}'
+
+        ReportJob.objects.filter(pk=job_id).update(
+            status='done',
+            title=title,
+            result=ReportJobService._to_json(data),
+            pdf=pdf,
+            error=error,
+            finished_at=timezone.now()
+        )
+        logger.info(f"Report job {job_id} ({job.report_type}) finished")
+        return True
+
+    @staticmethod
+    def process_pending(limit=None):
+        """Выполнить задания из очереди в текущем процессе"""
+        job_ids = ReportJob.objects.filter(status='pending').order_by('created_at').values_list('pk', flat=True)
+        if limit:
+            job_ids = job_ids[:limit]
+        return sum(1 for job_id in list(job_ids) if ReportJobService.run(job_id))
+
+    @staticmethod
+    def cleanup(older_than=None):
+        """Удалить устаревшие задания"""
+        older_than = older_than or timedelta(days=1)
+        deleted, _ = ReportJob.objects.filter(created_at__lt=timezone.now() - older_than).delete()
+        return deleted
@@ -1,100 +1,266 @@
 import logging
-from django.db.models import Sum, Count, Q, F
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from django.db.models import Sum, Count, Q, F, IntegerField, Subquery
+from django.db.models.functions import (ExtractIsoWeekDay, TruncDate, TruncHour, TruncMonth,
+                                        TruncWeek)
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from decimal import Decimal
-from .models import Ticket, Movie, Hall, Screening
+from .models import DailySalesRollup, Ticket, Movie, Hall, Screening
+from .rollup_utils import SalesRollup
 
 logger = logging.getLogger(__name__)
 
 
-class ReportGenerator:
-    @staticmethod
-    def get_revenue_stats(period='daily', start_date=None, end_date=None):
-        """Статистика выручки по периодам - УЛУЧШЕННАЯ ВЕРСИЯ"""
-        tickets = Ticket.objects.select_related('screening').filter(
-            screening__isnull=False,
-            status__code='active'  # Только активные билеты
-        )
+class SubqueryAggregate(Subquery):
+    """Скалярный агрегат по строкам подзапроса (без GROUP BY во внешнем запросе)"""
+    template = "(SELECT %(function)s(%(column)s) FROM (%(subquery)s) _aggregate)"
+    output_field = IntegerField()
+
+
+class SalesSource:
+    """
+    Источник данных о продажах активных билетов
 
-        # Фильтр по дате если указан
+    Если период покрыт таблицей агрегатов DailySalesRollup, отчеты читают
+    из нее, иначе - из билетов.
+    """
+
+    def __init__(self, from_rollup=False):
+        self.from_rollup = from_rollup
+        if from_rollup:
+            self.queryset = DailySalesRollup.objects.filter(status__code='active')
+            self.movie_field = 'movie'
+            self.date_field = 'date'
+        else:
+            self.queryset = Ticket.objects.filter(status__code='active')
+            self.movie_field = 'screening__movie'
+            self.date_field = 'purchase_date__date'
+
+    @classmethod
+    def for_periods(cls, date_ranges):
+        """Источник для набора периодов [(start_date, end_date), ...]"""
+        return cls(from_rollup=all(
+            SalesRollup.covers(start_date, end_date) for start_date, end_date in date_ranges
+        ))
+
+    def date_filter(self, start_date=None, end_date=None):
+        """Условие на дату покупки"""
+        date_filter = Q()
         if start_date:
-            tickets = tickets.filter(purchase_date__date__gte=start_date)
+            date_filter &= Q(**{f'{self.date_field}__gte': start_date})
         if end_date:
-            tickets = tickets.filter(purchase_date__date__lte=end_date)
-
-        if period == 'daily':
-            data = tickets.extra({
-                'date': "date(purchase_date)"
-            }).values('date').annotate(
-                revenue=Sum('screening__price'),
-                tickets_sold=Count('id')
-            ).order_by('date')
-
-        elif period == 'weekly':
-            data = tickets.extra({
-                'week': "EXTRACT(week FROM purchase_date)",
-                'year': "EXTRACT(year FROM purchase_date)"
-            }).values('year', 'week').annotate(
-                revenue=Sum('screening__price'),
-                tickets_sold=Count('id')
-            ).order_by('year', 'week')
-
-        elif period == 'monthly':
-            data = tickets.extra({
-                'month': "EXTRACT(month FROM purchase_date)",
-                'year': "EXTRACT(year FROM purchase_date)"
-            }).values('year', 'month').annotate(
-                revenue=Sum('screening__price'),
-                tickets_sold=Count('id')
-            ).order_by('year', 'month')
-
-        # Преобразуем в список
-        result = []
-        for item in data:
-            revenue = float(item['revenue'] or 0)
-            result.append({
-                'date': item.get('date'),
-                'week': item.get('week'),
-                'month': item.get('month'),
-                'year': item.get('year'),
-                'revenue': revenue,
-                'tickets_sold': item['tickets_sold'] or 0
-            })
+            date_filter &= Q(**{f'{self.date_field}__lte': end_date})
+        return date_filter
+
+    def filter(self, start_date=None, end_date=None):
+        return self.queryset.filter(self.date_filter(start_date, end_date))
+
+    def tickets(self, **extra):
+        """Агрегат количества билетов"""
+        if self.from_rollup:
+            return Sum('tickets_sold', **extra)
+        return Count('id', **extra)
+
+    def revenue(self, **extra):
+        """Агрегат выручки"""
+        return Sum('revenue' if self.from_rollup else 'screening__price', **extra)
+
+    def tickets_total(self, queryset):
+        """Общее число билетов выборки скалярным подзапросом"""
+        if self.from_rollup:
+            return SubqueryAggregate(queryset.values('tickets_sold'), function='SUM', column='tickets_sold')
+        return SubqueryAggregate(queryset.values('id'), function='COUNT', column='*')
+
+
+class RevenueBuckets:
+    """
+    Интервалы отчета о выручке
+
+    Дата покупки усекается в БД в часовом поясе проекта (TIME_ZONE), пустые
+    интервалы между началом и концом периода дополняются нулями.
+    """
+
+    PERIODS = ('hourly', 'daily', 'weekly', 'monthly', 'weekday')
+    WEEKDAYS = ('Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота', 'Воскресенье')
+
+    def __init__(self, period):
+        self.period = period if period in self.PERIODS else 'daily'
+        self.tzinfo = timezone.get_current_timezone()
+
+    def expression(self, source):
+        """Выражение интервала для источника продаж (агрегаты хранят только дату)"""
+        if source.from_rollup:
+            if self.period == 'weekly':
+                return TruncWeek('date')
+            if self.period == 'monthly':
+                return TruncMonth('date')
+            if self.period == 'weekday':
+                return ExtractIsoWeekDay('date')
+            return F('date')
+
+        if self.period == 'hourly':
+            return TruncHour('purchase_date', tzinfo=self.tzinfo)
+        if self.period == 'weekly':
+            return TruncWeek('purchase_date', tzinfo=self.tzinfo)
+        if self.period == 'monthly':
+            return TruncMonth('purchase_date', tzinfo=self.tzinfo)
+        if self.period == 'weekday':
+            return ExtractIsoWeekDay('purchase_date', tzinfo=self.tzinfo)
+        return TruncDate('purchase_date', tzinfo=self.tzinfo)
+
+    def key(self, value):
+        """Значение интервала из БД → ключ (datetime часа, дата начала или номер дня недели)"""
+        if self.period == 'weekday':
+            return int(value)
+        if isinstance(value, datetime):
+            value = timezone.localtime(value, self.tzinfo)
+            if self.period == 'hourly':
+                return value.replace(minute=0, second=0, microsecond=0)
+            value = value.date()
+        if self.period == 'weekly':
+            return value - timedelta(days=value.weekday())
+        if self.period == 'monthly':
+            return value.replace(day=1)
+        return value
+
+    def keys(self, first, last):
+        """Все интервалы от first до last включительно"""
+        if self.period == 'weekday':
+            return list(range(1, 8))
+
+        keys = []
+        if self.period == 'hourly':
+            # Шагаем по UTC, чтобы переходы на летнее время не давали дублей и пропусков
+            current = first.astimezone(dt_timezone.utc)
+            while current <= last:
+                keys.append(timezone.localtime(current, self.tzinfo))
+                current += timedelta(hours=1)
+            return keys
+
+        current = first
+        while current <= last:
+            keys.append(current)
+            if self.period == 'weekly':
+                current += timedelta(days=7)
+            elif self.period == 'monthly':
+                current = (current + timedelta(days=32)).replace(day=1)
+            else:
+                current += timedelta(days=1)
+        return keys
+
+    def bounds(self, start_date, end_date, data_keys):
+        """Первый и последний интервал: границы фильтра, иначе - крайние продажи"""
+        if self.period == 'hourly':
+            first = timezone.make_aware(datetime.combine(start_date, time.min), self.tzinfo) if start_date else None
+            last = timezone.make_aware(datetime.combine(end_date, time(23)), self.tzinfo) if end_date else None
+        else:
+            first = self.key(start_date) if start_date else None
+            last = self.key(end_date) if end_date else None
+        return first or min(data_keys), last or max(data_keys)
+
+    def row(self, key, revenue, tickets_sold):
+        """Строка отчета (поля date/week/month/year сохранены для шаблонов и PDF)"""
+        item = {
+            'date': None,
+            'week': None,
+            'month': None,
+            'year': None,
+            'hour': None,
+            'weekday': None,
+            'period_start': key,
+            'revenue': float(revenue or 0),
+            'tickets_sold': tickets_sold or 0,
+        }
+        if self.period == 'hourly':
+            item.update(date=key.date(), hour=key.hour, label=key.strftime('%d.%m.%Y %H:00'))
+        elif self.period == 'weekly':
+            year, week, _ = key.isocalendar()
+            item.update(week=week, year=year, label=f"Неделя {week}, {year}")
+        elif self.period == 'monthly':
+            item.update(month=key.month, year=key.year, label=f"{key.month:02d}/{key.year}")
+        elif self.period == 'weekday':
+            item.update(weekday=key, label=self.WEEKDAYS[key - 1])
+        else:
+            item.update(date=key, label=key.strftime('%d.%m.%Y'))
+        return item
 
-        return result
 
+class ReportGenerator:
     @staticmethod
-    def get_popular_movies(limit=10, start_date=None, end_date=None):
-        """Самые популярные фильмы - ПРАВИЛЬНЫЕ ПРОГРЕСС-БАРЫ"""
-        # Базовый запрос для билетов
-        tickets = Ticket.objects.filter(
-            status__code='active'
-        ).select_related('screening', 'screening__movie')
+    def get_revenue_stats(period='daily', start_date=None, end_date=None):
+        """
+        Статистика выручки по периодам за один запрос к БД
+
+        Периоды: hourly, daily, weekly, monthly, weekday. Интервалы без продаж
+        возвращаются с нулями (при заданном диапазоне - даже если продаж не было).
+        """
+        if isinstance(start_date, str):
+            start_date = parse_date(start_date)
+        if isinstance(end_date, str):
+            end_date = parse_date(end_date)
+
+        buckets = RevenueBuckets(period)
+        # Агрегаты хранятся по дням - почасовой отчет строится по билетам
+        if buckets.period == 'hourly':
+            source = SalesSource()
+        else:
+            source = SalesSource.for_periods([(start_date, end_date)])
 
-        # Фильтр по дате
-        if start_date:
-            tickets = tickets.filter(purchase_date__date__gte=start_date)
-        if end_date:
-            tickets = tickets.filter(purchase_date__date__lte=end_date)
+        data = source.filter(start_date, end_date).annotate(
+            bucket=buckets.expression(source)
+        ).values('bucket').annotate(
+            revenue=source.revenue(),
+            tickets_sold=source.tickets()
+        ).order_by('bucket')
+
+        totals = {}
+        for item in data:
+            key = buckets.key(item['bucket'])
+            revenue, tickets_sold = totals.get(key, (0, 0))
+            totals[key] = (revenue + (item['revenue'] or 0), tickets_sold + (item['tickets_sold'] or 0))
 
-        # Группируем по фильмам
-        from collections import defaultdict
-        movie_stats = defaultdict(lambda: {'tickets_sold': 0, 'total_revenue': 0})
+        if not totals and not (start_date and end_date):
+            return []
 
-        for ticket in tickets:
-            if ticket.screening and ticket.screening.movie:
-                movie_id = ticket.screening.movie.id
-                movie_stats[movie_id]['movie'] = ticket.screening.movie
-                movie_stats[movie_id]['tickets_sold'] += 1
-                movie_stats[movie_id]['total_revenue'] += float(ticket.screening.price or 0)
+        first, last = buckets.bounds(start_date, end_date, totals.keys())
+        return [
+            buckets.row(key, *totals.get(key, (0, 0)))
+            for key in buckets.keys(first, last)
+        ]
 
-        # Общее количество всех билетов
-        total_all_tickets = sum(stats['tickets_sold'] for stats in movie_stats.values())
+    @staticmethod
+    def get_popular_movies(limit=10, start_date=None, end_date=None):
+        """Самые популярные фильмы - агрегация в БД, возвращается только limit строк"""
+        source = SalesSource.for_periods([(start_date, end_date)])
+
+        # Базовый запрос с фильтром по дате
+        tickets = source.filter(start_date, end_date).filter(**{f'{source.movie_field}__isnull': False})
+
+        # Группируем по фильмам; общее число билетов - скалярным подзапросом в том же запросе
+        movie = source.movie_field
+        movie_stats = tickets.values(
+            movie
+        ).annotate(
+            title=F(f'{movie}__title'),
+            genre=F(f'{movie}__genre__name'),
+            age_rating=F(f'{movie}__age_rating__name'),
+            duration=F(f'{movie}__duration'),
+            tickets_sold=source.tickets(),
+            total_revenue=source.revenue(),
+            total_all_tickets=source.tickets_total(tickets)
+        ).filter(
+            tickets_sold__gt=0
+        ).order_by('-tickets_sold', '-total_revenue', 'title')
+
+        if limit:
+            movie_stats = movie_stats[:limit]
 
         # Преобразуем в список
         movies_list = []
-        for movie_id, stats in movie_stats.items():
-            movie = stats['movie']
+        for stats in movie_stats:
             tickets_sold = stats['tickets_sold']
+            total_all_tickets = stats['total_all_tickets'] or 0
 
             # ПРАВИЛЬНЫЙ РАСЧЕТ ПРОЦЕНТОВ: от общего количества билетов
             popularity_percentage = 0
@@ -102,65 +268,52 @@ class ReportGenerator:
                 popularity_percentage = round((tickets_sold / total_all_tickets) * 100, 1)
 
             movies_list.append({
-                'id': movie.id,
-                'title': movie.title,
-                'genre': movie.genre.name if movie.genre else '',
-                'age_rating': str(movie.age_rating) if movie.age_rating else '',
-                'duration': movie.duration if hasattr(movie, 'duration') else None,
+                'id': stats[movie],
+                'title': stats['title'],
+                'genre': stats['genre'] or '',
+                'age_rating': stats['age_rating'] or '',
+                'duration': stats['duration'],
                 'tickets_sold': tickets_sold,
-                'total_revenue': round(stats['total_revenue'], 2),
+                'total_revenue': round(float(stats['total_revenue'] or 0), 2),
                 'popularity_percentage': popularity_percentage,  # Это уже процент от 0 до 100
                 'max_popularity': 100  # Для прогресс-бара
             })
 
-        # Сортируем по количеству проданных билетов
-        movies_list.sort(key=lambda x: x['tickets_sold'], reverse=True)
-
-        return movies_list[:limit] if limit else movies_list
+        return movies_list
 
     @staticmethod
     def get_hall_occupancy(start_date=None, end_date=None):
-        """Загруженность залов - ИСПРАВЛЕННАЯ ФОРМУЛА"""
-        halls = Hall.objects.all()
-        hall_list = []
+        """Загруженность залов - два сгруппированных запроса независимо от числа сеансов"""
+        # Сеансы в выбранном периоде
+        screening_filter = {}
+        if start_date:
+            screening_filter['screening__start_time__date__gte'] = start_date
+        if end_date:
+            screening_filter['screening__start_time__date__lte'] = end_date
 
-        for hall in halls:
-            # Получаем сеансы в выбранном периоде
-            screenings = hall.screening_set.all()
-            if start_date:
-                screenings = screenings.filter(start_time__date__gte=start_date)
-            if end_date:
-                screenings = screenings.filter(start_time__date__lte=end_date)
-
-            total_screenings = screenings.count()
-
-            if total_screenings == 0:
-                # Если нет сеансов в выбранном периоде
-                hall_data = {
-                    'id': hall.id,
-                    'name': hall.name,
-                    'description': hall.description or '',
-                    'rows': hall.rows,
-                    'seats_per_row': hall.seats_per_row,
-                    'total_seats': hall.rows * hall.seats_per_row,
-                    'total_screenings': 0,
-                    'sold_tickets': 0,
-                    'total_revenue': 0,
-                    'occupancy_percent': 0,
-                    'free_seats': 0
-                }
-                hall_list.append(hall_data)
-                continue
-
-            # Получаем билеты для этих сеансов
-            screening_ids = screenings.values_list('id', flat=True)
-            tickets = Ticket.objects.filter(
-                screening_id__in=screening_ids,
-                status__code='active'
-            )
+        # Запрос 1: залы с количеством сеансов в периоде
+        halls = Hall.objects.annotate(
+            total_screenings=Count('screening', filter=Q(**screening_filter) if screening_filter else None)
+        )
 
-            sold_tickets = tickets.count()
+        # Запрос 2: проданные билеты и выручка по залам
+        ticket_stats = {
+            row['screening__hall']: row
+            for row in Ticket.objects.filter(
+                status__code='active',
+                **screening_filter
+            ).values('screening__hall').annotate(
+                sold_tickets=Count('id'),
+                total_revenue=Sum('screening__price')
+            ).order_by()
+        }
+
+        hall_list = []
+        for hall in halls:
+            total_screenings = hall.total_screenings
             total_seats = hall.rows * hall.seats_per_row
+            stats = ticket_stats.get(hall.id, {})
+            sold_tickets = stats.get('sold_tickets', 0)
 
             # ПРАВИЛЬНАЯ ФОРМУЛА: (проданные_билеты / (мест_в_зале × сеансов)) × 100
             if total_screenings > 0 and total_seats > 0:
@@ -171,8 +324,7 @@ class ReportGenerator:
                 occupancy_percent = 0
 
             # Выручка
-            revenue_result = tickets.aggregate(total=Sum('screening__price'))
-            total_revenue = float(revenue_result['total'] or 0)
+            total_revenue = float(stats.get('total_revenue') or 0)
 
             hall_data = {
                 'id': hall.id,
@@ -194,38 +346,85 @@ class ReportGenerator:
 
     @staticmethod
     def get_sales_statistics(start_date=None, end_date=None):
-        """Общая статистика продаж - УЛУЧШЕННАЯ ВЕРСИЯ"""
-        tickets = Ticket.objects.filter(
-            status__code='active'
-        ).select_related('screening', 'screening__movie')
-
-        # Фильтр по дате
-        if start_date:
-            tickets = tickets.filter(purchase_date__date__gte=start_date)
-        if end_date:
-            tickets = tickets.filter(purchase_date__date__lte=end_date)
-
-        total_tickets = tickets.count()
+        """Общая статистика продаж - агрегатный запрос и запрос самого популярного фильма"""
+        return ReportGenerator.get_sales_statistics_by_ranges([(start_date, end_date)])[0]
 
-        # Выручка
-        revenue = sum(float(t.screening.price or 0) for t in tickets)
+    @staticmethod
+    def get_sales_statistics_by_ranges(date_ranges):
+        """
+        Общая статистика продаж сразу для нескольких периодов (для сравнения периодов)
+
+        Все периоды считаются за два запроса: условная агрегация итогов
+        и сгруппированный по фильмам запрос для самого популярного фильма.
+
+        Args:
+            date_ranges: список пар (start_date, end_date), границы могут быть None
+
+        Returns:
+            list: словари статистики в порядке периодов
+        """
+        date_ranges = list(date_ranges)
+        if not date_ranges:
+            return []
+
+        source = SalesSource.for_periods(date_ranges)
+        range_filters = [
+            source.date_filter(start_date, end_date)
+            for start_date, end_date in date_ranges
+        ]
+
+        # Сканируем только билеты, попадающие хотя бы в один период.
+        # Открытый период (без границ) - пустой Q(), который OR отбрасывает,
+        # поэтому с ним предварительный фильтр не применяется
+        tickets = source.queryset
+        if all(range_filter for range_filter in range_filters):
+            period_filter = Q()
+            for range_filter in range_filters:
+                period_filter |= range_filter
+            tickets = tickets.filter(period_filter)
+
+        # Запрос 1: количество билетов и выручка по каждому периоду
+        totals = tickets.aggregate(**{
+            aggregate_name: aggregate
+            for index, range_filter in enumerate(range_filters)
+            for aggregate_name, aggregate in (
+                (f'tickets_{index}', source.tickets(filter=range_filter)),
+                (f'revenue_{index}', source.revenue(filter=range_filter)),
+            )
+        })
+
+        # Запрос 2: билеты по фильмам для каждого периода
+        movie_title = f'{source.movie_field}__title'
+        movie_rows = tickets.filter(
+            **{f'{source.movie_field}__isnull': False}
+        ).values(movie_title).annotate(**{
+            f'tickets_{index}': source.tickets(filter=range_filter)
+            for index, range_filter in enumerate(range_filters)
+        }).order_by(movie_title)
+
+        popular_movies = [("Нет данных", 0)] * len(range_filters)
+        for row in movie_rows:
+            for index in range(len(range_filters)):
+                movie_tickets = row[f'tickets_{index}'] or 0
+                if movie_tickets > popular_movies[index][1]:
+                    popular_movies[index] = (row[movie_title], movie_tickets)
+
+        return [
+            ReportGenerator._build_sales_statistics(
+                total_tickets=totals[f'tickets_{index}'] or 0,
+                revenue=float(totals[f'revenue_{index}'] or 0),
+                popular_movie=popular_movies[index][0],
+                popular_movie_tickets=popular_movies[index][1]
+            )
+            for index in range(len(range_filters))
+        ]
 
+    @staticmethod
+    def _build_sales_statistics(total_tickets, revenue, popular_movie, popular_movie_tickets):
+        """Словарь общей статистики продаж"""
         # Средняя цена
         avg_ticket_price = round(revenue / total_tickets, 2) if total_tickets > 0 else 0
 
-        # Самый популярный фильм
-        from collections import Counter
-        movie_counter = Counter()
-        for ticket in tickets:
-            if ticket.screening and ticket.screening.movie:
-                movie_counter[ticket.screening.movie.title] += 1
-
-        if movie_counter:
-            popular_movie, popular_movie_tickets = movie_counter.most_common(1)[0]
-        else:
-            popular_movie = "Нет данных"
-            popular_movie_tickets = 0
-
         # Рассчитываем процент для прогресс-бара (от 0 до 1000 рублей)
         if avg_ticket_price > 1000:
             progress_percent = 100
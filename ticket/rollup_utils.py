@@ -0,0 +1,195 @@
+import logging
+from collections import defaultdict
+from decimal import Decimal
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import DailySalesRollup, SalesRollupState, Ticket
+
+logger = logging.getLogger(__name__)
+
+
+class SalesRollup:
+    """
+    Агрегаты продаж по дням: (дата покупки, фильм, зал, статус) → билеты и выручка
+
+    Закрытые дни пересчитываются командой refresh_sales_rollup, текущие
+    изменения (покупка, смена статуса, удаление билета) учитываются хуками.
+    Выручка записывается по цене сеанса на момент продажи, поэтому изменение
+    цены сеанса, как и ошибка хука, помечает агрегаты устаревшими: отчеты
+    читают билеты до следующего пересчета.
+    """
+
+    @staticmethod
+    def is_enabled():
+        return getattr(settings, 'SALES_ROLLUP_ENABLED', True)
+
+    @staticmethod
+    def get_state():
+        return SalesRollupState.objects.order_by('pk').first()
+
+    @staticmethod
+    def covers(start_date=None, end_date=None):
+        """Можно ли строить отчет за период по агрегатам"""
+        if not SalesRollup.is_enabled():
+            return False
+        try:
+            state = SalesRollup.get_state()
+        except Exception as e:
+            logger.error(f"Error reading sales rollup state: {e}")
+            return False
+        return bool(state and state.covers(start_date, end_date))
+
+    @staticmethod
+    def mark_stale(reason):
+        """Перестать доверять агрегатам до полного пересчета"""
+        try:
+            if SalesRollupState.objects.exclude(refreshed_until=None).update(refreshed_until=None):
+                logger.warning(f"Sales rollup marked stale ({reason}), run refresh_sales_rollup")
+        except Exception as e:
+            logger.error(f"Error marking sales rollup stale: {e}")
+
+    @staticmethod
+    def _ticket_key(ticket, status_id):
+        screening = ticket.screening
+        purchase_date = timezone.localtime(ticket.purchase_date).date()
+        return (purchase_date, screening.movie_id, screening.hall_id, status_id), screening.price or Decimal('0')
+
+    @staticmethod
+    def record_tickets(tickets, delta=1, status_id=None):
+        """Учесть билеты в агрегатах (delta=1) или убрать их (delta=-1)"""
+        changes = defaultdict(lambda: [0, Decimal('0')])
+        for ticket in tickets:
+            key, price = SalesRollup._ticket_key(ticket, status_id or ticket.status_id)
+            changes[key][0] += delta
+            changes[key][1] += delta * price
+            if delta > 0:
+                ticket._loaded_status_id = ticket.status_id
+        SalesRollup._apply(changes)
+
+    @staticmethod
+    def record_status_change(ticket, old_status_id):
+        """Перенести билет из агрегата старого статуса в агрегат нового"""
+        changes = defaultdict(lambda: [0, Decimal('0')])
+        if old_status_id:
+            key, price = SalesRollup._ticket_key(ticket, old_status_id)
+            changes[key][0] -= 1
+            changes[key][1] -= price
+        key, price = SalesRollup._ticket_key(ticket, ticket.status_id)
+        changes[key][0] += 1
+        changes[key][1] += price
+        SalesRollup._apply(changes)
+
+    @staticmethod
+    def _apply(changes):
+        """Применить приращения к строкам агрегатов (ошибки не прерывают продажу)"""
+        if not SalesRollup.is_enabled():
+            return
+        try:
+            with transaction.atomic():
+                # Ждем завершения идущего пересчета (он держит блокировку состояния)
+                SalesRollupState.objects.select_for_update().order_by('pk').first()
+                for (date, movie_id, hall_id, status_id), (tickets_delta, revenue_delta) in changes.items():
+                    if not tickets_delta and not revenue_delta:
+                        continue
+                    key = {'date': date, 'movie_id': movie_id, 'hall_id': hall_id, 'status_id': status_id}
+                    rows = DailySalesRollup.objects.filter(**key)
+                    updated = rows.update(
+                        tickets_sold=F('tickets_sold') + tickets_delta,
+                        revenue=F('revenue') + revenue_delta
+                    )
+                    if updated:
+                        continue
+                    try:
+                        with transaction.atomic():
+                            DailySalesRollup.objects.create(
+                                tickets_sold=tickets_delta,
+                                revenue=revenue_delta,
+                                **key
+                            )
+                    except IntegrityError:
+                        # Строку создал параллельный запрос
+                        rows.update(
+                            tickets_sold=F('tickets_sold') + tickets_delta,
+                            revenue=F('revenue') + revenue_delta
+                        )
+        except Exception as e:
+            logger.error(f"Error updating sales rollup: {e}")
+            SalesRollup.mark_stale('hook failed')
+
+    @staticmethod
+    def refresh(start_date=None, end_date=None):
+        """
+        Пересчитать агрегаты за период из билетов
+
+        Args:
+            start_date: первый день (None - с первой продажи)
+            end_date: последний день (None - сегодня)
+
+        Returns:
+            int: количество записанных строк агрегатов
+        """
+        today = timezone.localtime(timezone.now()).date()
+        end_date = end_date or today
+        full_refresh = start_date is None
+
+        if full_refresh:
+            first_purchase = Ticket.objects.aggregate(first=Min('purchase_date'))['first']
+            start_date = timezone.localtime(first_purchase).date() if first_purchase else end_date
+
+        with transaction.atomic():
+            # Блокировка состояния на весь пересчет: хуки билетов ждут его завершения
+            state = SalesRollupState.objects.select_for_update().order_by('pk').first() or SalesRollupState()
+            DailySalesRollup.objects.filter(date__gte=start_date, date__lte=end_date).delete()
+
+            rows = Ticket.objects.filter(
+                purchase_date__date__gte=start_date,
+                purchase_date__date__lte=end_date
+            ).annotate(
+                day=TruncDate('purchase_date')
+            ).values(
+                'day', 'screening__movie', 'screening__hall', 'status'
+            ).annotate(
+                tickets=Count('id'),
+                total=Sum('screening__price')
+            ).order_by()
+
+            created = DailySalesRollup.objects.bulk_create([
+                DailySalesRollup(
+                    date=row['day'],
+                    movie_id=row['screening__movie'],
+                    hall_id=row['screening__hall'],
+                    status_id=row['status'],
+                    tickets_sold=row['tickets'],
+                    revenue=row['total'] or 0
+                )
+                for row in rows.iterator(chunk_size=2000)
+            ], batch_size=1000)
+
+            # Покрытие: пересчитанный период продолжает текущее покрытие,
+            # дни после пересчета поддерживаются хуками билетов
+            if end_date >= today:
+                if full_refresh:
+                    state.covered_from = None
+                elif state.refreshed_until is None or (
+                    state.covered_from is not None and start_date < state.covered_from
+                ):
+                    state.covered_from = start_date
+                state.refreshed_until = end_date
+            state.refreshed_at = timezone.now()
+            state.save()
+
+        logger.info(f"Sales rollup refreshed for {start_date} - {end_date}: {len(created)} rows")
+        return len(created)
+
+    @staticmethod
+    def get_queryset(start_date=None, end_date=None):
+        """Агрегаты активных билетов за период"""
+        rollup = DailySalesRollup.objects.filter(status__code='active')
+        if start_date:
+            rollup = rollup.filter(date__gte=start_date)
+        if end_date:
+            rollup = rollup.filter(date__lte=end_date)
+        return rollup
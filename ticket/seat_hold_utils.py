@@ -0,0 +1,254 @@
+import heapq
+import logging
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from .seat_utils import HallLayoutCache
+
+logger = logging.getLogger(__name__)
+
+
+class MemorySeatHoldStore:
+    """
+    Хранилище временных броней в памяти процесса
+
+    Истекшие брони удаляются порциями по очереди сроков истечения (heap),
+    поэтому очистка не требует обхода всех броней.
+    """
+
+    def __init__(self, sweep_batch=500):
+        self.sweep_batch = sweep_batch
+        self._holds = {}  # {screening_id: {seat_id: (user_id, expires_at)}}
+        self._expiry = []  # [(expires_at, screening_id, seat_id)]
+        self._lock = threading.Lock()
+
+    def acquire(self, screening_id, seat_ids, user_id, ttl):
+        """Забронировать места (все или ничего). Возвращает множество конфликтующих мест"""
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now, self.sweep_batch)
+            holds = self._holds.setdefault(screening_id, {})
+
+            conflicts = {
+                seat_id for seat_id in seat_ids
+                if seat_id in holds and holds[seat_id][0] != user_id and holds[seat_id][1] > now
+            }
+            if conflicts:
+                return conflicts
+
+            expires_at = now + ttl
+            for seat_id in seat_ids:
+                holds[seat_id] = (user_id, expires_at)
+                heapq.heappush(self._expiry, (expires_at, screening_id, seat_id))
+            return set()
+
+    def release(self, screening_id, seat_ids, user_id):
+        """Снять брони пользователя"""
+        with self._lock:
+            holds = self._holds.get(screening_id)
+            if not holds:
+                return
+            for seat_id in seat_ids:
+                if seat_id in holds and holds[seat_id][0] == user_id:
+                    del holds[seat_id]
+            if not holds:
+                del self._holds[screening_id]
+
+    def get_holds(self, screening_id, seat_ids=None):
+        """Действующие брони сеанса: {seat_id: user_id}"""
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now, self.sweep_batch)
+            holds = self._holds.get(screening_id, {})
+            if seat_ids is not None:
+                holds = {seat_id: holds[seat_id] for seat_id in seat_ids if seat_id in holds}
+            return {
+                seat_id: user_id
+                for seat_id, (user_id, expires_at) in holds.items()
+                if expires_at > now
+            }
+
+    def sweep(self, limit=None):
+        """Удалить истекшие брони (не больше limit за вызов). Возвращает число удаленных"""
+        with self._lock:
+            return self._sweep(time.monotonic(), limit or self.sweep_batch)
+
+    def _sweep(self, now, limit):
+        removed = 0
+        while self._expiry and self._expiry[0][0] <= now and removed < limit:
+            expires_at, screening_id, seat_id = heapq.heappop(self._expiry)
+            holds = self._holds.get(screening_id)
+            # Бронь могли продлить или снять - удаляем только запись с этим сроком
+            if holds and seat_id in holds and holds[seat_id][1] == expires_at:
+                del holds[seat_id]
+                removed += 1
+                if not holds:
+                    del self._holds[screening_id]
+        return removed
+
+
+class CacheSeatHoldStore:
+    """
+    Хранилище временных броней в общем кэше Django (Redis, Memcached и т.п.)
+
+    Каждая бронь - отдельный ключ с TTL: захват места атомарен (cache.add),
+    истечение выполняет сам кэш.
+    """
+
+    KEY = 'seat_hold:{screening_id}:{seat_id}'
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def _key(self, screening_id, seat_id):
+        return self.KEY.format(screening_id=screening_id, seat_id=seat_id)
+
+    def acquire(self, screening_id, seat_ids, user_id, ttl):
+        """Забронировать места (все или ничего). Возвращает множество конфликтующих мест"""
+        acquired = []
+        conflicts = set()
+        for seat_id in seat_ids:
+            key = self._key(screening_id, seat_id)
+            if self.cache.add(key, user_id, ttl):
+                acquired.append(key)
+            elif self.cache.get(key) == user_id:
+                # Продлеваем собственную бронь
+                if not self.cache.touch(key, ttl) and not self.cache.add(key, user_id, ttl):
+                    conflicts.add(seat_id)
+            else:
+                conflicts.add(seat_id)
+
+        if conflicts and acquired:
+            self.cache.delete_many(acquired)
+        return conflicts
+
+    def release(self, screening_id, seat_ids, user_id):
+        """Снять брони пользователя"""
+        keys = [self._key(screening_id, seat_id) for seat_id in seat_ids]
+        owned = [key for key, owner in self.cache.get_many(keys).items() if owner == user_id]
+        if owned:
+            self.cache.delete_many(owned)
+
+    def get_holds(self, screening_id, seat_ids=None):
+        """Действующие брони сеанса: {seat_id: user_id}"""
+        if seat_ids is None:
+            return {}
+        keys = {self._key(screening_id, seat_id): seat_id for seat_id in seat_ids}
+        return {keys[key]: user_id for key, user_id in self.cache.get_many(list(keys)).items()}
+
+    def sweep(self, limit=None):
+        """Истекшие брони удаляет сам кэш"""
+        return 0
+
+
+class SeatHoldService:
+    """
+    Временные брони мест на время оформления покупки
+
+    Брони хранятся в общем кэше Django (алиас SEAT_HOLD_CACHE, по умолчанию
+    'default'), чтобы их видели все процессы. SEAT_HOLD_CACHE = None - память
+    процесса, только для тестов и разработки в одном процессе.
+    """
+
+    _store = None
+    _store_lock = threading.Lock()
+
+    @staticmethod
+    def get_ttl():
+        return getattr(settings, 'SEAT_HOLD_TTL', 10 * 60)
+
+    @staticmethod
+    def get_store():
+        if SeatHoldService._store is None:
+            with SeatHoldService._store_lock:
+                if SeatHoldService._store is None:
+                    alias = getattr(settings, 'SEAT_HOLD_CACHE', 'default')
+                    if alias:
+                        SeatHoldService._store = CacheSeatHoldStore(caches[alias])
+                    else:
+                        SeatHoldService._store = MemorySeatHoldStore(
+                            sweep_batch=getattr(settings, 'SEAT_HOLD_SWEEP_BATCH', 500)
+                        )
+        return SeatHoldService._store
+
+    @staticmethod
+    def reset_store():
+        """Пересоздать хранилище (после изменения настроек)"""
+        with SeatHoldService._store_lock:
+            SeatHoldService._store = None
+
+    @staticmethod
+    def _hall_seat_ids(screening):
+        layout = HallLayoutCache.get(screening.hall_id)
+        return [seat.id for seats in layout.get_rows().values() for seat in seats]
+
+    @staticmethod
+    def get_holds(screening):
+        """Все действующие брони сеанса: {seat_id: user_id}"""
+        try:
+            return SeatHoldService.get_store().get_holds(
+                screening.pk, SeatHoldService._hall_seat_ids(screening)
+            )
+        except Exception as e:
+            logger.error(f"Error reading seat holds for screening {screening.pk}: {e}")
+            return {}
+
+    @staticmethod
+    def get_held_seat_ids(screening, user=None):
+        """Места, временно забронированные другими покупателями"""
+        user_id = getattr(user, 'pk', None)
+        return {
+            seat_id for seat_id, owner_id in SeatHoldService.get_holds(screening).items()
+            if owner_id != user_id
+        }
+
+    @staticmethod
+    def hold_seats(screening, seat_ids, user):
+        """
+        Временно забронировать места для пользователя
+
+        Returns:
+            tuple: (успех, множество конфликтующих мест, сообщение)
+        """
+        max_seats = getattr(settings, 'SEAT_HOLD_MAX_SEATS', 10)
+        holds = SeatHoldService.get_holds(screening)
+        own_seat_ids = {seat_id for seat_id, owner_id in holds.items() if owner_id == user.pk}
+        if len(own_seat_ids | set(seat_ids)) > max_seats:
+            return False, set(), f"Можно выбрать не более {max_seats} мест."
+
+        try:
+            conflicts = SeatHoldService.get_store().acquire(
+                screening.pk, seat_ids, user.pk, SeatHoldService.get_ttl()
+            )
+        except Exception as e:
+            logger.error(f"Error holding seats for screening {screening.pk}: {e}")
+            # Без хранилища броней покупка все равно защищена транзакцией бронирования
+            return True, set(), ''
+
+        if conflicts:
+            return False, conflicts, "Место временно забронировано другим покупателем."
+        return True, set(), ''
+
+    @staticmethod
+    def release_seats(screening, seat_ids, user):
+        """Снять временные брони пользователя"""
+        try:
+            SeatHoldService.get_store().release(screening.pk, seat_ids, user.pk)
+        except Exception as e:
+            logger.error(f"Error releasing seat holds for screening {screening.pk}: {e}")
+
+    @staticmethod
+    def get_conflicts(screening, seat_ids, user):
+        """Какие из выбранных мест забронированы другими покупателями"""
+        try:
+            holds = SeatHoldService.get_store().get_holds(screening.pk, seat_ids)
+        except Exception as e:
+            logger.error(f"Error reading seat holds for screening {screening.pk}: {e}")
+            return set()
+        return {seat_id for seat_id, owner_id in holds.items() if owner_id != user.pk}
+
+    @staticmethod
+    def sweep(limit=None):
+        """Порционная очистка истекших броней"""
+        return SeatHoldService.get_store().sweep(limit)
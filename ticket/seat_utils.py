@@ -0,0 +1,310 @@
+import logging
+import threading
+import uuid
+from array import array
+from collections import namedtuple
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from .models import Screening, Seat, Ticket
+from .rollup_utils import SalesRollup
+
+logger = logging.getLogger(__name__)
+
+
+class SeatTakenError(Exception):
+    """Место уже занято на сеанс"""
+
+    def __init__(self, seat):
+        self.seat = seat
+        super().__init__(f"Место {seat.row}-{seat.number} уже занято.")
+
+
+# Облегченное место для схемы зала (совместимо с шаблонами: seat.id, seat.row, seat.number)
+SeatCell = namedtuple('SeatCell', ['id', 'row', 'number'])
+
+
+class HallLayout:
+    """Неизменяемая схема мест зала: сетка ряд × место → id места"""
+
+    __slots__ = ('hall_id', 'rows', 'seats_per_row', '_grid', '_rows', '_positions')
+
+    def __init__(self, hall_id, rows, seats_per_row, grid):
+        self.hall_id = hall_id
+        self.rows = rows
+        self.seats_per_row = seats_per_row
+        self._grid = grid  # array('q'), 0 - места нет
+        self._rows = None
+        self._positions = None
+
+    @classmethod
+    def from_seats(cls, hall_id, seats):
+        """Построение сетки из кортежей (id, row, number)"""
+        seats = list(seats)
+        rows = max((row for _, row, _ in seats), default=0)
+        seats_per_row = max((number for _, _, number in seats), default=0)
+
+        grid = array('q', bytes(8 * rows * seats_per_row))
+        for seat_id, row, number in seats:
+            # Ряд или место < 1 дали бы отрицательный индекс и затерли чужую ячейку
+            if row < 1 or number < 1:
+                logger.warning(f"Seat {seat_id} in hall {hall_id} has invalid position {row}-{number}, skipped")
+                continue
+            grid[(row - 1) * seats_per_row + (number - 1)] = seat_id
+        return cls(hall_id, rows, seats_per_row, grid)
+
+    @classmethod
+    def load(cls, hall_id):
+        """Загрузка схемы из БД одним запросом"""
+        seats = Seat.objects.filter(hall_id=hall_id).values_list('id', 'row', 'number')
+        return cls.from_seats(hall_id, seats)
+
+    def to_payload(self):
+        """Компактное представление для общего кэша"""
+        return self.hall_id, self.rows, self.seats_per_row, self._grid.tobytes()
+
+    @classmethod
+    def from_payload(cls, payload):
+        hall_id, rows, seats_per_row, raw = payload
+        grid = array('q')
+        grid.frombytes(raw)
+        return cls(hall_id, rows, seats_per_row, grid)
+
+    def seat_id(self, row, number):
+        """id места по ряду и номеру (None если места нет)"""
+        if not (1 <= row <= self.rows and 1 <= number <= self.seats_per_row):
+            return None
+        return self._grid[(row - 1) * self.seats_per_row + (number - 1)] or None
+
+    def get_seat(self, seat_id):
+        """Место по id (None если место не из этого зала)"""
+        if self._positions is None:
+            self._positions = {
+                seat_id: index for index, seat_id in enumerate(self._grid) if seat_id
+            }
+        index = self._positions.get(seat_id)
+        if index is None:
+            return None
+        row, number = divmod(index, self.seats_per_row)
+        return SeatCell(seat_id, row + 1, number + 1)
+
+    def get_rows(self):
+        """Места, сгруппированные по рядам: {номер_ряда: [SeatCell, ...]}"""
+        if self._rows is None:
+            rows = {}
+            for index, seat_id in enumerate(self._grid):
+                if seat_id:
+                    row, number = divmod(index, self.seats_per_row)
+                    rows.setdefault(row + 1, []).append(SeatCell(seat_id, row + 1, number + 1))
+            self._rows = rows
+        return self._rows
+
+    def __len__(self):
+        return sum(1 for seat_id in self._grid if seat_id)
+
+
+class HallLayoutCache:
+    """
+    Кэш схем залов
+
+    Схема хранится в памяти процесса, а ее версия - в общем кэше (алиас
+    settings.SEAT_LAYOUT_CACHE, если не задан - 'default'), поэтому инвалидация
+    в одном процессе видна остальным. Если SEAT_LAYOUT_CACHE задан, в нем
+    дополнительно хранятся сами схемы.
+    """
+
+    _local = {}
+    _lock = threading.Lock()
+
+    VERSION_KEY = 'hall_layout_version:{hall_id}'
+    LAYOUT_KEY = 'hall_layout:{hall_id}:{version}'
+
+    @staticmethod
+    def _shared_cache():
+        """Кэш для самих схем (None - только память процесса)"""
+        alias = getattr(settings, 'SEAT_LAYOUT_CACHE', None)
+        return caches[alias] if alias else None
+
+    @staticmethod
+    def _version_cache():
+        return caches[getattr(settings, 'SEAT_LAYOUT_CACHE', None) or 'default']
+
+    @staticmethod
+    def _shared_version(hall_id):
+        cache = HallLayoutCache._version_cache()
+        key = HallLayoutCache.VERSION_KEY.format(hall_id=hall_id)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, uuid.uuid4().hex, None)
+            version = cache.get(key)
+        return version
+
+    @staticmethod
+    def get(hall):
+        """Схема зала (из кэша или из БД)"""
+        hall_id = getattr(hall, 'pk', hall)
+        cache = HallLayoutCache._shared_cache()
+
+        try:
+            version = HallLayoutCache._shared_version(hall_id)
+        except Exception as e:
+            logger.error(f"Error reading hall layout version for hall {hall_id}: {e}")
+            # Без версии схему процесса не используем: она могла устареть
+            cache, version = None, uuid.uuid4().hex
+
+        cached = HallLayoutCache._local.get(hall_id)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        layout = None
+        if cache:
+            try:
+                payload = cache.get(HallLayoutCache.LAYOUT_KEY.format(hall_id=hall_id, version=version))
+                if payload:
+                    layout = HallLayout.from_payload(payload)
+            except Exception as e:
+                logger.error(f"Error reading hall layout {hall_id} from shared cache: {e}")
+
+        if layout is None:
+            layout = HallLayout.load(hall_id)
+            if cache:
+                try:
+                    cache.set(
+                        HallLayoutCache.LAYOUT_KEY.format(hall_id=hall_id, version=version),
+                        layout.to_payload(),
+                        None
+                    )
+                except Exception as e:
+                    logger.error(f"Error writing hall layout {hall_id} to shared cache: {e}")
+
+        with HallLayoutCache._lock:
+            HallLayoutCache._local[hall_id] = (version, layout)
+        return layout
+
+    @staticmethod
+    def invalidate(hall_id):
+        """Сбросить схему зала (после изменения зала или его мест)"""
+        with HallLayoutCache._lock:
+            HallLayoutCache._local.pop(hall_id, None)
+
+        try:
+            HallLayoutCache._version_cache().set(
+                HallLayoutCache.VERSION_KEY.format(hall_id=hall_id), uuid.uuid4().hex, None
+            )
+        except Exception as e:
+            logger.error(f"Error invalidating hall layout {hall_id} in shared cache: {e}")
+
+    @staticmethod
+    def clear():
+        """Очистить кэш процесса"""
+        with HallLayoutCache._lock:
+            HallLayoutCache._local.clear()
+
+
+class SeatMapService:
+    """Схема зала и занятость мест для сеанса за фиксированное число запросов"""
+
+    @staticmethod
+    def get_hall_rows(hall):
+        """
+        Места зала, сгруппированные по рядам
+
+        Returns:
+            dict: {номер_ряда: [SeatCell, ...]} в порядке рядов и мест
+        """
+        return HallLayoutCache.get(hall).get_rows()
+
+    @staticmethod
+    def get_booked_seat_ids(screening):
+        """Множество id занятых мест сеанса (один запрос без загрузки билетов)"""
+        return set(
+            Ticket.objects.filter(screening_id=screening.pk).values_list('seat_id', flat=True)
+        )
+
+    @staticmethod
+    def get_seat_map(screening, user=None):
+        """
+        Данные для отрисовки схемы зала
+
+        Returns:
+            dict: {'rows': {...}, 'booked_seat_ids': set(...), 'held_seat_ids': set(...)}
+            held_seat_ids - места, временно забронированные другими покупателями
+        """
+        from .seat_hold_utils import SeatHoldService
+
+        booked_seat_ids = SeatMapService.get_booked_seat_ids(screening)
+        return {
+            'rows': SeatMapService.get_hall_rows(screening.hall_id),
+            'booked_seat_ids': booked_seat_ids,
+            'held_seat_ids': SeatHoldService.get_held_seat_ids(screening, user) - booked_seat_ids,
+        }
+
+    @staticmethod
+    def get_hall_seats(hall, seat_ids):
+        """
+        Места зала по списку id (из схемы, без запроса к таблице мест)
+
+        Returns:
+            dict: {seat_id: SeatCell} только для мест, принадлежащих залу
+        """
+        layout = HallLayoutCache.get(hall)
+        seats = {}
+        for seat_id in seat_ids:
+            seat = layout.get_seat(seat_id)
+            if seat:
+                seats[seat_id] = seat
+        return seats
+
+    @staticmethod
+    def get_taken_seat_ids(screening, seat_ids):
+        """Какие из выбранных мест уже заняты на сеанс"""
+        return set(
+            Ticket.objects.filter(
+                screening_id=screening.pk,
+                seat_id__in=seat_ids
+            ).values_list('seat_id', flat=True)
+        )
+
+    @staticmethod
+    def book_seats(user, screening, seats, group_id):
+        """
+        Бронирование мест одной транзакцией
+
+        Сеанс блокируется на время проверки и вставки, поэтому параллельные
+        покупки на один сеанс выполняются по очереди. Конфликт уникальности
+        (screening, seat) превращается в SeatTakenError.
+
+        Args:
+            seats: dict {seat_id: SeatCell} в порядке выбора мест
+
+        Returns:
+            list: созданные билеты
+        """
+        seat_ids = list(seats)
+        try:
+            with transaction.atomic():
+                list(Screening.objects.select_for_update().filter(pk=screening.pk).values_list('pk', flat=True))
+
+                taken_seat_ids = SeatMapService.get_taken_seat_ids(screening, seat_ids)
+                if taken_seat_ids:
+                    raise SeatTakenError(seats[min(taken_seat_ids, key=seat_ids.index)])
+
+                status = Ticket.get_active_status()
+                tickets = Ticket.objects.bulk_create([
+                    Ticket(
+                        user=user,
+                        screening=screening,
+                        seat_id=seat_id,
+                        status=status,
+                        group_id=group_id
+                    )
+                    for seat_id in seat_ids
+                ])
+
+                # bulk_create не вызывает сигналы - учитываем продажу в агрегатах явно
+                SalesRollup.record_tickets(tickets)
+                return tickets
+        except IntegrityError:
+            # Место заняли между проверкой и вставкой (или блокировка недоступна в БД)
+            taken_seat_ids = SeatMapService.get_taken_seat_ids(screening, seat_ids) or seat_ids
+            raise SeatTakenError(seats[min(taken_seat_ids, key=seat_ids.index)])
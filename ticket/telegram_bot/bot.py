@@ -1,6 +1,5 @@
 import asyncio
 import logging
-from asgiref.sync import sync_to_async
 from django.conf import settings
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler
 from telegram.ext import filters
@@ -8,6 +7,10 @@ from .handlers.download import download_handler
 from .handlers.menu_handlers import handle_button_click, help_handler, profile_handler, handle_ticket_callback
 from .handlers.start import start_handler
 from .handlers.tickets import tickets_handler
+from .notifications import NotificationDispatcher
+from .reminders import ReminderScheduler
+from .sender import OutboundSender
+from ticket.notification_utils import TelegramNotificationQueue
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +19,9 @@ class CinemaBot:
     def __init__(self):
         self.token = settings.TELEGRAM_BOT_TOKEN
         self.application = None
+        self.sender = None
+        self.dispatcher_task = None
+        self.reminder_task = None
 
     async def start_async(self):
         """Асинхронный запуск бота"""
@@ -33,6 +39,11 @@ class CinemaBot:
             await self.application.start()
             await self.application.updater.start_polling()
 
+            # Уведомления из очереди отправляются в этом же event loop с учетом лимитов Telegram
+            self.sender = OutboundSender(self.application.bot).start()
+            self.dispatcher_task = asyncio.create_task(NotificationDispatcher(self.sender).run())
+            self.reminder_task = asyncio.create_task(ReminderScheduler().run())
+
             logger.info("✅ Telegram bot started successfully!")
 
             # Бесконечный цикл чтобы бот не завершался
@@ -68,73 +79,9 @@ class CinemaBot:
         """Обработчик ошибок"""
         logger.error(f"Update {update} caused error {context.error}")
 
-    async def send_ticket_notification(self, user, tickets):
-        """Отправка уведомления о покупке билетов"""
-        try:
-            if user.telegram_chat_id and self.application:
-                message = self.format_ticket_notification(tickets)
-                await self.application.bot.send_message(
-                    chat_id=user.telegram_chat_id,
-                    text=message,
-                    parse_mode='HTML'
-                )
-
-                # ЛОГИРОВАНИЕ: Отправка уведомления
-                from ticket.logging_utils import OperationLogger
-                await sync_to_async(OperationLogger.log_system_operation)(
-                    action_type='OTHER',
-                    module_type='TICKETS',
-                    description=f'Отправка Telegram уведомления о покупке билетов пользователю {user.email}',
-                    object_id=tickets[0].id if tickets else None,
-                    object_repr=f"Группа билетов {tickets[0].group_id}" if tickets and tickets[0].group_id else "Билет",
-                    additional_data={
-                        'telegram_chat_id': user.telegram_chat_id,
-                        'ticket_count': len(tickets),
-                        'movie_title': tickets[0].screening.movie.title if tickets else None
-                    }
-                )
-
-                logger.info(f"Ticket notification sent to user {user.email}")
-        except Exception as e:
-            logger.error(f"Error sending ticket notification: {e}")
-
-            # ЛОГИРОВАНИЕ: Ошибка отправки уведомления
-            from ticket.logging_utils import OperationLogger
-            await sync_to_async(OperationLogger.log_system_operation)(
-                action_type='OTHER',
-                module_type='SYSTEM',
-                description=f'Ошибка отправки Telegram уведомления пользователю {user.email}',
-                additional_data={
-                    'telegram_chat_id': user.telegram_chat_id,
-                    'error': str(e)
-                }
-            )
-
     def format_ticket_notification(self, tickets):
         """Форматирование уведомления о билетах"""
-        if not tickets:
-            return ""
-
-        screening = tickets[0].screening
-
-        # Правильно конвертируем время в локальный часовой пояс
-        from django.utils import timezone
-        local_start_time = timezone.localtime(screening.start_time)
-
-        seats_info = ", ".join([f"Ряд {t.seat.row}-{t.seat.number}" for t in tickets])
-        total_price = sum(t.screening.price for t in tickets)
-
-        message = (
-            "🎫 <b>Покупка билетов подтверждена!</b>\n\n"
-            f"<b>Фильм:</b> {screening.movie.title}\n"
-            f"<b>Дата и время:</b> {local_start_time.strftime('%d.%m.%Y %H:%M')}\n"
-            f"<b>Зал:</b> {screening.hall.name}\n"
-            f"<b>Места:</b> {seats_info}\n"
-            f"<b>Общая стоимость:</b> {total_price} ₽\n\n"
-            "📥 <b>Скачать билеты:</b> Нажмите '🎫 Мои билеты' в боте\n\n"
-            "Или перейдите в личный кабинет на сайте для скачивания."
-        )
-        return message
+        return TelegramNotificationQueue.format_purchase(tickets)
 
 
 # Глобальный экземпляр бота
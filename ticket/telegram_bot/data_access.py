@@ -0,0 +1,160 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from ticket.cache_utils import TelegramUserCache
+from ticket.logging_utils import OperationLogger
+from ticket.models import User, Ticket
+from ticket.ticket_artifact_utils import TicketArtifactStore
+
+logger = logging.getLogger(__name__)
+
+
+def _run_in_thread(func):
+    """Вызов в потоке пула: соединение с БД потока закрывается по правилам CONN_MAX_AGE"""
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return wrapper
+
+
+class BotDataAccess:
+    """
+    Доступ к данным для обработчиков Telegram-бота
+
+    sync_to_async по умолчанию выполняет все запросы в одном потоке (и
+    асинхронные методы ORM Django тоже), поэтому обработчики бота ждали друг
+    друга. Здесь запросы идут в собственном пуле из TELEGRAM_DB_WORKERS потоков
+    (у каждого свое соединение с БД), а пользователь по chat id берется из
+    TelegramUserCache, который сбрасывается при привязке и отвязке в боте
+    (изменения на сайте видны через TELEGRAM_USER_CACHE_TTL). При
+    TELEGRAM_DB_WORKERS = 0 запросы выполняются как раньше, в общем потоке
+    sync_to_async.
+    """
+
+    _executor = None
+    _executor_lock = threading.Lock()
+
+    @staticmethod
+    def get_workers():
+        return getattr(settings, 'TELEGRAM_DB_WORKERS', 8)
+
+    @staticmethod
+    def get_executor():
+        with BotDataAccess._executor_lock:
+            if BotDataAccess._executor is None:
+                BotDataAccess._executor = ThreadPoolExecutor(
+                    max_workers=BotDataAccess.get_workers(),
+                    thread_name_prefix='bot-db'
+                )
+            return BotDataAccess._executor
+
+    @staticmethod
+    async def run(func, *args, **kwargs):
+        """Выполнить синхронный вызов (ORM, PDF, журнал) вне event loop"""
+        if BotDataAccess.get_workers() <= 0:
+            return await sync_to_async(func)(*args, **kwargs)
+        return await sync_to_async(
+            _run_in_thread(func), thread_sensitive=False, executor=BotDataAccess.get_executor()
+        )(*args, **kwargs)
+
+    # Пользователи
+
+    @staticmethod
+    def _get_linked_user(chat_id):
+        return User.objects.filter(telegram_chat_id=int(chat_id), is_telegram_verified=True).first()
+
+    @staticmethod
+    async def get_linked_user(chat_id):
+        """Привязанный (подтвержденный) пользователь по chat id или None"""
+        found, user = TelegramUserCache.get(chat_id)
+        if not found:
+            user = await BotDataAccess.run(BotDataAccess._get_linked_user, chat_id)
+            TelegramUserCache.set(chat_id, user)
+        return user
+
+    @staticmethod
+    async def get_user_by_verification_code(code):
+        return await BotDataAccess.run(
+            lambda: User.objects.filter(telegram_verification_code=code, is_telegram_verified=False).first()
+        )
+
+    @staticmethod
+    def _link_user(user, chat_id, username):
+        with transaction.atomic():
+            # Чат мог остаться за аккаунтом, запросившим новый код (без подтверждения)
+            User.objects.filter(telegram_chat_id=int(chat_id)).exclude(pk=user.pk).update(
+                telegram_chat_id=None, is_telegram_verified=False
+            )
+            user.telegram_chat_id = int(chat_id)
+            user.telegram_username = username
+            user.is_telegram_verified = True
+            user.telegram_verification_code = ''
+            user.save()
+
+    @staticmethod
+    async def link_user(user, chat_id, username):
+        """Привязать Telegram к пользователю"""
+        await BotDataAccess.run(BotDataAccess._link_user, user, chat_id, username)
+        TelegramUserCache.invalidate(chat_id)
+
+    @staticmethod
+    async def unlink_user(user):
+        """Отвязать Telegram пользователя"""
+        chat_id = user.telegram_chat_id
+        await BotDataAccess.run(user.unlink_telegram)
+        TelegramUserCache.invalidate(chat_id)
+
+    # Билеты
+
+    @staticmethod
+    async def get_upcoming_tickets(user, related=TicketArtifactStore.TICKET_RELATED):
+        """Билеты пользователя на предстоящие сеансы (ближайшие первыми)"""
+        return await BotDataAccess.run(lambda: list(
+            Ticket.objects.filter(user=user, screening__start_time__gt=timezone.now())
+            .select_related(*related).order_by('screening__start_time')
+        ))
+
+    @staticmethod
+    async def get_ticket(user, ticket_id):
+        return await BotDataAccess.run(
+            lambda: Ticket.objects.filter(id=ticket_id, user=user)
+            .select_related(*TicketArtifactStore.TICKET_RELATED).first()
+        )
+
+    @staticmethod
+    async def get_group_tickets(user, group_id):
+        return await BotDataAccess.run(TicketArtifactStore.get_group_tickets, group_id, user=user)
+
+    @staticmethod
+    def _get_ticket_stats(user):
+        now = timezone.now()
+        stats = Ticket.objects.filter(user=user).aggregate(
+            total=Count('id'),
+            upcoming=Count('id', filter=Q(screening__start_time__gt=now))
+        )
+        nearest = Ticket.objects.filter(
+            user=user, screening__start_time__gt=now
+        ).select_related('screening__movie').order_by('screening__start_time').first()
+        return stats['total'], stats['upcoming'], nearest
+
+    @staticmethod
+    async def get_ticket_stats(user):
+        """(всего билетов, предстоящих, ближайший билет)"""
+        return await BotDataAccess.run(BotDataAccess._get_ticket_stats, user)
+
+    @staticmethod
+    async def get_pdf(tickets):
+        """PDF группы билетов (готовый файл из хранилища билетов)"""
+        return await BotDataAccess.run(TicketArtifactStore.get_pdf, tickets)
+
+    @staticmethod
+    async def log_operation(**kwargs):
+        await BotDataAccess.run(OperationLogger.log_system_operation, **kwargs)
@@ -1,41 +1,14 @@
 from telegram import Update
 from telegram.ext import ContextTypes
-from ticket.models import User, Ticket
 import logging
-from asgiref.sync import sync_to_async
 from django.utils import timezone
 import io
-from ticket.utils import generate_ticket_pdf
+from ticket.ticket_artifact_utils import TicketArtifactStore, TicketBatchRenderer
+from ..data_access import BotDataAccess
 
 logger = logging.getLogger(__name__)
 
 
-@sync_to_async
-def get_user_by_telegram_id(telegram_id):
-    """Асинхронно ищем пользователя по telegram_chat_id"""
-    return User.objects.filter(
-        telegram_chat_id=telegram_id,
-        is_telegram_verified=True
-    ).first()
-
-
-@sync_to_async
-def get_user_active_tickets(user):
-    """Асинхронно получаем активные билеты пользователя"""
-    now = timezone.now()
-    return list(Ticket.objects.filter(
-        user=user,
-        screening__start_time__gt=now
-    ).select_related('screening__movie', 'screening__hall', 'seat').order_by('screening__start_time'))
-
-
-# Оборачиваем функцию генерации PDF в sync_to_async
-@sync_to_async
-def generate_ticket_pdf_async(tickets):
-    """Асинхронная версия генерации PDF"""
-    return generate_ticket_pdf(tickets)
-
-
 async def download_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик команды /download"""
     user = update.effective_user
@@ -43,7 +16,7 @@ async def download_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     try:
         # Ищем пользователя в Django
-        django_user = await get_user_by_telegram_id(user.id)
+        django_user = await BotDataAccess.get_linked_user(user.id)
         logger.info(f"Found Django user: {django_user}")
 
         if not django_user:
@@ -55,7 +28,7 @@ async def download_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         # Получаем активные билеты
-        tickets = await get_user_active_tickets(django_user)
+        tickets = await BotDataAccess.get_upcoming_tickets(django_user)
         logger.info(f"Found {len(tickets)} active tickets for user {django_user.email}")
 
         if not tickets:
@@ -67,12 +40,7 @@ async def download_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         # Группируем билеты по group_id
-        from collections import defaultdict
-        ticket_groups = defaultdict(list)
-
-        for ticket in tickets:
-            group_id = ticket.group_id if ticket.group_id else f"single_{ticket.id}"
-            ticket_groups[group_id].append(ticket)
+        ticket_groups = TicketBatchRenderer.group_tickets(tickets)
 
         logger.info(f"Ticket groups: {len(ticket_groups)}")
 
@@ -83,16 +51,18 @@ async def download_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             parse_mode='HTML'
         )
 
-        # Отправляем каждый групповой билет отдельным файлом
+        # Группы отрисовываются параллельно, каждый файл отправляем по готовности
         success_count = 0
-        for group_id, tickets_list in ticket_groups.items():
+        async for item in TicketBatchRenderer.arender(ticket_groups):
             try:
-                await send_ticket_pdf(update, tickets_list)
+                if item.error:
+                    raise item.error
+                await send_ticket_pdf(update, item.tickets, item.pdf)
                 success_count += 1
             except Exception as e:
-                logger.error(f"Failed to send PDF for group {group_id}: {e}")
+                logger.error(f"Failed to send PDF for group {TicketArtifactStore.group_key(item.tickets[0])}: {e}")
                 await update.message.reply_text(
-                    f"⚠️ Ошибка при загрузке билетов для {tickets_list[0].screening.movie.title}"
+                    f"⚠️ Ошибка при загрузке билетов для {item.tickets[0].screening.movie.title}"
                 )
 
         # Финальное сообщение
@@ -115,17 +85,18 @@ async def download_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("⚠️ Произошла ошибка при получении билетов.")
 
 
-async def send_ticket_pdf(update: Update, tickets):
+async def send_ticket_pdf(update: Update, tickets, pdf_content=None):
     """Отправка PDF билета"""
     try:
-        logger.info(f"Starting PDF generation for {len(tickets)} tickets")
+        if pdf_content is None:
+            logger.info(f"Starting PDF generation for {len(tickets)} tickets")
 
-        # Генерируем PDF (асинхронно)
-        pdf_buffer = await generate_ticket_pdf_async(tickets)
-        logger.info("PDF generated successfully")
+            # Получаем PDF (асинхронно)
+            pdf_content = await BotDataAccess.get_pdf(tickets)
+            logger.info("PDF generated successfully")
 
         # Создаем файл в памяти
-        pdf_file = io.BytesIO(pdf_buffer.getvalue())
+        pdf_file = io.BytesIO(pdf_content)
 
         # Формируем имя файла
         screening = tickets[0].screening
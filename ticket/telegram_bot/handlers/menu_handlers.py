@@ -1,53 +1,12 @@
 import logging
-from asgiref.sync import sync_to_async
 from django.utils import timezone
 from telegram import Update, ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-from ticket.models import User, Ticket
+from ..data_access import BotDataAccess
 
 logger = logging.getLogger(__name__)
 
 
-@sync_to_async
-def check_user_verified(user_id):
-    """Проверяем, привязан ли пользователь"""
-    user = User.objects.filter(telegram_chat_id=str(user_id)).first()
-    return user and user.is_telegram_verified
-
-
-@sync_to_async
-def get_user_tickets(user_id):
-    """Получаем только предстоящие билеты пользователя"""
-    user = User.objects.filter(telegram_chat_id=str(user_id)).first()
-    if not user:
-        return []
-
-    # Только предстоящие сеансы (start_time > текущего времени)
-    tickets = Ticket.objects.filter(
-        user=user,
-        screening__start_time__gt=timezone.now()  # Только будущие сеансы
-    ).select_related(
-        'screening__movie', 'screening__hall'
-    ).order_by('screening__start_time')  # Сортируем по дате сеанса (ближайшие первые)
-
-    return list(tickets)
-
-
-@sync_to_async
-def get_ticket_by_id(ticket_id, user_id):
-    """Получаем билет по ID с проверкой владельца"""
-    user = User.objects.filter(telegram_chat_id=str(user_id)).first()
-    if not user:
-        return None
-
-    return Ticket.objects.filter(
-        id=ticket_id,
-        user=user
-    ).select_related(
-        'screening__movie', 'screening__hall', 'seat'
-    ).first()
-
-
 async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Показать главное меню с кнопками"""
     user = update.effective_user
@@ -74,7 +33,10 @@ async def show_tickets_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
 
     try:
-        tickets = await get_user_tickets(user.id)
+        db_user = await BotDataAccess.get_linked_user(user.id)
+        tickets = await BotDataAccess.get_upcoming_tickets(
+            db_user, related=('screening__movie', 'screening__hall')
+        ) if db_user else []
 
         if not tickets:
             await update.message.reply_text(
@@ -176,11 +138,14 @@ async def show_main_menu_from_callback(query):
 async def download_ticket_group(query, group_id):
     """Скачать группу билетов"""
     try:
-        user = query.from_user
+        db_user = await BotDataAccess.get_linked_user(query.from_user.id)
+        if not db_user:
+            await query.edit_message_text("❌ Ваш аккаунт не привязан.")
+            return
 
         if group_id.startswith("single_"):
             ticket_id = group_id.replace("single_", "")
-            ticket = await get_ticket_by_id(ticket_id, user.id)
+            ticket = await BotDataAccess.get_ticket(db_user, ticket_id)
             if ticket:
                 tickets = [ticket]
             else:
@@ -188,31 +153,19 @@ async def download_ticket_group(query, group_id):
                 return
         else:
             # Получаем все билеты группы
-            @sync_to_async
-            def get_group_tickets(group_id, user_id):
-                user = User.objects.filter(telegram_chat_id=str(user_id)).first()
-                if not user:
-                    return []
-                return list(Ticket.objects.filter(group_id=group_id, user=user))
-
-            tickets = await get_group_tickets(group_id, user.id)
+            tickets = await BotDataAccess.get_group_tickets(db_user, group_id)
 
         if not tickets:
             await query.edit_message_text("❌ Билеты не найдены.")
             return
 
-        # Генерируем и отправляем PDF - используем локальный импорт чтобы избежать циклической зависимости
+        # Получаем и отправляем PDF - используем локальный импорт чтобы избежать циклической зависимости
         from io import BytesIO
-        from ticket.utils import generate_ticket_pdf
-
-        @sync_to_async
-        def generate_pdf_async(tickets):
-            return generate_ticket_pdf(tickets)
 
-        pdf_buffer = await generate_pdf_async(tickets)
+        pdf_content = await BotDataAccess.get_pdf(tickets)
 
         # Создаем файл в памяти
-        pdf_file = BytesIO(pdf_buffer.getvalue())
+        pdf_file = BytesIO(pdf_content)
 
         # Формируем имя файла
         first_ticket = tickets[0]
@@ -261,34 +214,14 @@ async def profile_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
 
     try:
-        @sync_to_async
-        def get_user_profile(user_id):
-            user_obj = User.objects.filter(telegram_chat_id=str(user_id)).first()
-            if not user_obj:
-                return None
-
-            # Статистика билетов
-            total_tickets = Ticket.objects.filter(user=user_obj).count()
-            upcoming_tickets = Ticket.objects.filter(
-                user=user_obj,
-                screening__start_time__gt=timezone.now()
-            ).count()
-            past_tickets = total_tickets - upcoming_tickets
-
-            # Ближайший сеанс
-            nearest_screening = Ticket.objects.filter(
-                user=user_obj,
-                screening__start_time__gt=timezone.now()
-            ).select_related('screening__movie').order_by('screening__start_time').first()
-
-            return user_obj, total_tickets, upcoming_tickets, past_tickets, nearest_screening
-
-        result = await get_user_profile(user.id)
-        if not result:
+        db_user = await BotDataAccess.get_linked_user(user.id)
+        if not db_user:
             await update.message.reply_text("❌ Ваш аккаунт не привязан.")
             return
 
-        db_user, total_tickets, upcoming_tickets, past_tickets, nearest_screening = result
+        # Статистика билетов и ближайший сеанс
+        total_tickets, upcoming_tickets, nearest_screening = await BotDataAccess.get_ticket_stats(db_user)
+        past_tickets = total_tickets - upcoming_tickets
 
         profile_text = f"""
 👤 <b>Ваш профиль</b>
@@ -364,7 +297,7 @@ async def handle_button_click(update: Update, context: ContextTypes.DEFAULT_TYPE
     text = update.message.text
 
     # Сначала проверяем, привязан ли пользователь
-    user_verified = await check_user_verified(update.effective_user.id)
+    user_verified = await BotDataAccess.get_linked_user(update.effective_user.id)
 
     if not user_verified:
         # Если пользователь не привязан, передаем обработку verification_handler
@@ -407,31 +340,24 @@ async def unlink_telegram_handler(query):
     try:
         user = query.from_user
 
-        @sync_to_async
-        def unlink_user_telegram(user_id):
-            user_obj = User.objects.filter(telegram_chat_id=str(user_id)).first()
-            if user_obj:
-                # ЛОГИРОВАНИЕ: Начало отвязки
-                from ticket.logging_utils import OperationLogger
-                OperationLogger.log_system_operation(
-                    action_type='UPDATE',
-                    module_type='USERS',
-                    description=f'Начало отвязки Telegram для пользователя {user_obj.email} через бота',
-                    object_id=user_obj.id,
-                    object_repr=str(user_obj),
-                    additional_data={
-                        'telegram_user_id': user_id,
-                        'source': 'telegram_bot'
-                    }
-                )
-
-                user_obj.unlink_telegram()
-                return user_obj
-            return None
-
-        db_user = await unlink_user_telegram(user.id)
-
+        db_user = await BotDataAccess.get_linked_user(user.id)
         if db_user:
+            # ЛОГИРОВАНИЕ: Начало отвязки
+            await BotDataAccess.log_operation(
+                action_type='UPDATE',
+                module_type='USERS',
+                description=f'Начало отвязки Telegram для пользователя {db_user.email} через бота',
+                object_id=db_user.id,
+                object_repr=str(db_user),
+                additional_data={
+                    'telegram_user_id': user.id,
+                    'source': 'telegram_bot'
+                }
+            )
+
+            # Кэш пользователей бота сбрасывается
+            await BotDataAccess.unlink_user(db_user)
+
             # ЛОГИРОВАНИЕ уже происходит в методе unlink_telegram модели User
 
             success_text = f"""
@@ -460,8 +386,7 @@ async def unlink_telegram_handler(query):
         logger.error(f"Error unlinking telegram: {e}")
 
         # ЛОГИРОВАНИЕ: Ошибка при отвязке
-        from ticket.logging_utils import OperationLogger
-        await sync_to_async(OperationLogger.log_system_operation)(
+        await BotDataAccess.log_operation(
             action_type='OTHER',
             module_type='SYSTEM',
             description=f'Ошибка при отвязке Telegram через бота для пользователя {user.id}',
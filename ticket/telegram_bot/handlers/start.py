@@ -1,39 +1,20 @@
 from telegram import Update, ReplyKeyboardMarkup, KeyboardButton
 from telegram.ext import ContextTypes
-from ticket.models import User
-from asgiref.sync import sync_to_async
 import logging
+from ..data_access import BotDataAccess
 
 logger = logging.getLogger(__name__)
 
 
-@sync_to_async
-def get_user_by_telegram_id(telegram_id):
-    """Асинхронно ищем пользователя по telegram_chat_id"""
-    return User.objects.filter(telegram_chat_id=str(telegram_id)).first()
-
-
-@sync_to_async
-def generate_verification_code_for_user(user):
-    """Асинхронно генерируем код подтверждения"""
-    if user:
-        return user.generate_verification_code()
-    else:
-        # Генерируем код без создания пользователя
-        import random
-        import string
-        return ''.join(random.choices(string.digits, k=6))
-
-
 async def start_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик команды /start"""
     user = update.effective_user
 
     try:
         # Асинхронно ищем пользователя
-        db_user = await get_user_by_telegram_id(user.id)
+        db_user = await BotDataAccess.get_linked_user(user.id)
 
-        if db_user and db_user.is_telegram_verified:
+        if db_user:
             # ПОКАЗЫВАЕМ ТОЛЬКО 3 КНОПКИ
             keyboard = [
                 [KeyboardButton("🎫 Мои билеты")],
@@ -1,39 +1,18 @@
 from telegram import Update
 from telegram.ext import ContextTypes
-from ticket.models import User, Ticket
 import logging
-from asgiref.sync import sync_to_async
-from django.utils import timezone
+from ..data_access import BotDataAccess
 
 logger = logging.getLogger(__name__)
 
 
-@sync_to_async
-def get_user_by_telegram_id(telegram_id):
-    """Асинхронно ищем пользователя по telegram_chat_id"""
-    return User.objects.filter(
-        telegram_chat_id=telegram_id,
-        is_telegram_verified=True
-    ).first()
-
-
-@sync_to_async
-def get_user_tickets(user):
-    """Асинхронно получаем билеты пользователя"""
-    now = timezone.now()
-    return list(Ticket.objects.filter(
-        user=user,
-        screening__start_time__gt=now
-    ).select_related('screening__movie', 'screening__hall', 'seat').order_by('screening__start_time'))
-
-
 async def tickets_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик команды /tickets"""
     user = update.effective_user
 
     try:
         # Ищем пользователя в Django
-        django_user = await get_user_by_telegram_id(user.id)
+        django_user = await BotDataAccess.get_linked_user(user.id)
 
         if not django_user:
             await update.message.reply_text(
@@ -44,7 +23,9 @@ async def tickets_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         # Получаем активные билеты
-        tickets = await get_user_tickets(django_user)
+        tickets = await BotDataAccess.get_upcoming_tickets(
+            django_user, related=('screening__movie', 'screening__hall', 'seat')
+        )
 
         if not tickets:
             await update.message.reply_text(
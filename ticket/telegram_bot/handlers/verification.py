@@ -1,37 +1,11 @@
 import logging
-from asgiref.sync import sync_to_async
 from telegram import Update, ReplyKeyboardMarkup, KeyboardButton
 from telegram.ext import ContextTypes
-from ticket.models import User
+from ..data_access import BotDataAccess
 
 logger = logging.getLogger(__name__)
 
 
-# Создаем асинхронные версии методов ORM
-@sync_to_async
-def get_user_by_verification_code(code):
-    """Асинхронно ищем пользователя по коду подтверждения"""
-    return User.objects.filter(
-        telegram_verification_code=code,
-        is_telegram_verified=False
-    ).first()
-
-
-@sync_to_async
-def get_user_by_telegram_id(telegram_id):
-    """Асинхронно ищем пользователя по telegram_chat_id"""
-    return User.objects.filter(
-        telegram_chat_id=telegram_id,
-        is_telegram_verified=True
-    ).first()
-
-
-@sync_to_async
-def save_user(user):
-    """Асинхронно сохраняем пользователя"""
-    user.save()
-
-
 async def verification_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обработчик кодов подтверждения"""
     user = update.effective_user
@@ -41,7 +15,7 @@ async def verification_handler(update: Update, context: ContextTypes.DEFAULT_TYP
 
     try:
         # Сначала проверяем, не привязан ли пользователь уже
-        existing_user = await get_user_by_telegram_id(user.id)
+        existing_user = await BotDataAccess.get_linked_user(user.id)
         if existing_user:
             logger.warning(f"User {user.id} already linked to {existing_user.email}")
             await update.message.reply_text(
@@ -51,13 +25,13 @@ async def verification_handler(update: Update, context: ContextTypes.DEFAULT_TYP
             return
 
         # Ищем пользователя с таким кодом подтверждения
-        django_user = await get_user_by_verification_code(message_text)
+        django_user = await BotDataAccess.get_user_by_verification_code(message_text)
 
         logger.info(f"Found user with code: {django_user}")
 
         if django_user:
             # Проверяем, не привязан ли уже этот Telegram к другому аккаунту
-            existing_user_with_same_telegram = await get_user_by_telegram_id(user.id)
+            existing_user_with_same_telegram = await BotDataAccess.get_linked_user(user.id)
 
             if existing_user_with_same_telegram:
                 logger.warning(f"Telegram {user.id} already linked to another account")
@@ -68,8 +42,7 @@ async def verification_handler(update: Update, context: ContextTypes.DEFAULT_TYP
                 return
 
             # ЛОГИРОВАНИЕ: Начало привязки
-            from ticket.logging_utils import OperationLogger
-            await sync_to_async(OperationLogger.log_system_operation)(
+            await BotDataAccess.log_operation(
                 action_type='UPDATE',
                 module_type='USERS',
                 description=f'Начало привязки Telegram для пользователя {django_user.email}',
@@ -82,17 +55,11 @@ async def verification_handler(update: Update, context: ContextTypes.DEFAULT_TYP
                 }
             )
 
-            # Привязываем Telegram аккаунт
-            django_user.telegram_chat_id = user.id
-            django_user.telegram_username = user.username
-            django_user.is_telegram_verified = True
-            django_user.telegram_verification_code = ''
-
-            # Сохраняем пользователя
-            await save_user(django_user)
+            # Привязываем Telegram аккаунт (кэш пользователей бота сбрасывается)
+            await BotDataAccess.link_user(django_user, user.id, user.username)
 
             # ЛОГИРОВАНИЕ: Успешная привязка
-            await sync_to_async(OperationLogger.log_system_operation)(
+            await BotDataAccess.log_operation(
                 action_type='UPDATE',
                 module_type='USERS',
                 description=f'Успешная привязка Telegram для пользователя {django_user.email}',
@@ -123,7 +90,7 @@ async def verification_handler(update: Update, context: ContextTypes.DEFAULT_TYP
 
         else:
             # ЛОГИРОВАНИЕ: Неверный код
-            await sync_to_async(OperationLogger.log_system_operation)(
+            await BotDataAccess.log_operation(
                 action_type='OTHER',
                 module_type='AUTH',
                 description=f'Неверный код подтверждения Telegram от пользователя {user.id}',
@@ -150,8 +117,7 @@ async def verification_handler(update: Update, context: ContextTypes.DEFAULT_TYP
         logger.error(f"Error in verification handler: {e}", exc_info=True)
 
         # ЛОГИРОВАНИЕ: Ошибка при привязке
-        from ticket.logging_utils import OperationLogger
-        await sync_to_async(OperationLogger.log_system_operation)(
+        await BotDataAccess.log_operation(
             action_type='OTHER',
             module_type='SYSTEM',
             description=f'Ошибка при привязке Telegram для пользователя {user.id}',
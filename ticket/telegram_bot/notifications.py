@@ -0,0 +1,121 @@
+import asyncio
+import logging
+from datetime import timedelta
+from django.conf import settings
+from telegram.error import BadRequest, Forbidden, RetryAfter
+from ticket.logging_utils import OperationLogger
+from ticket.notification_utils import TelegramNotificationQueue
+from .data_access import BotDataAccess
+from .sender import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationDispatcher:
+    """
+    Отправка уведомлений из очереди в БД в event loop процесса бота
+
+    Сообщения уходят через OutboundSender (ограничение частоты и повторы на
+    стороне бота), в БД повтор планируется только после исчерпания его попыток.
+    """
+
+    # Приоритет в очереди отправки по виду уведомления
+    KIND_PRIORITY = {
+        'purchase': PRIORITY_HIGH,
+        'reminder': PRIORITY_LOW,
+    }
+
+    def __init__(self, sender):
+        self.sender = sender
+        self.batch_size = getattr(settings, 'TELEGRAM_NOTIFICATION_BATCH_SIZE', 50)
+        self.poll_interval = getattr(settings, 'TELEGRAM_NOTIFICATION_POLL_INTERVAL', 2)
+
+    async def run(self):
+        """Бесконечный цикл разбора очереди"""
+        logger.info("Notification dispatcher started")
+        loop = asyncio.get_running_loop()
+        released_at = None
+        while True:
+            try:
+                # Отправки, зависшие после падения бота, возвращаются в очередь
+                if released_at is None or loop.time() - released_at > TelegramNotificationQueue.get_claim_timeout():
+                    await BotDataAccess.run(TelegramNotificationQueue.release_stale)
+                    released_at = loop.time()
+                    self.sender.log_metrics()
+
+                sent = await self.dispatch_pending()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error dispatching notifications: {e}", exc_info=True)
+                sent = 0
+
+            # Полная пачка - сразу забираем следующую
+            if sent < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    async def dispatch_pending(self):
+        """Отправить одну пачку уведомлений, возвращает ее размер"""
+        notifications = await BotDataAccess.run(TelegramNotificationQueue.claim, self.batch_size)
+        if notifications:
+            await asyncio.gather(*(self.send(notification) for notification in notifications))
+        return len(notifications)
+
+    async def send(self, notification):
+        try:
+            await self.sender.send(
+                notification.chat_id,
+                notification.text,
+                priority=self.KIND_PRIORITY.get(notification.kind, PRIORITY_NORMAL),
+                parse_mode='HTML'
+            )
+        except RetryAfter as e:
+            retry_after = e.retry_after
+            if isinstance(retry_after, timedelta):
+                retry_after = retry_after.total_seconds()
+            await BotDataAccess.run(
+                TelegramNotificationQueue.mark_failed, notification, e, retry_after=retry_after
+            )
+            return False
+        except (Forbidden, BadRequest) as e:
+            # Бот заблокирован или чат не найден - повтор не поможет
+            await self.on_failed(notification, e, retry=False)
+            return False
+        except Exception as e:
+            await self.on_failed(notification, e)
+            return False
+
+        await BotDataAccess.run(self.on_sent, notification)
+        return True
+
+    @staticmethod
+    def on_sent(notification):
+        TelegramNotificationQueue.mark_sent(notification)
+
+        # ЛОГИРОВАНИЕ: Отправка уведомления
+        payload = notification.payload or {}
+        OperationLogger.log_system_operation(
+            action_type='OTHER',
+            module_type='TICKETS',
+            description=f'Отправка Telegram уведомления ({notification.get_kind_display()}) '
+                        f'пользователю {notification.user.email}',
+            object_id=payload.get('ticket_id'),
+            object_repr=f"Группа билетов {payload['group_id']}" if payload.get('group_id') else "Билет",
+            additional_data={'telegram_chat_id': notification.chat_id, **payload}
+        )
+        logger.info(f"Notification {notification.pk} sent to user {notification.user.email}")
+
+    async def on_failed(self, notification, error, retry=True):
+        logger.error(f"Error sending notification {notification.pk}: {error}")
+        final = await BotDataAccess.run(TelegramNotificationQueue.mark_failed, notification, error, retry=retry)
+        if final:
+            # ЛОГИРОВАНИЕ: Ошибка отправки уведомления
+            await BotDataAccess.log_operation(
+                action_type='OTHER',
+                module_type='SYSTEM',
+                description=f'Ошибка отправки Telegram уведомления пользователю {notification.user.email}',
+                additional_data={
+                    'telegram_chat_id': notification.chat_id,
+                    'error': str(error)
+                }
+            )
@@ -0,0 +1,49 @@
+import asyncio
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from ticket.notification_utils import TelegramNotificationQueue
+from .data_access import BotDataAccess
+
+logger = logging.getLogger(__name__)
+
+
+class ReminderScheduler:
+    """
+    Напоминания о сеансах в event loop процесса бота
+
+    Раз в TELEGRAM_REMINDER_INTERVAL секунд ставит в очередь уведомлений
+    напоминания, момент отправки которых наступил с прошлого прохода. Отправляет
+    их NotificationDispatcher (через OutboundSender с низким приоритетом). После
+    запуска первый проход захватывает последние TELEGRAM_REMINDER_CATCHUP секунд,
+    чтобы не потерять напоминания на время перезапуска бота.
+    """
+
+    def __init__(self):
+        self.interval = getattr(settings, 'TELEGRAM_REMINDER_INTERVAL', 60)
+        self.catchup = getattr(settings, 'TELEGRAM_REMINDER_CATCHUP', 15 * 60)
+        self.checked_until = None
+
+    async def run(self):
+        """Бесконечный цикл проверки"""
+        logger.info("Reminder scheduler started")
+        while True:
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Интервал не сдвигается - проверим его на следующем проходе
+                logger.error(f"Error scheduling reminders: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    async def tick(self, now=None):
+        """Один проход: напоминания за интервал с прошлого прохода"""
+        now = now or timezone.now()
+        since = self.checked_until or now - timedelta(seconds=self.catchup)
+        created = await BotDataAccess.run(TelegramNotificationQueue.enqueue_reminders, since, now)
+        self.checked_until = now
+        if created:
+            logger.info(f"{created} screening reminders queued")
+        return created
@@ -0,0 +1,224 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from django.conf import settings
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты сообщений (меньше - раньше)
+PRIORITY_HIGH = 0  # ответы на действия пользователя, покупки
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 10  # рассылки, напоминания
+
+
+class TokenBucket:
+    """Ограничение частоты: rate токенов в секунду, не больше capacity подряд"""
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated_at = clock()
+
+    def reserve(self):
+        """Занять токен, возвращает задержку до его появления (секунды)"""
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    def is_idle(self):
+        return self.tokens + (self.clock() - self.updated_at) * self.rate >= self.capacity
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+
+class OutboundSender:
+    """
+    Исходящие сообщения бота с ограничением частоты и повторами
+
+    Сообщения ставятся в очередь с приоритетом и отправляются несколькими
+    обработчиками с учетом лимитов Telegram: общего (TELEGRAM_SEND_RATE сообщений
+    в секунду) и на чат (TELEGRAM_SEND_CHAT_RATE). На RetryAfter отправка всех
+    сообщений приостанавливается на указанное Telegram время, на сетевые ошибки -
+    повтор с экспоненциальной задержкой. Бот - любой объект с методом
+    send_message (Bot из python-telegram-bot или тестовый).
+    """
+
+    MAX_CHAT_BUCKETS = 10000
+
+    def __init__(self, bot, rate=None, chat_rate=None, chat_burst=None, workers=None, max_retries=None,
+                 base_delay=1.0, clock=time.monotonic):
+        self.bot = bot
+        self.clock = clock
+        self.rate = rate or getattr(settings, 'TELEGRAM_SEND_RATE', 25)
+        self.chat_rate = chat_rate or getattr(settings, 'TELEGRAM_SEND_CHAT_RATE', 1)
+        self.chat_burst = chat_burst or getattr(settings, 'TELEGRAM_SEND_CHAT_BURST', 3)
+        self.workers = workers or getattr(settings, 'TELEGRAM_SEND_WORKERS', 8)
+        self.max_retries = getattr(settings, 'TELEGRAM_SEND_MAX_RETRIES', 5) if max_retries is None else max_retries
+        self.base_delay = base_delay
+
+        self.global_bucket = TokenBucket(self.rate, capacity=self.rate, clock=clock)
+        self.chat_buckets = OrderedDict()
+        self.paused_until = 0.0
+        self.loop = None
+        self.queue = None
+        self.tasks = []
+        self.counter = itertools.count()
+        self.metrics = {
+            'queued': 0,
+            'sent': 0,
+            'failed': 0,
+            'retried': 0,
+            'rate_limited': 0,
+            'throttled_seconds': 0.0,
+            'latency_total': 0.0,
+        }
+
+    def start(self):
+        """Запустить обработчики в текущем event loop"""
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.loop = loop
+            self.queue = asyncio.PriorityQueue()
+            self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        return self
+
+    async def stop(self, drain=True):
+        """Остановить обработчики (drain - дождаться отправки очереди)"""
+        if drain and self.queue is not None:
+            await self.queue.join()
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def send(self, chat_id, text, priority=PRIORITY_NORMAL, **kwargs):
+        """
+        Поставить сообщение в очередь
+
+        Returns:
+            asyncio.Future: отправленное сообщение или исключение последней попытки
+        """
+        self.start()
+        future = self.loop.create_future()
+        message = {
+            'chat_id': chat_id,
+            'text': text,
+            'kwargs': kwargs,
+            'future': future,
+            'attempt': 0,
+            'queued_at': self.clock(),
+        }
+        self.metrics['queued'] += 1
+        self.queue.put_nowait((priority, next(self.counter), message))
+        return future
+
+    def get_metrics(self):
+        """Счетчики доставки"""
+        metrics = dict(self.metrics)
+        metrics['queue_size'] = self.queue.qsize() if self.queue is not None else 0
+        metrics['avg_latency'] = metrics.pop('latency_total') / metrics['sent'] if metrics['sent'] else 0.0
+        return metrics
+
+    def log_metrics(self):
+        metrics = self.get_metrics()
+        logger.info(
+            f"Telegram sender: sent={metrics['sent']} failed={metrics['failed']} retried={metrics['retried']} "
+            f"rate_limited={metrics['rate_limited']} queue={metrics['queue_size']} "
+            f"avg_latency={metrics['avg_latency']:.2f}s throttled={metrics['throttled_seconds']:.1f}s"
+        )
+
+    def _chat_bucket(self, chat_id):
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            # Простаивающие чаты не держим в памяти
+            if len(self.chat_buckets) >= self.MAX_CHAT_BUCKETS:
+                for key in [key for key, value in self.chat_buckets.items() if value.is_idle()]:
+                    del self.chat_buckets[key]
+                while len(self.chat_buckets) >= self.MAX_CHAT_BUCKETS:
+                    self.chat_buckets.popitem(last=False)
+            bucket = TokenBucket(self.chat_rate, capacity=self.chat_burst, clock=self.clock)
+            self.chat_buckets[chat_id] = bucket
+        else:
+            self.chat_buckets.move_to_end(chat_id)
+        return bucket
+
+    async def _wait_limits(self, chat_id):
+        pause = self.paused_until - self.clock()
+        if pause > 0:
+            await asyncio.sleep(pause)
+            self.metrics['throttled_seconds'] += pause
+        self.metrics['throttled_seconds'] += await self._chat_bucket(chat_id).acquire()
+        self.metrics['throttled_seconds'] += await self.global_bucket.acquire()
+
+    async def _worker(self):
+        while True:
+            priority, order, message = await self.queue.get()
+            try:
+                await self._deliver(priority, message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Unexpected error in Telegram sender: {e}", exc_info=True)
+            finally:
+                self.queue.task_done()
+
+    async def _deliver(self, priority, message):
+        future = message['future']
+        if future.cancelled():
+            return
+
+        await self._wait_limits(message['chat_id'])
+        try:
+            result = await self.bot.send_message(chat_id=message['chat_id'], text=message['text'],
+                                                 **message['kwargs'])
+        except RetryAfter as e:
+            self.metrics['rate_limited'] += 1
+            retry_after = e.retry_after
+            if isinstance(retry_after, timedelta):
+                retry_after = retry_after.total_seconds()
+            # Лимит Telegram действует на весь бот - приостанавливаем все отправки
+            self.paused_until = max(self.paused_until, self.clock() + retry_after)
+            self._retry(priority, message, e, delay=0)
+        except (Forbidden, BadRequest) as e:
+            self._fail(message, e)
+        except NetworkError as e:
+            self._retry(priority, message, e, delay=self.base_delay * 2 ** message['attempt'])
+        except Exception as e:
+            self._fail(message, e)
+        else:
+            self.metrics['sent'] += 1
+            self.metrics['latency_total'] += self.clock() - message['queued_at']
+            if not future.done():
+                future.set_result(result)
+
+    def _retry(self, priority, message, error, delay):
+        if message['attempt'] >= self.max_retries:
+            self._fail(message, error)
+            return
+
+        message['attempt'] += 1
+        self.metrics['retried'] += 1
+        logger.warning(f"Retrying Telegram message to {message['chat_id']} "
+                       f"(attempt {message['attempt']}): {error}")
+        item = (priority, next(self.counter), message)
+        if delay > 0:
+            self.loop.call_later(delay, self.queue.put_nowait, item)
+        else:
+            self.queue.put_nowait(item)
+
+    def _fail(self, message, error):
+        self.metrics['failed'] += 1
+        if not message['future'].done():
+            message['future'].set_exception(error)
@@ -22,9 +22,11 @@ def sum_tickets(data):
 def get_period_display(period):
     """Отображение периода на русском"""
     period_map = {
+        'hourly': 'по часам',
         'daily': 'по дням',
         'weekly': 'по неделям',
-        'monthly': 'по месяцам'
+        'monthly': 'по месяцам',
+        'weekday': 'по дням недели'
     }
     return period_map.get(period, '')
 
@@ -0,0 +1,78 @@
+"""
+FPOS-20-тест-доступа-к-данным-бота-20
+Пользователь по chat id берется из кэша, привязка и отвязка сбрасывают кэш
+"""
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+from ticket.cache_utils import TelegramUserCache
+from ticket.models import User
+from ticket.telegram_bot.data_access import BotDataAccess
+
+
+class BotDataAccessTest(TestCase):
+    """Тестирование доступа к данным Telegram-бота"""
+
+    def setUp(self):
+        """Настройка тестовых данных"""
+        print("\nНастройка тестовых данных для бота...")
+        TelegramUserCache.clear()
+
+        self.user = User.objects.create_user(
+            email='botdata@example.com',
+            password='testpass123',
+            name='Бот',
+            surname='Тестовый',
+            number='+79123456783',
+            telegram_verification_code='123456'
+        )
+
+    def test_fpos_20_bot_data_access(self):
+        """FPOS-20: Кэш пользователей бота (LRU + TTL)"""
+        print("\n" + "=" * 60)
+        print("FPOS-20-тест-доступа-к-данным-бота-20")
+        print("Тест: Доступ к данным Telegram-бота")
+        print("=" * 60)
+
+        # Шаг 1: Непривязанный пользователь
+        print("\nШаг 1: Поиск до привязки...")
+        self.assertIsNone(async_to_sync(BotDataAccess.get_linked_user)(777000111))
+        print("✓ Пользователь не найден")
+
+        # Шаг 2: Привязка сбрасывает кэш
+        print("\nШаг 2: Привязка...")
+        user = async_to_sync(BotDataAccess.get_user_by_verification_code)('123456')
+        async_to_sync(BotDataAccess.link_user)(user, 777000111, 'botdata')
+        linked = async_to_sync(BotDataAccess.get_linked_user)(777000111)
+        self.assertEqual(linked.pk, self.user.pk)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.telegram_chat_id, 777000111)
+        print("✓ Привязанный пользователь найден")
+
+        # Шаг 3: Повторные запросы без обращения к БД
+        print("\nШаг 3: Кэш...")
+        with self.assertNumQueries(0):
+            for _ in range(5):
+                self.assertEqual(async_to_sync(BotDataAccess.get_linked_user)('777000111').pk, self.user.pk)
+        print("✓ Пользователь берется из кэша")
+
+        # Шаг 4: Вытеснение давно не использованных chat id
+        print("\nШаг 4: Размер кэша...")
+        with self.settings(TELEGRAM_USER_CACHE_SIZE=2):
+            TelegramUserCache.set(1, None)
+            async_to_sync(BotDataAccess.get_linked_user)(777000111)
+            TelegramUserCache.set(2, None)
+        self.assertFalse(TelegramUserCache.get(1)[0])
+        self.assertTrue(TelegramUserCache.get(777000111)[0])
+        print("✓ Вытеснен самый старый chat id")
+
+        # Шаг 5: Отвязка сбрасывает кэш
+        print("\nШаг 5: Отвязка...")
+        async_to_sync(BotDataAccess.unlink_user)(linked)
+        self.assertIsNone(async_to_sync(BotDataAccess.get_linked_user)(777000111))
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_telegram_verified)
+        print("✓ Отвязанный пользователь не найден")
+
+        print("\n" + "=" * 60)
+        print("РЕЗУЛЬТАТ: ТЕСТ УСПЕШНО ПРОЙДЕН ✅")
+        print("=" * 60)
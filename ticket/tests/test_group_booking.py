@@ -0,0 +1,132 @@
+"""
+FPOS-05-тест-группового-бронирования-5
+Групповая покупка билетов одной транзакцией
+"""
+import json
+from datetime import timedelta
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from ticket.models import User, Movie, Hall, Screening, Ticket, TicketStatus, Genre, AgeRating, Seat
+
+
+class GroupBookingTest(TestCase):
+    """Тестирование группового бронирования"""
+
+    def setUp(self):
+        """Настройка тестовых данных"""
+        print("\nНастройка тестовых данных для группового бронирования...")
+
+        self.user = User.objects.create_user(
+            email='groupbooking@example.com',
+            password='testpass123',
+            name='Групповая',
+            surname='Покупка',
+            number='+79123456785',
+            is_email_verified=True
+        )
+        self.other_user = User.objects.create_user(
+            email='otherbuyer@example.com',
+            password='testpass123',
+            name='Другой',
+            surname='Покупатель',
+            number='+79123456786',
+            is_email_verified=True
+        )
+
+        genre = Genre.objects.create(name='Комедия')
+        age_rating = AgeRating.objects.create(name='6+', description='Для детей старше 6 лет')
+        self.movie = Movie.objects.create(
+            title='Фильм для группы',
+            description='Описание',
+            duration=timedelta(hours=2),
+            genre=genre,
+            age_rating=age_rating
+        )
+
+        self.hall = Hall.objects.create(name='Большой зал', rows=5, seats_per_row=10)
+        self.active_status = TicketStatus.objects.create(
+            code='active',
+            name='Активный',
+            is_active=True,
+            can_be_refunded=True
+        )
+
+        start_time = timezone.localtime(timezone.now() + timedelta(days=1)).replace(
+            hour=15, minute=0, second=0, microsecond=0
+        )
+        self.screening = Screening.objects.create(
+            movie=self.movie,
+            hall=self.hall,
+            start_time=start_time,
+            price=400
+        )
+
+        self.seat_ids = list(
+            Seat.objects.filter(hall=self.hall).order_by('row', 'number').values_list('id', flat=True)
+        )
+        self.client = Client()
+
+    def _book(self, seat_ids):
+        return self.client.post(
+            reverse('book_tickets'),
+            {
+                'screening_id': self.screening.id,
+                'selected_seats': json.dumps(seat_ids)
+            }
+        )
+
+    def test_fpos_05_group_booking_single_transaction(self):
+        """FPOS-05: Групповая покупка за фиксированное число запросов"""
+        print("\n" + "=" * 60)
+        print("FPOS-05-тест-группового-бронирования-5")
+        print("Тест: Групповая покупка билетов одной транзакцией")
+        print("=" * 60)
+
+        self.client.login(email='groupbooking@example.com', password='testpass123')
+        # Открываем схему зала (схема зала попадает в кэш) и покупаем первый билет
+        # (создается строка агрегатов продаж за день)
+        self.client.get(reverse('screening_partial', args=[self.screening.id]))
+        self._book([self.seat_ids[-1]])
+
+        # Шаг 1: Покупка двух мест и восьми мест требует одинакового числа запросов
+        print("\nШаг 1: Покупка групп разного размера...")
+        with CaptureQueriesContext(connection) as small_ctx:
+            response = self._book(self.seat_ids[:2])
+        self.assertEqual(response.status_code, 302)
+
+        with CaptureQueriesContext(connection) as large_ctx:
+            response = self._book(self.seat_ids[10:18])
+        self.assertEqual(response.status_code, 302)
+
+        print(f"✓ Запросов для 2 мест: {len(small_ctx.captured_queries)}, "
+              f"для 8 мест: {len(large_ctx.captured_queries)}")
+        self.assertEqual(len(small_ctx.captured_queries), len(large_ctx.captured_queries))
+
+        tickets = Ticket.objects.filter(screening=self.screening, user=self.user)
+        self.assertEqual(tickets.count(), 11)
+        self.assertEqual(tickets.values('group_id').distinct().count(), 3)
+        self.assertFalse(tickets.exclude(status=self.active_status).exists())
+        print("✓ Билеты созданы со статусом 'active' и общим group_id")
+
+        # Шаг 2: Частично занятая группа не создает ни одного билета
+        print("\nШаг 2: Покупка группы с уже занятым местом...")
+        self.client.login(email='otherbuyer@example.com', password='testpass123')
+        response = self.client.post(
+            reverse('book_tickets'),
+            {
+                'screening_id': self.screening.id,
+                'selected_seats': json.dumps([self.seat_ids[30], self.seat_ids[1]])
+            },
+            follow=True
+        )
+        message_texts = [str(message) for message in response.context['messages']]
+        self.assertIn('Место 1-2 уже занято.', message_texts)
+        self.assertFalse(Ticket.objects.filter(user=self.other_user).exists())
+        print("✓ Покупка отклонена, свободное место не занято")
+
+        print("\n" + "=" * 60)
+        print("РЕЗУЛЬТАТ: ТЕСТ УСПЕШНО ПРОЙДЕН ✅")
+        print("=" * 60)
@@ -0,0 +1,155 @@
+"""
+FPOS-07-тест-главной-страницы-7
+Главная страница строится за фиксированное число запросов
+"""
+from datetime import timedelta
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from ticket.models import Movie, Hall, Screening, Genre, AgeRating
+
+
+@override_settings(HOME_PAGE_CACHE_TTL=0)
+class HomePageTest(TestCase):
+    """Тестирование главной страницы"""
+
+    def setUp(self):
+        """Настройка тестовых данных"""
+        print("\nНастройка тестовых данных для главной страницы...")
+
+        self.genre = Genre.objects.create(name='Драма')
+        self.age_rating = AgeRating.objects.create(name='12+', description='Для детей старше 12 лет')
+        self.hall = Hall.objects.create(name='Зал 1', rows=3, seats_per_row=5)
+        self.other_hall = Hall.objects.create(name='Зал 2', rows=3, seats_per_row=5)
+
+        self.date = timezone.localtime(timezone.now()).date() + timedelta(days=1)
+        self.client = Client()
+        self.movie_count = 0
+
+    def _add_movies(self, count):
+        """Фильмы с двумя сеансами в разных залах на выбранную дату"""
+        for _ in range(count):
+            self.movie_count += 1
+            movie = Movie.objects.create(
+                title=f'Фильм {self.movie_count}',
+                description='Описание',
+                duration=timedelta(minutes=45),
+                genre=self.genre,
+                age_rating=self.age_rating
+            )
+            # Сеансы не пересекаются: в первом зале с 8:00, во втором с 22:00 в обратном порядке
+            for hour, hall in ((7 + self.movie_count, self.hall), (23 - self.movie_count, self.other_hall)):
+                start_time = timezone.make_aware(
+                    timezone.datetime.combine(self.date, timezone.datetime.min.time()).replace(hour=hour)
+                )
+                Screening.objects.create(movie=movie, hall=hall, start_time=start_time, price=300)
+
+    def _get_home(self, **params):
+        params.setdefault('date', self.date.isoformat())
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('home'), params)
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def test_fpos_07_home_constant_queries(self):
+        """FPOS-07: Количество запросов не зависит от числа фильмов"""
+        print("\n" + "=" * 60)
+        print("FPOS-07-тест-главной-страницы-7")
+        print("Тест: Главная страница за фиксированное число запросов")
+        print("=" * 60)
+
+        # Шаг 1: Несколько фильмов
+        print("\nШаг 1: Главная страница с 2 фильмами...")
+        self._add_movies(2)
+        _, small_queries = self._get_home()
+        print(f"✓ Запросов: {small_queries}")
+
+        # Шаг 2: Много фильмов
+        print("\nШаг 2: Главная страница с 12 фильмами...")
+        self._add_movies(10)
+        response, large_queries = self._get_home()
+        print(f"✓ Запросов: {large_queries}")
+        self.assertEqual(small_queries, large_queries)
+
+        # Шаг 3: Данные и сортировка по ближайшему сеансу
+        print("\nШаг 3: Проверка данных фильмов...")
+        movies = response.context['movies']
+        self.assertEqual(len(movies), 12)
+        self.assertTrue(all(m['screening_count'] == 2 for m in movies))
+        earliest = [m['earliest_screening'].start_time for m in movies]
+        self.assertEqual(earliest, sorted(earliest))
+        print("✓ Фильмы отсортированы по ближайшему сеансу")
+
+        # Шаг 4: Фильтр по залу применяется к сеансам
+        print("\nШаг 4: Фильтр по залу...")
+        response, _ = self._get_home(hall=self.other_hall.id)
+        movies = response.context['movies']
+        self.assertTrue(all(m['screening_count'] == 1 for m in movies))
+        self.assertTrue(all(
+            s.hall_id == self.other_hall.id for m in movies for s in m['upcoming_screenings']
+        ))
+        print("✓ Фильтр по залу работает")
+
+        print("\n" + "=" * 60)
+        print("РЕЗУЛЬТАТ: ТЕСТ УСПЕШНО ПРОЙДЕН ✅")
+        print("=" * 60)
+
+
+@override_settings(HOME_PAGE_CACHE_TTL=60)
+class HomePageCacheTest(TestCase):
+    """Тестирование кэша главной страницы"""
+
+    def setUp(self):
+        """Настройка тестовых данных"""
+        print("\nНастройка тестовых данных для кэша главной страницы...")
+
+        self.genre = Genre.objects.create(name='Мелодрама')
+        self.age_rating = AgeRating.objects.create(name='18+', description='Только для взрослых')
+        self.client = Client()
+
+    def _create_movie(self, title):
+        return Movie.objects.create(
+            title=title,
+            description='Описание',
+            duration=timedelta(minutes=90),
+            genre=self.genre,
+            age_rating=self.age_rating
+        )
+
+    def test_fpos_08_home_page_cache(self):
+        """FPOS-08: Анонимные посетители получают страницу из кэша"""
+        print("\n" + "=" * 60)
+        print("FPOS-08-тест-кэша-главной-страницы-8")
+        print("Тест: Кэш главной страницы")
+        print("=" * 60)
+
+        self._create_movie('Первый фильм')
+
+        # Шаг 1: Повторный запрос не обращается к БД
+        print("\nШаг 1: Повторный запрос главной страницы...")
+        self.client.get(reverse('home'))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 0)
+        print("✓ Страница отдана из кэша без запросов к БД")
+
+        # Шаг 2: Разные фильтры - разные записи кэша
+        print("\nШаг 2: Запрос с фильтром...")
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('home'), {'genre': 'Мелодрама'})
+        self.assertGreater(len(ctx.captured_queries), 0)
+        print("✓ Фильтры входят в ключ кэша")
+
+        # Шаг 3: Изменение афиши сбрасывает кэш
+        print("\nШаг 3: Добавление фильма...")
+        self._create_movie('Второй фильм')
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, 'Второй фильм')
+        print("✓ Кэш сброшен после изменения афиши")
+
+        print("\n" + "=" * 60)
+        print("РЕЗУЛЬТАТ: ТЕСТ УСПЕШНО ПРОЙДЕН ✅")
+        print("=" * 60)
@@ -0,0 +1,144 @@
+"""
+FPOS-16-тест-хранения-журнала-операций-16
+Записи журнала старше срока хранения выгружаются в архив и удаляются
+"""
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from ticket.log_partition_utils import OperationLogPartitions
+from ticket.models import OperationLog
+
+
+class OperationLogRetentionTest(TestCase):
+    """Тестирование срока хранения журнала операций"""
+
+    def setUp(self):
+        """Настройка тестовых данных"""
+        print("\nНастройка тестовых данных для хранения журнала...")
+
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir, True)
+
+        now = timezone.now()
+        self.current_month = OperationLogPartitions.month_start(now)
+        self.old_month = OperationLogPartitions.add_months(self.current_month, -3)
+        old_start, _ = OperationLogPartitions.month_bounds(self.old_month)
+        for index, timestamp in enumerate([old_start, old_start + timedelta(days=10), now]):
+            OperationLog.objects.create(
+                action_type='OTHER', module_type='SYSTEM', description=f'Запись {index}', timestamp=timestamp
+            )
+
+    def test_fpos_16_log_retention(self):
+        """FPOS-16: Архив старых месяцев и фильтр экспорта по диапазону"""
+        print("\n" + "=" * 60)
+        print("FPOS-16-тест-хранения-журнала-операций-16")
+        print("Тест: Срок хранения журнала операций")
+        print("=" * 60)
+
+        # Шаг 1: Границы месяцев
+        print("\nШаг 1: Границы месяцев...")
+        self.assertEqual(OperationLogPartitions.add_months(datetime(2025, 11, 1).date(), 3),
+                         datetime(2026, 2, 1).date())
+        start, end = OperationLogPartitions.month_bounds(self.old_month)
+        self.assertEqual(timezone.localtime(start).day, 1)
+        self.assertEqual(timezone.localtime(end).date(), OperationLogPartitions.add_months(self.old_month, 1))
+        print("✓ Месяцы считаются в часовом поясе проекта")
+
+        # Шаг 2: Пробный запуск ничего не удаляет
+        print("\nШаг 2: Пробный запуск...")
+        processed = OperationLogPartitions.apply_retention(retention_months=2, dry_run=True)
+        self.assertEqual(processed, [(self.old_month, 2)])
+        self.assertEqual(OperationLog.objects.count(), 3)
+        print("✓ Найден 1 месяц для архивации")
+
+        # Шаг 3: Архивация и удаление
+        print("\nШаг 3: Архивация старых записей...")
+        with override_settings(OPERATION_LOG_ARCHIVE_DIR=self.archive_dir):
+            call_command('partition_operation_logs', retention_months=2, stdout=io.StringIO())
+            path = OperationLogPartitions.get_archive_path(self.old_month)
+        self.assertEqual(OperationLog.objects.count(), 1)
+        with gzip.open(path, 'rt', encoding='utf-8') as archive:
+            rows = [json.loads(line) for line in archive]
+        self.assertEqual([row['description'] for row in rows], ['Запись 0', 'Запись 1'])
+        print(f"✓ Архив {os.path.basename(path)}: {len(rows)} записей")
+
+        print("\n" + "=" * 60)
+        print("РЕЗУЛЬТАТ: ТЕСТ УСПЕШНО ПРОЙДЕН ✅")
+        print("=" * 60)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'Partitioning requires PostgreSQL')
+class OperationLogPartitionsTest(TestCase):
+    """Тестирование секционирования журнала операций (только PostgreSQL)"""
+
+    def setUp(self):
+        """Настройка тестовых данных"""
+        print("\nНастройка тестовых данных для секций журнала...")
+
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir, True)
+
+        self.current_month = OperationLogPartitions.month_start(timezone.now())
+        self.old_month = OperationLogPartitions.add_months(self.current_month, -3)
+        old_start, _ = OperationLogPartitions.month_bounds(self.old_month)
+        for index, timestamp in enumerate([old_start, timezone.now()]):
+            OperationLog.objects.create(
+                action_type='OTHER', module_type='SYSTEM', description=f'Запись {index}', timestamp=timestamp
+            )
+
+    def test_fpos_16_log_partitions(self):
+        """FPOS-16: Преобразование, секции для записей из секции по умолчанию, хранение"""
+        print("\n" + "=" * 60)
+        print("FPOS-16-тест-секций-журнала-операций-16")
+        print("Тест: Секционирование журнала операций")
+        print("=" * 60)
+
+        # Шаг 1: Преобразование сохраняет записи
+        print("\nШаг 1: Преобразование таблицы...")
+        call_command('partition_operation_logs', convert=True, interactive=False, months_ahead=1,
+                     retention_months=0, stdout=io.StringIO())
+        self.assertTrue(OperationLogPartitions.is_partitioned())
+        self.assertEqual(OperationLog.objects.count(), 2)
+        self.assertIn(self.old_month, OperationLogPartitions.get_partitions())
+        print("✓ Таблица секционирована, записи перенесены")
+
+        # Шаг 2: Запись за месяц без секции попадает в секцию по умолчанию
+        print("\nШаг 2: Секция для месяца с записями в секции по умолчанию...")
+        future_month = OperationLogPartitions.add_months(self.current_month, 4)
+        future_start, _ = OperationLogPartitions.month_bounds(future_month)
+        OperationLog.objects.create(action_type='OTHER', module_type='SYSTEM', description='Будущая',
+                                    timestamp=future_start + timedelta(days=1))
+        created = OperationLogPartitions.ensure_partitions(months_ahead=4)
+        self.assertIn(OperationLogPartitions.partition_name(future_month), created)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM "{OperationLogPartitions.DEFAULT_PARTITION}"')
+            self.assertEqual(cursor.fetchone()[0], 0)
+        self.assertEqual(OperationLog.objects.filter(description='Будущая').count(), 1)
+        print("✓ Запись перенесена в новую секцию")
+
+        # Шаг 3: Старые записи в секции по умолчанию тоже удаляются
+        print("\nШаг 3: Срок хранения для секции по умолчанию...")
+        older_month = OperationLogPartitions.add_months(self.old_month, -2)
+        older_start, _ = OperationLogPartitions.month_bounds(older_month)
+        OperationLog.objects.create(action_type='OTHER', module_type='SYSTEM', description='Старая',
+                                    timestamp=older_start)
+        with override_settings(OPERATION_LOG_ARCHIVE_DIR=self.archive_dir):
+            processed = OperationLogPartitions.apply_retention(retention_months=2)
+        self.assertEqual(dict(processed)[older_month], 1)
+        self.assertEqual(dict(processed)[self.old_month], 1)
+        self.assertFalse(OperationLog.objects.filter(description__in=['Старая', 'Запись 0']).exists())
+        self.assertNotIn(self.old_month, OperationLogPartitions.get_partitions())
+        print("✓ Записи из секции по умолчанию и старая секция удалены")
+
+        print("\n" + "=" * 60)
+        print("РЕЗУЛЬТАТ: ТЕСТ УСПЕШНО ПРОЙДЕН ✅")
+        print("=" * 60)
@@ -0,0 +1,117 @@
+"""
+FPOS-15-тест-буфера-журнала-операций-15
+Записи журнала сохраняются пачками, при недоступной БД - откладываются в файл
+"""
+import os
+import shutil
+import tempfile
+from unittest import mock
+from django.contrib.auth.models import AnonymousUser
+from django.db import OperationalError
+from django.test import TestCase, RequestFactory, override_settings
+from ticket.logging_utils import OperationLogger, OperationLogBuffer
+from ticket.export_utils import LogExporter
+from ticket.models import OperationLog, LogTemplate, UserAgent
+
+
+class OperationLogBufferTest(TestCase):
+    """Тестирование буферизованной записи журнала операций"""
+
+    def setUp(self):
+        """Настройка тестовых данных"""
+        print("\nНастройка тестовых данных для буфера журнала...")
+
+        self.spool_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.spool_dir, True)
+        spool_override = override_settings(OPERATION_LOG_SPOOL_DIR=self.spool_dir)
+        spool_override.enable()
+        self.addCleanup(spool_override.disable)
+
+        # Фоновый поток не запускаем: очередь разбирается через flush()
+        writer = mock.patch.object(OperationLogBuffer, '_writer_loop', lambda: None)
+        writer.start()
+        self.addCleanup(writer.stop)
+        self.addCleanup(setattr, OperationLogBuffer, '_pid', None)
+
+    @override_settings(OPERATION_LOG_ASYNC=True, OPERATION_LOG_BATCH_SIZE=3, OPERATION_LOG_COMPACT=False)
+    def test_fpos_15_operation_log_buffer(self):
+        """FPOS-15: Очередь, запись пачками и файл при ошибке БД"""
+        print("\n" + "=" * 60)
+        print("FPOS-15-тест-буфера-журнала-операций-15")
+        print("Тест: Буферизованная запись журнала операций")
+        print("=" * 60)
+
+        # Шаг 1: Записи ждут в очереди, а не пишутся в запросе
+        print("\nШаг 1: Логирование операций...")
+        with self.assertNumQueries(0):
+            for index in range(5):
+                OperationLogger.log_system_operation('OTHER', 'SYSTEM', f'Операция {index}')
+        self.assertEqual(OperationLog.objects.count(), 0)
+        print("✓ Записи поставлены в очередь без запросов к БД")
+
+        # Шаг 2: Сохранение пачками
+        print("\nШаг 2: Сохранение очереди...")
+        with self.assertNumQueries(2):
+            OperationLogBuffer.flush()
+        self.assertEqual(OperationLog.objects.count(), 5)
+        print("✓ 5 записей сохранены двумя запросами")
+
+        # Шаг 3: БД недоступна - записи откладываются в файл
+        print("\nШаг 3: Ошибка БД при сохранении...")
+        OperationLogger.log_system_operation('OTHER', 'SYSTEM', 'Операция при недоступной БД')
+        with mock.patch.object(OperationLog.objects, 'bulk_create', side_effect=OperationalError('db is down')):
+            OperationLogBuffer.flush()
+        self.assertEqual(len(os.listdir(self.spool_dir)), 1)
+        self.assertEqual(OperationLog.objects.count(), 5)
+        print("✓ Запись сохранена в файл")
+
+        # Шаг 4: Следующая удачная запись загружает файл
+        print("\nШаг 4: Восстановление БД...")
+        OperationLogger.log_system_operation('OTHER', 'SYSTEM', 'Операция после восстановления')
+        OperationLogBuffer.flush()
+        self.assertEqual(os.listdir(self.spool_dir), [])
+        self.assertTrue(OperationLog.objects.filter(description='Операция при недоступной БД').exists())
+        self.assertEqual(OperationLog.objects.count(), 7)
+        print("✓ Отложенные записи загружены в БД")
+
+        print("\n" + "=" * 60)
+        print("РЕЗУЛЬТАТ: ТЕСТ УСПЕШНО ПРОЙДЕН ✅")
+        print("=" * 60)
+
+    def test_fpos_15_operation_log_compact(self):
+        """FPOS-15: Описания и User-Agent хранятся в справочниках"""
+        print("\n" + "=" * 60)
+        print("FPOS-15-тест-буфера-журнала-операций-15")
+        print("Тест: Компактное хранение журнала операций")
+        print("=" * 60)
+
+        # Шаг 1: Однотипные записи ссылаются на один шаблон
+        print("\nШаг 1: Логирование однотипных операций...")
+        request = RequestFactory().get('/', HTTP_USER_AGENT='Mozilla/5.0 (X11; Linux x86_64)')
+        request.user = AnonymousUser()
+        descriptions = [
+            f"Обработка возврата билета #{ticket_id} для 'Иван {{Иванов}}', сумма 350.00 руб."
+            for ticket_id in (17, 18, 19)
+        ]
+        for description in descriptions:
+            OperationLogger.log_operation(request, 'UPDATE', 'TICKETS', description)
+
+        self.assertEqual(LogTemplate.objects.count(), 1)
+        self.assertEqual(UserAgent.objects.count(), 1)
+        self.assertFalse(OperationLog.objects.exclude(description='').exists())
+        self.assertFalse(OperationLog.objects.filter(user_agent__isnull=False).exists())
+        print(f"✓ Шаблон: {LogTemplate.objects.get().text}")
+
+        # Шаг 2: Описание восстанавливается при чтении
+        print("\nШаг 2: Чтение описаний...")
+        logs = OperationLog.objects.select_related('template', 'user_agent_ref').order_by('id')
+        self.assertEqual([log.get_description() for log in logs], descriptions)
+        self.assertEqual(logs[0].get_user_agent(), 'Mozilla/5.0 (X11; Linux x86_64)')
+        response = LogExporter.export_logs_to_jsonl(logs)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        self.assertIn('Обработка возврата билета #18', content)
+        print("✓ Описания и User-Agent совпадают с исходными")
+
+        print("\n" + "=" * 60)
+        print("РЕЗУЛЬТАТ: ТЕСТ УСПЕШНО ПРОЙДЕН ✅")
+        print("=" * 60)
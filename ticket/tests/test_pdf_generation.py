@@ -7,6 +7,7 @@ import tempfile
 from datetime import datetime, timedelta
 from django.test import TestCase
 from django.conf import settings
+from ticket.pdf_resources import PdfResources
 from ticket.pdf_utils import generate_pdf_report, register_custom_fonts
 
 
@@ -150,6 +151,14 @@ class PDFGenerationTest(TestCase):
         # Очистка
         os.unlink(temp_path)
 
+        # Шаг 6: Шрифты и стили создаются один раз на процесс
+        print("Шаг 6: Повторное использование шрифтов и стилей...")
+        self.assertEqual(register_custom_fonts(), fonts_registered)
+        self.assertIs(PdfResources.style('report_title'), PdfResources.style('report_title'))
+        self.assertIs(PdfResources.table_style('report_halls'), PdfResources.table_style('report_halls'))
+        self.assertIs(PdfResources.cell_style('Helvetica', 8), PdfResources.cell_style('Helvetica', 8))
+        print("✓ Стили переиспользуются между документами")
+
         print("\n" + "=" * 60)
         print("РЕЗУЛЬТАТ: ТЕСТ УСПЕШНО ПРОЙДЕН ✅")
         print(f"Все типы отчетов сгенерированы корректно")
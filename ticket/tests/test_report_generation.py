@@ -199,4 +199,31 @@ class ReportGenerationTest(TestCase):
         print("\n" + "=" * 60)
         print("РЕЗУЛЬТАТ: ТЕСТ УСПЕШНО ПРОЙДЕН ✅")
         print("Все отчеты сгенерированы корректно")
-        print("=" * 60)
\ No newline at end of file
+        print("=" * 60)
+
+    def test_fpos_03_sales_statistics_mixed_ranges(self):
+        """FPOS-03: Статистика за открытый и ограниченный периоды одним вызовом"""
+        print("\n" + "=" * 60)
+        print("FPOS-03-тест-отчетов-3")
+        print("Тест: Сравнение открытого и ограниченного периодов")
+        print("=" * 60)
+
+        # Два билета куплены 10 дней назад (purchase_date - auto_now_add)
+        old_ids = list(Ticket.objects.order_by('id').values_list('id', flat=True)[:2])
+        Ticket.objects.filter(id__in=old_ids).update(purchase_date=timezone.now() - timedelta(days=10))
+        today = timezone.localdate()
+
+        all_time, today_stats = ReportGenerator.get_sales_statistics_by_ranges([(None, None), (today, today)])
+
+        self.assertEqual(all_time['total_tickets'], ReportGenerator.get_sales_statistics()['total_tickets'])
+        self.assertEqual(all_time['total_tickets'], Ticket.objects.count())
+        self.assertEqual(
+            today_stats['total_tickets'],
+            ReportGenerator.get_sales_statistics(today, today)['total_tickets']
+        )
+        self.assertLess(today_stats['total_tickets'], all_time['total_tickets'])
+        print(f"✓ За все время: {all_time['total_tickets']}, за сегодня: {today_stats['total_tickets']}")
+
+        print("\n" + "=" * 60)
+        print("РЕЗУЛЬТАТ: ТЕСТ УСПЕШНО ПРОЙДЕН ✅")
+        print("=" * 60)
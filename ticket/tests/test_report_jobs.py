@@ -0,0 +1,106 @@
+"""
+FPOS-11-тест-заданий-отчетов-11
+Отчеты админки строятся фоновыми заданиями с кэшированием результата
+"""
+from datetime import timedelta
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from ticket.models import User, Movie, Hall, Screening, Ticket, TicketStatus, Genre, AgeRating, Seat, ReportJob
+
+
+class ReportJobTest(TestCase):
+    """Тестирование фоновых заданий отчетов"""
+
+    def setUp(self):
+        """Настройка тестовых данных"""
+        print("\nНастройка тестовых данных для заданий отчетов...")
+
+        self.admin = User.objects.create_superuser(
+            email='reports-admin@example.com',
+            password='adminpass123',
+            name='Админ',
+            surname='Отчетов',
+            number='+79123456781',
+            is_email_verified=True
+        )
+        genre = Genre.objects.create(name='Фантастика')
+        age_rating = AgeRating.objects.create(name='12+', description='Для детей старше 12 лет')
+        hall = Hall.objects.create(name='Зал отчетов', rows=2, seats_per_row=5)
+        status = TicketStatus.objects.create(code='active', name='Активный', is_active=True, can_be_refunded=True)
+        movie = Movie.objects.create(
+            title='Фильм отчетов',
+            description='Описание',
+            duration=timedelta(minutes=100),
+            genre=genre,
+            age_rating=age_rating
+        )
+        screening = Screening.objects.create(
+            movie=movie, hall=hall, start_time=timezone.now() + timedelta(days=1), price=350
+        )
+        for seat in Seat.objects.filter(hall=hall)[:3]:
+            Ticket.objects.create(user=self.admin, screening=screening, seat=seat, status=status)
+
+        self.client = Client()
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:ticket_reports')
+
+    def test_fpos_11_report_jobs(self):
+        """FPOS-11: Задание в очереди, опрос статуса, кэш результата и PDF"""
+        print("\n" + "=" * 60)
+        print("FPOS-11-тест-заданий-отчетов-11")
+        print("Тест: Фоновые задания отчетов")
+        print("=" * 60)
+
+        params = {'report_type': 'movies', 'period': 'daily'}
+
+        # Шаг 1: Запрос ставит задание в очередь и не строит отчет
+        print("\nШаг 1: Постановка отчета в очередь...")
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        job = response.context['job']
+        self.assertEqual(job.status, 'pending')
+        self.assertIsNone(response.context['report_data'])
+        self.assertContains(response, 'Отчет формируется')
+        print("✓ Задание создано, страница ожидает результат")
+
+        # Шаг 2: Повторный запрос не создает второе задание
+        print("\nШаг 2: Повторный запрос до завершения...")
+        self.client.get(self.url, params)
+        self.assertEqual(ReportJob.objects.count(), 1)
+        status = self.client.get(reverse('admin:ticket_report_job', args=[job.pk])).json()
+        self.assertFalse(status['is_finished'])
+        print("✓ Одинаковые запросы ждут одно задание")
+
+        # Шаг 3: Исполнитель строит данные и PDF
+        print("\nШаг 3: Выполнение задания...")
+        call_command('run_report_jobs')
+        status = self.client.get(reverse('admin:ticket_report_job', args=[job.pk])).json()
+        self.assertEqual(status['status'], 'done')
+        response = self.client.get(self.url, params)
+        report_data = response.context['report_data']
+        self.assertEqual(report_data[0]['title'], 'Фильм отчетов')
+        self.assertEqual(report_data[0]['tickets_sold'], 3)
+        self.assertEqual(ReportJob.objects.count(), 1)
+        print("✓ Готовый отчет отдается из кэша заданий")
+
+        # Шаг 4: Экспорт в PDF не пересчитывает отчет
+        print("\nШаг 4: Экспорт в PDF...")
+        response = self.client.post(f"{self.url}?report_type=movies&period=daily", {'export_pdf': '1'})
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(response.content.startswith(b'%PDF'))
+        self.assertEqual(ReportJob.objects.count(), 1)
+        print("✓ PDF отдан из готового задания")
+
+        # Шаг 5: Без пула потоков отчет строится в запросе
+        print("\nШаг 5: Синхронный режим...")
+        with override_settings(REPORT_JOB_WORKERS=0):
+            response = self.client.get(self.url, {'report_type': 'revenue', 'period': 'weekday'})
+        self.assertEqual(response.context['job'].status, 'done')
+        self.assertEqual(len(response.context['report_data']), 7)
+        print("✓ Отчет построен сразу")
+
+        print("\n" + "=" * 60)
+        print("РЕЗУЛЬТАТ: ТЕСТ УСПЕШНО ПРОЙДЕН ✅")
+        print("=" * 60)
@@ -0,0 +1,147 @@
+"""
+FPOS-09-тест-агрегатов-продаж-9
+Отчеты по агрегатам продаж совпадают с отчетами по билетам
+"""
+from datetime import timedelta
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from ticket.models import (User, Movie, Hall, Screening, Ticket, TicketStatus, Genre, AgeRating, Seat,
+                           DailySalesRollup)
+from ticket.report_utils import ReportGenerator
+from ticket.rollup_utils import SalesRollup
+from ticket.seat_utils import SeatMapService
+
+
+class SalesRollupTest(TestCase):
+    """Тестирование агрегатов продаж по дням"""
+
+    def setUp(self):
+        """Настройка тестовых данных"""
+        print("\nНастройка тестовых данных для агрегатов продаж...")
+
+        self.user = User.objects.create_user(
+            email='rollup@example.com',
+            password='testpass123',
+            name='Агрегаты',
+            surname='Продаж',
+            number='+79123456789',
+            is_email_verified=True
+        )
+        genre = Genre.objects.create(name='Боевик')
+        age_rating = AgeRating.objects.create(name='16+', description='Для детей старше 16 лет')
+        self.hall = Hall.objects.create(name='Зал агрегатов', rows=4, seats_per_row=10)
+
+        self.active_status = TicketStatus.objects.create(
+            code='active', name='Активный', is_active=True, can_be_refunded=True
+        )
+        self.refunded_status = TicketStatus.objects.create(
+            code='refunded', name='Возвращен', is_active=False, can_be_refunded=False
+        )
+
+        start_time = timezone.localtime(timezone.now() + timedelta(days=2)).replace(
+            hour=10, minute=0, second=0, microsecond=0
+        )
+        self.screenings = []
+        for index in range(3):
+            movie = Movie.objects.create(
+                title=f'Фильм агрегатов {index}',
+                description='Описание',
+                duration=timedelta(minutes=90),
+                genre=genre,
+                age_rating=age_rating
+            )
+            self.screenings.append(Screening.objects.create(
+                movie=movie,
+                hall=self.hall,
+                start_time=start_time + timedelta(hours=2 * index),
+                price=300 + 100 * index
+            ))
+
+        self.seats = list(Seat.objects.filter(hall=self.hall).order_by('row', 'number'))
+
+    def _reports(self):
+        today = timezone.localtime(timezone.now()).date()
+        return (
+            ReportGenerator.get_popular_movies(),
+            ReportGenerator.get_sales_statistics(),
+            ReportGenerator.get_sales_statistics_by_ranges([(None, today), (today, today)]),
+        )
+
+    def _assert_reports_match(self):
+        self.assertTrue(SalesRollup.covers())
+        rollup_reports = self._reports()
+        with override_settings(SALES_ROLLUP_ENABLED=False):
+            self.assertFalse(SalesRollup.covers())
+            ticket_reports = self._reports()
+        self.assertEqual(rollup_reports, ticket_reports)
+
+    def test_fpos_09_sales_rollup(self):
+        """FPOS-09: Агрегаты продаж пересчитываются командой и поддерживаются хуками"""
+        print("\n" + "=" * 60)
+        print("FPOS-09-тест-агрегатов-продаж-9")
+        print("Тест: Агрегаты продаж по дням")
+        print("=" * 60)
+
+        # Шаг 1: Продажи до построения агрегатов
+        print("\nШаг 1: Продажи и пересчет агрегатов командой...")
+        for index, screening in enumerate(self.screenings):
+            for seat in self.seats[:index + 2]:
+                Ticket.objects.create(user=self.user, screening=screening, seat=seat, status=self.active_status)
+
+        self.assertFalse(SalesRollup.covers())
+        call_command('refresh_sales_rollup', '--full')
+        self.assertEqual(DailySalesRollup.objects.count(), 3)
+        self._assert_reports_match()
+        print("✓ Отчеты по агрегатам совпадают с отчетами по билетам")
+
+        # Шаг 2: Групповая покупка (bulk_create) учитывается в агрегатах
+        print("\nШаг 2: Групповая покупка...")
+        SeatMapService.book_seats(
+            self.user,
+            self.screenings[0],
+            SeatMapService.get_hall_seats(self.hall, [seat.id for seat in self.seats[20:25]]),
+            'rollup-group'
+        )
+        self._assert_reports_match()
+        print("✓ Групповая покупка учтена")
+
+        # Шаг 3: Возврат билета переносит его в агрегат другого статуса
+        print("\nШаг 3: Возврат билета...")
+        ticket = Ticket.objects.filter(screening=self.screenings[2]).first()
+        ticket.status = self.refunded_status
+        ticket.save()
+        self._assert_reports_match()
+        self.assertEqual(
+            DailySalesRollup.objects.get(status=self.refunded_status).tickets_sold, 1
+        )
+        print("✓ Возврат учтен")
+
+        # Шаг 4: Инкрементальный пересчет не меняет результат
+        print("\nШаг 4: Инкрементальный пересчет...")
+        call_command('refresh_sales_rollup')
+        self._assert_reports_match()
+        print("✓ Инкрементальный пересчет согласован с хуками")
+
+        # Шаг 5: Изменение цены сеанса - агрегаты устарели, отчеты по билетам
+        print("\nШаг 5: Изменение цены сеанса...")
+        screening = Screening.objects.get(pk=self.screenings[1].pk)
+        screening.price = screening.price + 50
+        screening.save()
+        self.assertFalse(SalesRollup.covers())
+        call_command('refresh_sales_rollup')
+        self._assert_reports_match()
+        print("✓ После пересчета отчеты снова читают агрегаты")
+
+        # Шаг 6: Ошибка хука не оставляет неверные агрегаты в отчетах
+        print("\nШаг 6: Ошибка хука...")
+        with mock.patch.object(DailySalesRollup.objects, 'filter', side_effect=RuntimeError('db error')):
+            Ticket.objects.create(user=self.user, screening=self.screenings[0], seat=self.seats[30],
+                                  status=self.active_status)
+        self.assertFalse(SalesRollup.covers())
+        print("✓ Агрегаты помечены устаревшими")
+
+        print("\n" + "=" * 60)
+        print("РЕЗУЛЬТАТ: ТЕСТ УСПЕШНО ПРОЙДЕН ✅")
+        print("=" * 60)
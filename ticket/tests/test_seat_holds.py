@@ -0,0 +1,156 @@
+"""
+FPOS-06-тест-временной-брони-6
+Временные брони мест при оформлении покупки
+"""
+import json
+from datetime import timedelta
+from django.core.cache import caches
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from ticket.models import User, Movie, Hall, Screening, Ticket, TicketStatus, Genre, AgeRating, Seat
+from ticket.seat_hold_utils import SeatHoldService, CacheSeatHoldStore, MemorySeatHoldStore
+from ticket.seat_utils import SeatMapService
+
+
+class SeatHoldTest(TestCase):
+    """Тестирование временных броней мест"""
+
+    def setUp(self):
+        """Настройка тестовых данных"""
+        print("\nНастройка тестовых данных для временных броней...")
+        SeatHoldService.reset_store()
+        caches['default'].clear()
+
+        self.first_user = User.objects.create_user(
+            email='firstbuyer@example.com',
+            password='testpass123',
+            name='Первый',
+            surname='Покупатель',
+            number='+79123456787',
+            is_email_verified=True
+        )
+        self.second_user = User.objects.create_user(
+            email='secondbuyer@example.com',
+            password='testpass123',
+            name='Второй',
+            surname='Покупатель',
+            number='+79123456788',
+            is_email_verified=True
+        )
+
+        genre = Genre.objects.create(name='Триллер')
+        age_rating = AgeRating.objects.create(name='16+', description='Для детей старше 16 лет')
+        movie = Movie.objects.create(
+            title='Премьера',
+            description='Описание',
+            duration=timedelta(hours=2),
+            genre=genre,
+            age_rating=age_rating
+        )
+
+        self.hall = Hall.objects.create(name='Премьерный зал', rows=4, seats_per_row=8)
+        TicketStatus.objects.create(code='active', name='Активный', is_active=True, can_be_refunded=True)
+
+        start_time = timezone.localtime(timezone.now() + timedelta(days=1)).replace(
+            hour=19, minute=0, second=0, microsecond=0
+        )
+        self.screening = Screening.objects.create(
+            movie=movie,
+            hall=self.hall,
+            start_time=start_time,
+            price=600
+        )
+
+        self.seat = Seat.objects.get(hall=self.hall, row=1, number=1)
+        self.first_client = Client()
+        self.first_client.login(email='firstbuyer@example.com', password='testpass123')
+        self.second_client = Client()
+        self.second_client.login(email='secondbuyer@example.com', password='testpass123')
+
+    def tearDown(self):
+        SeatHoldService.reset_store()
+
+    def _hold(self, client, seat_ids, action='hold'):
+        return client.post(
+            reverse('hold_seats', args=[self.screening.id]),
+            {'seat_ids': json.dumps(seat_ids), 'action': action}
+        )
+
+    def test_fpos_06_seat_hold_flow(self):
+        """FPOS-06: Бронь места видна другим покупателям и снимается после покупки"""
+        print("\n" + "=" * 60)
+        print("FPOS-06-тест-временной-брони-6")
+        print("Тест: Временные брони мест")
+        print("=" * 60)
+
+        # Шаг 1: Первый покупатель выбирает место
+        print("\nШаг 1: Временная бронь места первым покупателем...")
+        self.assertIsInstance(SeatHoldService.get_store(), CacheSeatHoldStore)
+        response = self._hold(self.first_client, [self.seat.id])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['success'])
+        print("✓ Место забронировано")
+
+        # Шаг 2: Второй покупатель видит бронь и не может ее перехватить
+        print("\nШаг 2: Проверка брони для второго покупателя...")
+        seat_map = SeatMapService.get_seat_map(self.screening, self.second_user)
+        self.assertIn(self.seat.id, seat_map['held_seat_ids'])
+        self.assertNotIn(self.seat.id, SeatMapService.get_seat_map(self.screening, self.first_user)['held_seat_ids'])
+
+        response = self._hold(self.second_client, [self.seat.id])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['unavailable'], [self.seat.id])
+
+        response = self.second_client.post(
+            reverse('book_tickets'),
+            {'screening_id': self.screening.id, 'selected_seats': json.dumps([self.seat.id])},
+            follow=True
+        )
+        message_texts = [str(message) for message in response.context['messages']]
+        self.assertIn('Место 1-1 временно забронировано другим покупателем.', message_texts)
+        self.assertFalse(Ticket.objects.exists())
+        print("✓ Чужая бронь защищает место")
+
+        # Шаг 3: Первый покупатель оформляет покупку, бронь снимается
+        print("\nШаг 3: Покупка забронированного места...")
+        response = self.first_client.post(
+            reverse('book_tickets'),
+            {'screening_id': self.screening.id, 'selected_seats': json.dumps([self.seat.id])}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Ticket.objects.filter(user=self.first_user, seat=self.seat).count(), 1)
+        self.assertEqual(SeatHoldService.get_holds(self.screening), {})
+        print("✓ Билет куплен, бронь снята")
+
+        print("\n" + "=" * 60)
+        print("РЕЗУЛЬТАТ: ТЕСТ УСПЕШНО ПРОЙДЕН ✅")
+        print("=" * 60)
+
+    @override_settings(SEAT_HOLD_CACHE=None, SEAT_HOLD_TTL=0, SEAT_HOLD_SWEEP_BATCH=5)
+    def test_fpos_06_expired_holds_swept_in_batches(self):
+        """FPOS-06: Истекшие брони освобождают места и удаляются порциями"""
+        print("\n" + "=" * 60)
+        print("FPOS-06-тест-временной-брони-6")
+        print("Тест: Очистка истекших броней")
+        print("=" * 60)
+
+        SeatHoldService.reset_store()
+        store = SeatHoldService.get_store()
+        self.assertIsInstance(store, MemorySeatHoldStore)
+
+        seat_ids = list(Seat.objects.filter(hall=self.hall).values_list('id', flat=True)[:8])
+        success, conflicts, _ = SeatHoldService.hold_seats(self.screening, seat_ids, self.first_user)
+        self.assertTrue(success)
+        self.assertEqual(SeatHoldService.get_held_seat_ids(self.screening, self.second_user), set())
+        print("✓ Истекшие брони не блокируют места")
+
+        # Чтение броней уже удалило первую порцию из 5 записей
+        self.assertEqual(store.sweep(), 3)
+        self.assertEqual(store.sweep(), 0)
+        self.assertEqual(store._holds, {})
+        print("✓ Истекшие брони удалены порциями")
+
+        print("\n" + "=" * 60)
+        print("РЕЗУЛЬТАТ: ТЕСТ УСПЕШНО ПРОЙДЕН ✅")
+        print("=" * 60)
@@ -0,0 +1,138 @@
+"""
+FPOS-04-тест-схемы-зала-4
+Схема зала строится за фиксированное число запросов
+"""
+from datetime import timedelta
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from ticket.models import User, Movie, Hall, Screening, Ticket, TicketStatus, Genre, AgeRating, Seat
+from ticket.seat_utils import HallLayout, HallLayoutCache, SeatMapService
+
+
+class SeatMapTest(TestCase):
+    """Тестирование сервиса схемы зала"""
+
+    def setUp(self):
+        """Настройка тестовых данных"""
+        print("\nНастройка тестовых данных для схемы зала...")
+
+        self.user = User.objects.create_user(
+            email='seatmap@example.com',
+            password='testpass123',
+            name='Схема',
+            surname='Зала',
+            number='+79123456784',
+            is_email_verified=True
+        )
+
+        genre = Genre.objects.create(name='Фантастика')
+        age_rating = AgeRating.objects.create(name='12+', description='Для детей старше 12 лет')
+        movie = Movie.objects.create(
+            title='Фильм для схемы зала',
+            description='Описание',
+            duration=timedelta(hours=2),
+            genre=genre,
+            age_rating=age_rating
+        )
+
+        self.hall = Hall.objects.create(name='Зал IMAX', rows=6, seats_per_row=10)
+        self.active_status = TicketStatus.objects.create(
+            code='active',
+            name='Активный',
+            is_active=True,
+            can_be_refunded=True
+        )
+
+        start_time = timezone.localtime(timezone.now() + timedelta(days=1)).replace(
+            hour=12, minute=0, second=0, microsecond=0
+        )
+        self.screening = Screening.objects.create(
+            movie=movie,
+            hall=self.hall,
+            start_time=start_time,
+            price=500
+        )
+
+        self.client = Client()
+
+    def _sell_seats(self, count):
+        for seat in Seat.objects.filter(hall=self.hall).order_by('row', 'number')[:count]:
+            Ticket.objects.create(
+                user=self.user,
+                screening=self.screening,
+                seat=seat,
+                status=self.active_status
+            )
+
+    def _count_partial_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('screening_partial', args=[self.screening.id]))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_fpos_04_seat_map_constant_queries(self):
+        """FPOS-04: Количество запросов не зависит от числа проданных мест"""
+        print("\n" + "=" * 60)
+        print("FPOS-04-тест-схемы-зала-4")
+        print("Тест: Схема зала за фиксированное число запросов")
+        print("=" * 60)
+
+        # Шаг 1: Пустой зал (первый запрос загружает схему зала в кэш)
+        print("Шаг 1: Схема пустого зала...")
+        self._count_partial_queries()
+        empty_queries = self._count_partial_queries()
+        print(f"✓ Запросов для пустого зала: {empty_queries}")
+
+        # Шаг 2: Продаем половину зала
+        print("\nШаг 2: Схема зала с проданными местами...")
+        self._sell_seats(30)
+        sold_queries = self._count_partial_queries()
+        print(f"✓ Запросов для заполненного зала: {sold_queries}")
+
+        self.assertEqual(empty_queries, sold_queries)
+
+        # Шаг 3: Содержимое схемы
+        print("\nШаг 3: Проверка данных схемы...")
+        seat_map = SeatMapService.get_seat_map(self.screening)
+        self.assertEqual(len(seat_map['rows']), 6)
+        self.assertEqual(len(seat_map['booked_seat_ids']), 30)
+        self.assertTrue(all(len(seats) == 10 for seats in seat_map['rows'].values()))
+        print("✓ Ряды и занятые места определены корректно")
+
+        with self.assertLogs('ticket.seat_utils', level='WARNING') as logs:
+            layout = HallLayout.from_seats(0, [(1, 1, 1), (2, 1, 2), (3, 0, 2), (4, 1, 0)])
+        self.assertEqual((layout.seat_id(1, 1), layout.seat_id(1, 2), len(layout)), (1, 2, 2))
+        self.assertEqual(len(logs.output), 2)
+        print("✓ Места с рядом или номером 0 пропущены, соседние ячейки не затерты")
+
+        # Шаг 4: Схема зала из кэша не обращается к таблице мест
+        print("\nШаг 4: Проверка кэша схемы зала...")
+        with CaptureQueriesContext(connection) as ctx:
+            rows = SeatMapService.get_hall_rows(self.hall)
+            seats = SeatMapService.get_hall_seats(self.hall, [rows[2][3].id, -1])
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(list(seats), [rows[2][3].id])
+        self.assertEqual((seats[rows[2][3].id].row, seats[rows[2][3].id].number), (2, 4))
+        print("✓ Схема зала берется из кэша")
+
+        # Шаг 5: Изменение мест зала сбрасывает кэш
+        print("\nШаг 5: Инвалидация схемы при изменении зала...")
+        Seat.objects.filter(hall=self.hall, row=6).delete()
+        Hall.invalidate_seat_layout(self.hall.id)
+        self.assertEqual(len(SeatMapService.get_hall_rows(self.hall)), 5)
+        print("✓ Схема зала перестроена после изменения")
+
+        # Шаг 6: Инвалидация из другого процесса (меняется только версия в общем кэше)
+        print("\nШаг 6: Инвалидация схемы другим процессом...")
+        Seat.objects.filter(hall=self.hall, row=5).delete()
+        caches['default'].set(HallLayoutCache.VERSION_KEY.format(hall_id=self.hall.id), 'other-process', None)
+        self.assertEqual(len(SeatMapService.get_hall_rows(self.hall)), 4)
+        print("✓ Схема процесса сброшена по версии из общего кэша")
+
+        print("\n" + "=" * 60)
+        print("РЕЗУЛЬТАТ: ТЕСТ УСПЕШНО ПРОЙДЕН ✅")
+        print("=" * 60)
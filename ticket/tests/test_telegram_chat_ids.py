@@ -0,0 +1,86 @@
+"""
+FPOS-21-тест-приведения-chat-id-21
+Некорректные, дополненные и повторяющиеся chat id приводятся к целому уникальному значению
+"""
+import io
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase
+from ticket.management.commands.normalize_telegram_chat_ids import Command
+from ticket.models import User
+
+
+class TelegramChatIdNormalizationTest(TestCase):
+    """Тестирование команды normalize_telegram_chat_ids"""
+
+    def setUp(self):
+        """Настройка тестовых данных"""
+        print("\nНастройка тестовых данных для chat id...")
+
+        # Значения строкового столбца до миграции (в БД уже целый уникальный столбец)
+        raw = [
+            ('invalid', 'abc', True),
+            ('padded', ' 700 ', True),
+            ('duplicate_old', '555', False),
+            ('duplicate_verified', '0555', True),
+            ('tie_first', '900', False),
+            ('tie_last', '900', False),
+        ]
+        self.users = {}
+        self.rows = []
+        for index, (name, value, verified) in enumerate(raw):
+            user = User.objects.create_user(
+                email=f'{name}@example.com',
+                password='testpass123',
+                name='Чат',
+                surname=name,
+                number=f'+7912345670{index}',
+                telegram_chat_id=900 if name == 'tie_last' else index + 1,
+                is_telegram_verified=verified
+            )
+            self.users[name] = user
+            self.rows.append((user.pk, value, verified))
+
+    def _chat_id(self, name):
+        return User.objects.get(pk=self.users[name].pk).telegram_chat_id
+
+    def test_fpos_21_normalize_chat_ids(self):
+        """FPOS-21: Приведение chat id перед миграцией на целый уникальный столбец"""
+        print("\n" + "=" * 60)
+        print("FPOS-21-тест-приведения-chat-id-21")
+        print("Тест: Приведение Telegram chat id")
+        print("=" * 60)
+
+        # Шаг 1: Разбор значений
+        print("\nШаг 1: Разбор значений...")
+        invalid, normalized, duplicates = Command.plan(self.rows)
+        self.assertEqual(invalid, [self.users['invalid'].pk])
+        self.assertEqual(normalized, [(self.users['padded'].pk, 700), (self.users['duplicate_verified'].pk, 555)])
+        self.assertEqual(sorted(duplicates), [self.users['duplicate_old'].pk, self.users['tie_first'].pk])
+        print("✓ Найдены некорректные, дополненные и повторяющиеся chat id")
+
+        # Шаг 2: Пробный запуск ничего не меняет
+        print("\nШаг 2: Пробный запуск...")
+        with mock.patch.object(Command, 'read_rows', return_value=self.rows):
+            out = io.StringIO()
+            call_command('normalize_telegram_chat_ids', dry_run=True, stdout=out)
+        self.assertIn('некорректных: 1, к приведению: 2, дубликатов: 2', out.getvalue())
+        self.assertEqual(self._chat_id('invalid'), 1)
+        print("✓ Данные не изменены")
+
+        # Шаг 3: Приведение
+        print("\nШаг 3: Приведение chat id...")
+        with mock.patch.object(Command, 'read_rows', return_value=self.rows):
+            call_command('normalize_telegram_chat_ids', stdout=io.StringIO())
+        for name in ('invalid', 'duplicate_old', 'tie_first'):
+            user = User.objects.get(pk=self.users[name].pk)
+            self.assertIsNone(user.telegram_chat_id)
+            self.assertFalse(user.is_telegram_verified)
+        self.assertEqual(self._chat_id('padded'), 700)
+        self.assertEqual(self._chat_id('duplicate_verified'), 555)
+        self.assertEqual(self._chat_id('tie_last'), 900)
+        print("✓ Чат остается за подтвердившим (или последним) аккаунтом, значения приведены")
+
+        print("\n" + "=" * 60)
+        print("РЕЗУЛЬТАТ: ТЕСТ УСПЕШНО ПРОЙДЕН ✅")
+        print("=" * 60)
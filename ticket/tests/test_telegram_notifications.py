@@ -0,0 +1,121 @@
+"""
+FPOS-17-тест-очереди-уведомлений-17
+Покупка ставит уведомление в очередь, бот отправляет его в своем event loop
+"""
+import json
+from datetime import timedelta
+from asgiref.sync import async_to_sync
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+from telegram.error import Forbidden, RetryAfter
+from ticket.models import User, Movie, Hall, Screening, TicketStatus, Genre, AgeRating, Seat, TelegramNotification
+from ticket.telegram_bot.notifications import NotificationDispatcher
+from ticket.telegram_bot.sender import OutboundSender
+
+
+class FakeBot:
+    """Бот без сети: запоминает сообщения, ошибки задаются по chat_id"""
+
+    def __init__(self, errors=None):
+        self.sent = []
+        self.errors = errors or {}
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        if chat_id in self.errors:
+            raise self.errors.pop(chat_id)
+        self.sent.append((chat_id, text))
+
+
+class TelegramNotificationTest(TestCase):
+    """Тестирование очереди уведомлений Telegram"""
+
+    def setUp(self):
+        """Настройка тестовых данных"""
+        print("\nНастройка тестовых данных для уведомлений...")
+
+        self.user = User.objects.create_user(
+            email='notify@example.com',
+            password='testpass123',
+            name='Уведомление',
+            surname='Тестовое',
+            number='+79123456780',
+            is_email_verified=True,
+            telegram_chat_id='555000111',
+            is_telegram_verified=True
+        )
+        genre = Genre.objects.create(name='Детектив')
+        age_rating = AgeRating.objects.create(name='18+', description='Для взрослых')
+        hall = Hall.objects.create(name='Зал уведомлений', rows=2, seats_per_row=5)
+        TicketStatus.objects.create(code='active', name='Активный', is_active=True, can_be_refunded=True)
+        movie = Movie.objects.create(
+            title='Фильм уведомлений',
+            description='Описание',
+            duration=timedelta(minutes=110),
+            genre=genre,
+            age_rating=age_rating
+        )
+        self.screening = Screening.objects.create(
+            movie=movie, hall=hall, start_time=timezone.now() + timedelta(days=2), price=500
+        )
+        self.seat_ids = list(Seat.objects.filter(hall=hall).order_by('row', 'number').values_list('id', flat=True))
+
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_fpos_17_telegram_notifications(self):
+        """FPOS-17: Очередь, отправка, повтор и отказ"""
+        print("\n" + "=" * 60)
+        print("FPOS-17-тест-очереди-уведомлений-17")
+        print("Тест: Очередь уведомлений Telegram")
+        print("=" * 60)
+
+        # Шаг 1: Покупка только ставит уведомление в очередь
+        print("\nШаг 1: Покупка билетов...")
+        response = self.client.post(reverse('book_tickets'), {
+            'screening_id': self.screening.id,
+            'selected_seats': json.dumps(self.seat_ids[:2])
+        })
+        self.assertEqual(response.status_code, 302)
+        notification = TelegramNotification.objects.get()
+        self.assertEqual(notification.status, 'pending')
+        self.assertIn('Фильм уведомлений', notification.text)
+        print("✓ Уведомление в очереди")
+
+        # Шаг 2: Бот получает ограничение частоты - уведомление откладывается
+        print("\nШаг 2: Ограничение частоты Telegram...")
+        bot = FakeBot(errors={'555000111': RetryAfter(30)})
+        # Без повторов в OutboundSender - повтор планируется в БД
+        dispatcher = NotificationDispatcher(OutboundSender(bot, max_retries=0))
+        async_to_sync(dispatcher.dispatch_pending)()
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'pending')
+        self.assertEqual(notification.attempts, 1)
+        self.assertGreater(notification.available_at, timezone.now() + timedelta(seconds=20))
+        self.assertEqual(async_to_sync(dispatcher.dispatch_pending)(), 0)
+        print("✓ Повтор запланирован через 30 секунд")
+
+        # Шаг 3: Отправка после задержки
+        print("\nШаг 3: Отправка...")
+        TelegramNotification.objects.update(available_at=timezone.now())
+        dispatcher.sender.paused_until = 0
+        self.assertEqual(async_to_sync(dispatcher.dispatch_pending)(), 1)
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'sent')
+        self.assertEqual(bot.sent[0][0], '555000111')
+        print("✓ Уведомление отправлено")
+
+        # Шаг 4: Бот заблокирован пользователем - без повторов
+        print("\nШаг 4: Бот заблокирован...")
+        self.client.post(reverse('book_tickets'), {
+            'screening_id': self.screening.id,
+            'selected_seats': json.dumps(self.seat_ids[2:3])
+        })
+        bot.errors['555000111'] = Forbidden('bot was blocked by the user')
+        async_to_sync(dispatcher.dispatch_pending)()
+        self.assertEqual(TelegramNotification.objects.filter(status='failed').count(), 1)
+        print("✓ Уведомление отмечено ошибкой")
+
+        print("\n" + "=" * 60)
+        print("РЕЗУЛЬТАТ: ТЕСТ УСПЕШНО ПРОЙДЕН ✅")
+        print("=" * 60)
@@ -0,0 +1,108 @@
+"""
+FPOS-19-тест-напоминаний-о-сеансе-19
+Напоминания о сеансах: окна до начала, одно на группу, без повторов
+"""
+from datetime import timedelta
+from asgiref.sync import async_to_sync
+from django.test import TestCase
+from django.utils import timezone
+from ticket.models import User, Movie, Hall, Screening, Ticket, TicketStatus, Genre, AgeRating, Seat, \
+    TelegramNotification
+from ticket.notification_utils import TelegramNotificationQueue
+from ticket.telegram_bot.reminders import ReminderScheduler
+
+
+class TelegramReminderTest(TestCase):
+    """Тестирование напоминаний о сеансах"""
+
+    def setUp(self):
+        """Настройка тестовых данных"""
+        print("\nНастройка тестовых данных для напоминаний...")
+
+        self.now = timezone.now()
+        self.user = User.objects.create_user(
+            email='remind@example.com',
+            password='testpass123',
+            name='Напоминание',
+            surname='Тестовое',
+            number='+79123456781',
+            telegram_chat_id='555000222',
+            is_telegram_verified=True
+        )
+        other = User.objects.create_user(
+            email='nobot@example.com',
+            password='testpass123',
+            name='Без',
+            surname='Телеграма',
+            number='+79123456782'
+        )
+        genre = Genre.objects.create(name='Триллер')
+        age_rating = AgeRating.objects.create(name='16+', description='С 16 лет')
+        hall = Hall.objects.create(name='Зал напоминаний', rows=2, seats_per_row=5)
+        active = TicketStatus.objects.create(code='active', name='Активный', is_active=True)
+        # Как в рабочих данных: запись статуса включена, но билет недействителен
+        refunded = TicketStatus.objects.create(code='refunded', name='Возвращен', is_active=True)
+        movie = Movie.objects.create(
+            title='Фильм напоминаний',
+            description='Описание',
+            duration=timedelta(minutes=100),
+            genre=genre,
+            age_rating=age_rating
+        )
+        # Сеанс через сутки (окно 24 ч наступило 30 секунд назад) и сеанс через 3 часа
+        self.screening = Screening.objects.create(
+            movie=movie, hall=hall, start_time=self.now + timedelta(hours=24, seconds=-30), price=400
+        )
+        later = Screening.objects.create(
+            movie=movie, hall=hall, start_time=self.now + timedelta(hours=3), price=400
+        )
+        seats = list(Seat.objects.filter(hall=hall).order_by('row', 'number'))
+
+        for seat in seats[:2]:
+            Ticket.objects.create(user=self.user, screening=self.screening, seat=seat, status=active,
+                                  group_id='group_remind')
+        Ticket.objects.create(user=self.user, screening=self.screening, seat=seats[2], status=refunded,
+                              group_id='group_refunded')
+        Ticket.objects.create(user=other, screening=self.screening, seat=seats[3], status=active,
+                              group_id='group_other')
+        Ticket.objects.create(user=self.user, screening=later, seat=seats[0], status=active,
+                              group_id='group_later')
+
+    def test_fpos_19_telegram_reminders(self):
+        """FPOS-19: Напоминания о сеансах"""
+        print("\n" + "=" * 60)
+        print("FPOS-19-тест-напоминаний-о-сеансе-19")
+        print("Тест: Напоминания о сеансах в Telegram")
+        print("=" * 60)
+
+        # Шаг 1: Одно напоминание на группу, только активные билеты привязанных пользователей
+        print("\nШаг 1: Постановка напоминаний...")
+        with self.assertNumQueries(3):
+            created = TelegramNotificationQueue.enqueue_reminders(self.now - timedelta(minutes=1), self.now)
+        self.assertEqual(created, 1)
+        reminder = TelegramNotification.objects.get()
+        self.assertEqual(reminder.kind, 'reminder')
+        self.assertEqual(reminder.chat_id, '555000222')
+        self.assertEqual(reminder.dedup_key, 'reminder:1440:group_remind')
+        self.assertEqual(reminder.payload['ticket_count'], 2)
+        self.assertIn('завтра', reminder.text)
+        self.assertFalse(TelegramNotification.objects.filter(dedup_key__endswith=':group_refunded').exists())
+        print("✓ Напоминание за сутки поставлено в очередь")
+
+        # Шаг 2: Повторный проход (перезапуск бота) не дублирует напоминание
+        print("\nШаг 2: Перезапуск планировщика...")
+        scheduler = ReminderScheduler()
+        self.assertEqual(async_to_sync(scheduler.tick)(self.now), 0)
+        self.assertEqual(TelegramNotification.objects.count(), 1)
+        print("✓ Повторной отправки нет")
+
+        # Шаг 3: Окно за час наступает через 2 часа
+        print("\nШаг 3: Напоминание за час...")
+        self.assertEqual(async_to_sync(scheduler.tick)(self.now + timedelta(hours=1)), 0)
+        self.assertEqual(async_to_sync(scheduler.tick)(self.now + timedelta(hours=2, seconds=1)), 1)
+        self.assertTrue(TelegramNotification.objects.filter(dedup_key='reminder:60:group_later').exists())
+        print("✓ Напоминание за час поставлено в очередь")
+
+        print("\n" + "=" * 60)
+        print("РЕЗУЛЬТАТ: ТЕСТ УСПЕШНО ПРОЙДЕН ✅")
+        print("=" * 60)
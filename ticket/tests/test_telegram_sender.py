@@ -0,0 +1,102 @@
+"""
+FPOS-18-тест-отправки-сообщений-18
+Исходящие сообщения бота: лимиты частоты, приоритет и повторы
+"""
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+from telegram.error import Forbidden, NetworkError, RetryAfter
+from ticket.telegram_bot.sender import OutboundSender, TokenBucket, PRIORITY_HIGH, PRIORITY_LOW
+
+
+class FakeBot:
+    """Бот без сети: запоминает сообщения, ошибки задаются списком по chat_id"""
+
+    def __init__(self, errors=None):
+        self.sent = []
+        self.errors = errors or {}
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if self.errors.get(chat_id):
+            raise self.errors[chat_id].pop(0)
+        self.sent.append((chat_id, text))
+        return len(self.sent)
+
+
+class TelegramSenderTest(SimpleTestCase):
+    """Тестирование OutboundSender"""
+
+    def test_fpos_18_telegram_sender(self):
+        """FPOS-18: Ограничение частоты, приоритет, повторы и метрики"""
+        print("\n" + "=" * 60)
+        print("FPOS-18-тест-отправки-сообщений-18")
+        print("Тест: Исходящие сообщения Telegram")
+        print("=" * 60)
+
+        # Шаг 1: Токены расходуются и восстанавливаются со временем
+        print("\nШаг 1: Ограничение частоты...")
+        now = [0.0]
+        bucket = TokenBucket(rate=1, capacity=2, clock=lambda: now[0])
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 1.0)
+        self.assertEqual(bucket.reserve(), 2.0)
+        now[0] = 10.0
+        self.assertEqual(bucket.reserve(), 0)
+        print("✓ Лишние сообщения ждут освобождения токена")
+
+        # Шаг 2: Сообщения с высоким приоритетом уходят первыми
+        print("\nШаг 2: Приоритет...")
+        bot = FakeBot()
+        sender = OutboundSender(bot, rate=1000, chat_rate=1000, chat_burst=10, workers=1, max_retries=2)
+
+        async def send_all():
+            futures = [
+                sender.send('1', 'рассылка', priority=PRIORITY_LOW),
+                sender.send('2', 'покупка', priority=PRIORITY_HIGH),
+            ]
+            results = [await future for future in futures]
+            await sender.stop()
+            return results
+
+        async_to_sync(send_all)()
+        self.assertEqual([text for _, text in bot.sent], ['покупка', 'рассылка'])
+        print("✓ Порядок отправки по приоритету")
+
+        # Шаг 3: 429 и сетевые ошибки повторяются, блокировка бота - нет
+        print("\nШаг 3: Повторы...")
+        bot = FakeBot(errors={
+            '1': [RetryAfter(0), NetworkError('connection reset')],
+            '2': [Forbidden('bot was blocked by the user')],
+        })
+        sender = OutboundSender(bot, rate=1000, chat_rate=1000, chat_burst=10, workers=2, max_retries=2,
+                                base_delay=0.01)
+
+        async def send_with_errors():
+            delivered = await sender.send('1', 'билет')
+            try:
+                await sender.send('2', 'билет')
+            except Forbidden:
+                blocked = True
+            else:
+                blocked = False
+            await sender.stop()
+            return delivered, blocked
+
+        delivered, blocked = async_to_sync(send_with_errors)()
+        self.assertEqual(delivered, 1)
+        self.assertTrue(blocked)
+        print("✓ Сообщение доставлено после повторов, заблокированный чат без повторов")
+
+        # Шаг 4: Метрики доставки
+        print("\nШаг 4: Метрики...")
+        metrics = sender.get_metrics()
+        self.assertEqual(metrics['sent'], 1)
+        self.assertEqual(metrics['failed'], 1)
+        self.assertEqual(metrics['retried'], 2)
+        self.assertEqual(metrics['rate_limited'], 1)
+        self.assertEqual(metrics['queue_size'], 0)
+        print(f"✓ Метрики: {metrics}")
+
+        print("\n" + "=" * 60)
+        print("РЕЗУЛЬТАТ: ТЕСТ УСПЕШНО ПРОЙДЕН ✅")
+        print("=" * 60)
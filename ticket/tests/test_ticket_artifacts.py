@@ -0,0 +1,118 @@
+"""
+FPOS-12-тест-хранилища-билетов-12
+Повторное скачивание билета отдает сохраненный PDF и поддерживает ETag
+"""
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from django.core.files.storage import default_storage
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from ticket.models import User, Movie, Hall, Screening, Ticket, TicketStatus, Genre, AgeRating, Seat
+
+
+class TicketArtifactTest(TestCase):
+    """Тестирование хранилища готовых PDF и QR-кодов билетов"""
+
+    def setUp(self):
+        """Настройка тестовых данных"""
+        print("\nНастройка тестовых данных для хранилища билетов...")
+
+        self.media_root = tempfile.mkdtemp()
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+
+        self.user = User.objects.create_user(
+            email='artifacts@example.com',
+            password='testpass123',
+            name='Хранилище',
+            surname='Билетов',
+            number='+79123456784',
+            is_email_verified=True
+        )
+        genre = Genre.objects.create(name='Триллер')
+        age_rating = AgeRating.objects.create(name='16+', description='Для детей старше 16 лет')
+        hall = Hall.objects.create(name='Зал хранилища', rows=2, seats_per_row=5)
+        active_status = TicketStatus.objects.create(
+            code='active', name='Активный', is_active=True, can_be_refunded=True
+        )
+        self.refunded_status = TicketStatus.objects.create(
+            code='refunded', name='Возвращен', is_active=False, can_be_refunded=False
+        )
+        movie = Movie.objects.create(
+            title='Фильм хранилища',
+            description='Описание',
+            duration=timedelta(minutes=95),
+            genre=genre,
+            age_rating=age_rating
+        )
+        screening = Screening.objects.create(
+            movie=movie, hall=hall, start_time=timezone.now() + timedelta(days=1), price=300
+        )
+        self.tickets = [
+            Ticket.objects.create(user=self.user, screening=screening, seat=seat,
+                                  status=active_status, group_id='artifact-group')
+            for seat in Seat.objects.filter(hall=hall)[:2]
+        ]
+
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse('download_ticket_group', args=['artifact-group'])
+
+    def test_fpos_12_ticket_artifacts(self):
+        """FPOS-12: PDF и QR-код сохраняются, повторные скачивания не отрисовывают билет"""
+        print("\n" + "=" * 60)
+        print("FPOS-12-тест-хранилища-билетов-12")
+        print("Тест: Хранилище готовых билетов")
+        print("=" * 60)
+
+        # Шаг 1: Первое скачивание сохраняет PDF и QR-код
+        print("\nШаг 1: Первое скачивание...")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(response.content.startswith(b'%PDF'))
+        etag = response['ETag']
+        qr_path = Ticket.objects.get(pk=self.tickets[0].pk).qr_code.name
+        self.assertTrue(qr_path and default_storage.exists(qr_path))
+        print(f"✓ PDF отдан, QR-код сохранен: {qr_path}")
+
+        # Шаг 2: Повторное скачивание без отрисовки
+        print("\nШаг 2: Повторное скачивание...")
+        with mock.patch('ticket.utils.generate_enhanced_ticket_pdf') as render:
+            repeat = self.client.get(self.url)
+            render.assert_not_called()
+        self.assertEqual(repeat.content, response.content)
+        self.assertEqual(repeat['ETag'], etag)
+        print("✓ PDF отдан из хранилища")
+
+        # Шаг 3: Условный запрос
+        print("\nШаг 3: Условный запрос с If-None-Match...")
+        not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+        print("✓ Ответ 304 Not Modified")
+
+        # Шаг 4: Смена статуса удаляет файлы группы
+        print("\nШаг 4: Смена статуса билета...")
+        ticket = self.tickets[1]
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.status = self.refunded_status
+            ticket.save()
+        self.assertFalse(default_storage.exists(qr_path))
+        self.assertFalse(Ticket.objects.filter(qr_code=qr_path).exists())
+
+        self.user.is_staff = True
+        self.user.save()
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+        print("✓ После смены статуса билет отрисован заново")
+
+        print("\n" + "=" * 60)
+        print("РЕЗУЛЬТАТ: ТЕСТ УСПЕШНО ПРОЙДЕН ✅")
+        print("=" * 60)
@@ -0,0 +1,112 @@
+"""
+FPOS-13-тест-пакетной-отрисовки-билетов-13
+Билеты нескольких групп отрисовываются пулом процессов и выгружаются архивом
+"""
+import io
+import shutil
+import tempfile
+import zipfile
+from datetime import timedelta
+from django.core.files.storage import default_storage
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from ticket.models import User, Movie, Hall, Screening, Ticket, TicketStatus, Genre, AgeRating, Seat
+from ticket.ticket_artifact_utils import TicketArtifactStore, TicketBatchRenderer
+
+
+class TicketBatchRenderTest(TestCase):
+    """Тестирование пакетной отрисовки PDF билетов"""
+
+    def setUp(self):
+        """Настройка тестовых данных"""
+        print("\nНастройка тестовых данных для пакетной отрисовки...")
+
+        self.media_root = tempfile.mkdtemp()
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+
+        self.admin = User.objects.create_superuser(
+            email='batch-admin@example.com',
+            password='adminpass123',
+            name='Пакетный',
+            surname='Админ',
+            number='+79123456783',
+            is_email_verified=True
+        )
+        genre = Genre.objects.create(name='Мультфильм')
+        age_rating = AgeRating.objects.create(name='6+', description='Для детей старше 6 лет')
+        hall = Hall.objects.create(name='Зал пакетов', rows=2, seats_per_row=5)
+        status = TicketStatus.objects.create(code='active', name='Активный', is_active=True, can_be_refunded=True)
+        movie = Movie.objects.create(
+            title='Фильм пакетов',
+            description='Описание',
+            duration=timedelta(minutes=80),
+            genre=genre,
+            age_rating=age_rating
+        )
+        self.screening = Screening.objects.create(
+            movie=movie, hall=hall, start_time=timezone.now() + timedelta(days=1), price=250
+        )
+        seats = list(Seat.objects.filter(hall=hall)[:3])
+        for index, seat in enumerate(seats):
+            Ticket.objects.create(user=self.admin, screening=self.screening, seat=seat, status=status,
+                                  group_id='batch-group' if index < 2 else None)
+
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def get_groups(self):
+        tickets = Ticket.objects.select_related(*TicketArtifactStore.TICKET_RELATED).order_by('id')
+        return TicketBatchRenderer.group_tickets(tickets)
+
+    @override_settings(TICKET_RENDER_WORKERS=0)
+    def test_fpos_13_ticket_batch_render(self):
+        """FPOS-13: Пакетная отрисовка сохраняет PDF, админка отдает ZIP"""
+        print("\n" + "=" * 60)
+        print("FPOS-13-тест-пакетной-отрисовки-билетов-13")
+        print("Тест: Пакетная отрисовка билетов")
+        print("=" * 60)
+
+        # Шаг 1: Отрисовка всех групп
+        print("\nШаг 1: Отрисовка групп билетов...")
+        groups = self.get_groups()
+        self.assertEqual(len(groups), 2)
+        results = list(TicketBatchRenderer.render(groups))
+        self.assertEqual(len(results), 2)
+        for item in results:
+            self.assertIsNone(item.error)
+            self.assertTrue(item.pdf.startswith(b'%PDF'))
+            version = TicketArtifactStore.get_version(item.tickets)
+            self.assertTrue(default_storage.exists(TicketArtifactStore.get_path(item.tickets, version, 'pdf')))
+        print("✓ PDF всех групп отрисованы и сохранены")
+
+        # Шаг 2: Повторная отрисовка берет файлы из хранилища
+        print("\nШаг 2: Повторная отрисовка...")
+        ready, jobs = TicketBatchRenderer._prepare(self.get_groups())
+        self.assertEqual(len(ready), 2)
+        self.assertEqual(jobs, [])
+        print("✓ Готовые PDF не отрисовываются заново")
+
+        # Шаг 3: Выгрузка из админки
+        print("\nШаг 3: Выгрузка билетов сеанса из админки...")
+        # Возвращенный билет в архив не попадает (запись статуса при этом включена)
+        refunded = TicketStatus.objects.create(code='refunded', name='Возвращен', is_active=True)
+        Ticket.objects.create(user=self.admin, screening=self.screening,
+                              seat=Seat.objects.filter(hall=self.screening.hall).last(), status=refunded)
+        response = self.client.post(reverse('admin:ticket_screening_changelist'), {
+            'action': 'export_tickets_pdf',
+            '_selected_action': [self.screening.pk],
+        })
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+            names = archive.namelist()
+            self.assertEqual(len(names), 2)
+            self.assertTrue(all(archive.read(name).startswith(b'%PDF') for name in names))
+        print(f"✓ Архив содержит {len(names)} PDF")
+
+        print("\n" + "=" * 60)
+        print("РЕЗУЛЬТАТ: ТЕСТ УСПЕШНО ПРОЙДЕН ✅")
+        print("=" * 60)
@@ -0,0 +1,307 @@
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import posixpath
+import threading
+from collections import namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from .models import Ticket
+
+logger = logging.getLogger(__name__)
+
+
+class TicketArtifactStore:
+    """
+    Готовые PDF и QR-коды билетов в файловом хранилище
+
+    Файлы лежат в TICKET_ARTIFACTS_DIR/<группа>/<версия>.pdf|png, где версия -
+    хэш содержимого билета (места, статусы, сеанс, фильм, покупатель). Любое
+    изменение дает новую версию, а смена статуса (возврат) удаляет файлы группы.
+    Версия служит ETag: повторное скачивание без изменений получает 304.
+    """
+
+    # Увеличить при изменении макета билета
+    TEMPLATE_VERSION = 1
+
+    TICKET_RELATED = ('screening__movie__genre', 'screening__hall', 'seat', 'status', 'user')
+
+    @staticmethod
+    def get_dir():
+        return getattr(settings, 'TICKET_ARTIFACTS_DIR', 'ticket_artifacts')
+
+    @staticmethod
+    def get_group_tickets(group_id, user=None):
+        """Билеты группы со всеми данными для PDF одним запросом"""
+        tickets = Ticket.objects.filter(group_id=group_id)
+        if user is not None:
+            tickets = tickets.filter(user=user)
+        return list(tickets.select_related(*TicketArtifactStore.TICKET_RELATED).order_by('id'))
+
+    @staticmethod
+    def group_key(ticket):
+        return ticket.group_id or f"single_{ticket.pk}"
+
+    @staticmethod
+    def get_version(tickets):
+        """Версия содержимого билетов группы"""
+        first_ticket = tickets[0]
+        screening = first_ticket.screening
+        content = {
+            'template': TicketArtifactStore.TEMPLATE_VERSION,
+            'tickets': [
+                (t.pk, t.status_id, t.seat.row, t.seat.number, t.screening_id)
+                for t in sorted(tickets, key=lambda t: t.pk)
+            ],
+            'screening': [screening.start_time.isoformat(), str(screening.price), screening.hall.name],
+            'movie': [screening.movie.title, str(screening.movie.genre), str(screening.movie.duration)],
+            'user': [first_ticket.user.name, first_ticket.user.surname, first_ticket.user.number],
+        }
+        digest = hashlib.sha256(json.dumps(content, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        return digest.hexdigest()[:32]
+
+    @staticmethod
+    def get_path(tickets, version, extension):
+        return posixpath.join(
+            TicketArtifactStore.get_dir(),
+            TicketArtifactStore.group_key(tickets[0]),
+            f"{version}.{extension}"
+        )
+
+    @staticmethod
+    def read(path):
+        """Содержимое сохраненного файла (None - файла нет)"""
+        try:
+            if default_storage.exists(path):
+                with default_storage.open(path, 'rb') as artifact:
+                    return artifact.read()
+        except Exception as e:
+            logger.error(f"Error reading ticket artifact {path}: {e}")
+        return None
+
+    @staticmethod
+    def save(path, content):
+        try:
+            if not default_storage.exists(path):
+                default_storage.save(path, ContentFile(content))
+        except Exception as e:
+            # Билет отдаем и без сохранения в хранилище
+            logger.error(f"Error saving ticket artifact {path}: {e}")
+
+    @staticmethod
+    def _load_or_create(path, render):
+        """Содержимое файла из хранилища (при отсутствии - создаем и сохраняем)"""
+        content = TicketArtifactStore.read(path)
+        if content is None:
+            content = render()
+            TicketArtifactStore.save(path, content)
+        return content
+
+    @staticmethod
+    def link_qr(tickets, path):
+        """Сохранить путь к QR-коду в Ticket.qr_code"""
+        stale = [t.pk for t in tickets if t.qr_code.name != path]
+        if stale:
+            Ticket.objects.filter(pk__in=stale).update(qr_code=path)
+            for ticket in tickets:
+                ticket.qr_code.name = path
+
+    @staticmethod
+    def get_qr_png(tickets, version=None):
+        """QR-код группы (сохраняется в Ticket.qr_code)"""
+        from .utils import generate_ticket_qr_png
+
+        version = version or TicketArtifactStore.get_version(tickets)
+        path = TicketArtifactStore.get_path(tickets, version, 'png')
+        content = TicketArtifactStore._load_or_create(path, lambda: generate_ticket_qr_png(tickets))
+        TicketArtifactStore.link_qr(tickets, path)
+        return content
+
+    @staticmethod
+    def get_pdf(tickets, version=None):
+        """PDF группы билетов (из хранилища или отрисованный и сохраненный)"""
+        from .utils import generate_enhanced_ticket_pdf
+
+        version = version or TicketArtifactStore.get_version(tickets)
+        path = TicketArtifactStore.get_path(tickets, version, 'pdf')
+        return TicketArtifactStore._load_or_create(
+            path,
+            lambda: generate_enhanced_ticket_pdf(
+                tickets, qr_png=TicketArtifactStore.get_qr_png(tickets, version)
+            ).getvalue()
+        )
+
+    @staticmethod
+    def pdf_response(request, tickets, filename):
+        """Ответ с PDF билетов: ETag по версии содержимого, 304 при совпадении"""
+        version = TicketArtifactStore.get_version(tickets)
+        etag = quote_etag(version)
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(TicketArtifactStore.get_pdf(tickets, version), content_type='application/pdf')
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @staticmethod
+    def invalidate(group_key):
+        """Удалить файлы группы и ссылки на QR-коды"""
+        directory = posixpath.join(TicketArtifactStore.get_dir(), group_key)
+        try:
+            if default_storage.exists(directory):
+                _, files = default_storage.listdir(directory)
+                for name in files:
+                    default_storage.delete(posixpath.join(directory, name))
+
+            # Билеты группы по индексу (group_id или pk для одиночного билета)
+            if group_key.startswith('single_'):
+                tickets = Ticket.objects.filter(pk=int(group_key[len('single_'):]))
+            else:
+                tickets = Ticket.objects.filter(group_id=group_key)
+            tickets.exclude(qr_code__isnull=True).exclude(qr_code='').update(qr_code=None)
+        except Exception as e:
+            # Вызывается после коммита: ошибка не должна ломать уже выполненную операцию
+            logger.error(f"Error invalidating ticket artifacts {group_key}: {e}")
+
+
+RenderedTickets = namedtuple('RenderedTickets', ['tickets', 'pdf', 'error'])
+
+
+def _init_render_worker():
+    """Инициализация процесса отрисовки (для start method spawn)"""
+    import django
+    django.setup()
+
+
+def _render_ticket_group(tickets):
+    """Отрисовка PDF и QR-кода группы в процессе пула (без обращений к БД)"""
+    from .utils import generate_enhanced_ticket_pdf, generate_ticket_qr_png
+
+    qr_png = generate_ticket_qr_png(tickets)
+    return generate_enhanced_ticket_pdf(tickets, qr_png=qr_png).getvalue(), qr_png
+
+
+class TicketBatchRenderer:
+    """
+    Пакетная отрисовка PDF билетов в пуле процессов
+
+    Группы с готовым PDF в хранилище отдаются сразу, остальные отрисовываются
+    параллельно (ReportLab упирается в GIL) и возвращаются по мере готовности.
+    Билеты передаются в процессы вместе с загруженными связями (select_related),
+    поэтому процессы пула не обращаются к БД.
+    """
+
+    _executor = None
+    _executor_lock = threading.Lock()
+
+    @staticmethod
+    def get_workers():
+        return getattr(settings, 'TICKET_RENDER_WORKERS', 2)
+
+    @staticmethod
+    def get_executor():
+        with TicketBatchRenderer._executor_lock:
+            if TicketBatchRenderer._executor is None:
+                # spawn, а не fork: процесс Django многопоточный (запись журнала, задания
+                # отчетов) и держит соединения с БД
+                TicketBatchRenderer._executor = ProcessPoolExecutor(
+                    max_workers=TicketBatchRenderer.get_workers(),
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_render_worker
+                )
+            return TicketBatchRenderer._executor
+
+    @staticmethod
+    def group_tickets(tickets):
+        """Билеты → список групп в порядке первого появления"""
+        groups = {}
+        for ticket in tickets:
+            groups.setdefault(TicketArtifactStore.group_key(ticket), []).append(ticket)
+        return list(groups.values())
+
+    @staticmethod
+    def _prepare(ticket_groups):
+        """Готовые группы из хранилища и задания на отрисовку остальных"""
+        ready, jobs = [], []
+        for tickets in ticket_groups:
+            version = TicketArtifactStore.get_version(tickets)
+            pdf = TicketArtifactStore.read(TicketArtifactStore.get_path(tickets, version, 'pdf'))
+            if pdf is not None:
+                ready.append(RenderedTickets(tickets, pdf, None))
+            else:
+                jobs.append((tickets, version))
+        return ready, jobs
+
+    @staticmethod
+    def _submit(jobs):
+        """Запустить отрисовку: [(future, tickets, version), ...]"""
+        # Одну группу (или при TICKET_RENDER_WORKERS = 0) отрисовываем в текущем процессе
+        if len(jobs) <= 1 or TicketBatchRenderer.get_workers() <= 0:
+            submitted = []
+            for tickets, version in jobs:
+                future = Future()
+                try:
+                    future.set_result(_render_ticket_group(tickets))
+                except Exception as e:
+                    future.set_exception(e)
+                submitted.append((future, tickets, version))
+            return submitted
+
+        executor = TicketBatchRenderer.get_executor()
+        return [(executor.submit(_render_ticket_group, tickets), tickets, version) for tickets, version in jobs]
+
+    @staticmethod
+    def _finish(future, tickets, version):
+        """Сохранить результат отрисовки в хранилище"""
+        try:
+            pdf, qr_png = future.result()
+        except Exception as e:
+            logger.error(f"Error rendering tickets {TicketArtifactStore.group_key(tickets[0])}: {e}")
+            return RenderedTickets(tickets, None, e)
+
+        qr_path = TicketArtifactStore.get_path(tickets, version, 'png')
+        TicketArtifactStore.save(qr_path, qr_png)
+        TicketArtifactStore.link_qr(tickets, qr_path)
+        TicketArtifactStore.save(TicketArtifactStore.get_path(tickets, version, 'pdf'), pdf)
+        return RenderedTickets(tickets, pdf, None)
+
+    @staticmethod
+    def render(ticket_groups):
+        """
+        PDF для списка групп билетов по мере готовности
+
+        Yields:
+            RenderedTickets: билеты группы, PDF (bytes) и ошибка отрисовки
+        """
+        ready, jobs = TicketBatchRenderer._prepare(ticket_groups)
+        yield from ready
+
+        submitted = TicketBatchRenderer._submit(jobs)
+        by_future = {future: (tickets, version) for future, tickets, version in submitted}
+        for future in as_completed(by_future):
+            yield TicketBatchRenderer._finish(future, *by_future[future])
+
+    @staticmethod
+    async def arender(ticket_groups):
+        """Асинхронный вариант render() для Telegram-бота"""
+        ready, jobs = await sync_to_async(TicketBatchRenderer._prepare)(ticket_groups)
+        for item in ready:
+            yield item
+
+        submitted = await sync_to_async(TicketBatchRenderer._submit)(jobs)
+        by_future = {asyncio.wrap_future(future): (future, tickets, version) for future, tickets, version in submitted}
+        pending = set(by_future)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for wrapped in done:
+                yield await sync_to_async(TicketBatchRenderer._finish)(*by_future[wrapped])
@@ -14,6 +14,7 @@ urlpatterns = [
     path('movie/<int:movie_id>/', views.movie_detail, name='movie_detail'),
     path('screening/<int:screening_id>/', views.screening_detail, name='screening_detail'),
     path('screening/<int:screening_id>/partial/', views.screening_partial, name='screening_partial'),
+    path('screening/<int:screening_id>/hold/', views.hold_seats, name='hold_seats'),
     path('book/', views.book_tickets, name='book_tickets'),
     path('download-ticket/', views.download_ticket, name='download_ticket'),
     # Админка
@@ -1,88 +1,68 @@
-import os
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from django.conf import settings
 import qrcode
 from io import BytesIO
 from reportlab.lib.pagesizes import A5
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table
 from reportlab.lib.units import cm
 from django.utils import timezone
 import logging
+from .pdf_resources import PdfResources
+
 logger = logging.getLogger(__name__)
 
 
-try:
-    font_path = os.path.join(settings.BASE_DIR, 'ticket', 'fonts', 'DejaVuSans.ttf')
-    pdfmetrics.registerFont(TTFont('DejaVuSans', font_path))
-    base_font_name = 'DejaVuSans'
-except:
-    base_font_name = 'Helvetica'
-
-try:
-    font_path = os.path.join(settings.BASE_DIR, 'ticket', 'fonts', 'DejaVuSans.ttf')
-    bold_font_path = os.path.join(settings.BASE_DIR, 'ticket', 'fonts', 'DejaVuSans-Bold.ttf')
-
-    pdfmetrics.registerFont(TTFont('DejaVuSans', font_path))
-    pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', bold_font_path))
-
-    base_font_name = 'DejaVuSans'
-    bold_font_name = 'DejaVuSans-Bold'
-except Exception as e:
-    print(f"Error loading fonts: {e}")
-    base_font_name = 'Helvetica'
-    bold_font_name = 'Helvetica-Bold'
-
-styles = getSampleStyleSheet()
-custom_styles = {
-    'Title': ParagraphStyle(
-        name='Title',
-        fontName=base_font_name,
-        fontSize=18,
-        alignment=1,
-        spaceAfter=12
-    ),
-    'Header': ParagraphStyle(
-        name='Header',
-        fontName=base_font_name,
-        fontSize=12,
-        textColor=colors.darkblue,
-        spaceAfter=6
-    ),
-    'NormalCenter': ParagraphStyle(
-        name='NormalCenter',
-        fontName=base_font_name,
-        fontSize=10,
-        alignment=1,
-        spaceAfter=6
-    ),
-    'SmallCenter': ParagraphStyle(
-        name='SmallCenter',
-        fontName=base_font_name,
-        fontSize=8,
-        alignment=1,
-        textColor=colors.grey
-    ),
-    'Bold': ParagraphStyle(
-        name='Bold',
-        fontName=base_font_name,
-        fontSize=10,
-        leading=14,
-        textColor=colors.black,
-        spaceAfter=6,
-        alignment=1
-    )
-}
+# Статичные тексты билета
+TICKET_RULES_TEXT = """
+    • Билет действителен только на указанный сеанс
+    • Приходите за 15 минут до начала
+    • Сохраняйте билет до конца сеанса
+    """
+TICKET_REFUND_TEXT = """
+    <b>Политика возврата билетов:</b><br/>
+    • Возврат возможен не позднее чем за 30 минут до начала сеанса<br/>
+    • Возвращается полная стоимость билета<br/>
+    • Для возврата обратитесь в личном кабинете<br/>
+    • Возврат обрабатывается в течение 24 часов
+    """
+TICKET_CONTACTS_TEXT = "📞 +7 (950) 080-19-02"
+
 
 def generate_ticket_pdf(tickets):
     """Старая функция для обратной совместимости"""
     return generate_enhanced_ticket_pdf(tickets)
 
 
-def generate_enhanced_ticket_pdf(tickets):
-    """Классический минималистичный дизайн билета"""
+def generate_ticket_qr_png(tickets):
+    """QR-код группы билетов в формате PNG"""
+    first_ticket = tickets[0]
+    qr_data = {
+        "ticket_id": first_ticket.id,
+        "group_id": first_ticket.group_id,
+        "film": first_ticket.screening.movie.title,
+        "datetime": first_ticket.screening.start_time.isoformat(),
+        "hall": first_ticket.screening.hall.name,
+        "seats": ", ".join(f"{t.seat.row}-{t.seat.number}" for t in tickets),
+        "total_price": sum(ticket.screening.price for ticket in tickets),
+        "user": f"{first_ticket.user.name} {first_ticket.user.surname}",
+        "cinema": "Кинотеатр Премьера"
+    }
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=6,
+        border=1,
+    )
+    qr.add_data(str(qr_data))
+    qr.make(fit=True)
+
+    qr_img = qr.make_image(fill_color="black", back_color="white")
+    qr_buffer = BytesIO()
+    qr_img.save(qr_buffer, format="PNG")
+    return qr_buffer.getvalue()
+
+
+def generate_enhanced_ticket_pdf(tickets, qr_png=None):
+    """Классический минималистичный дизайн билета (qr_png - готовый QR-код группы)"""
     buffer = BytesIO()
     doc = SimpleDocTemplate(
         buffer,
@@ -99,46 +79,13 @@ def generate_enhanced_ticket_pdf(tickets):
     first_ticket = tickets[0]
     total_price = sum(ticket.screening.price for ticket in tickets)
 
-    # Минималистичные стили
+    # Стили общие для всех билетов (шрифты и стили создаются один раз на процесс)
     minimal_styles = {
-        'Header': ParagraphStyle(
-            name='Header',
-            fontName=bold_font_name,
-            fontSize=12,
-            alignment=1,
-            textColor=colors.black,
-            spaceAfter=6
-        ),
-        'Title': ParagraphStyle(
-            name='Title',
-            fontName=bold_font_name,
-            fontSize=10,
-            alignment=0,
-            textColor=colors.black,
-            spaceAfter=4
-        ),
-        'Info': ParagraphStyle(
-            name='Info',
-            fontName=base_font_name,
-            fontSize=9,
-            alignment=0,
-            textColor=colors.black,
-            spaceAfter=3
-        ),
-        'Small': ParagraphStyle(
-            name='Small',
-            fontName=base_font_name,
-            fontSize=7,
-            alignment=1,
-            textColor=colors.grey
-        ),
-        'Seat': ParagraphStyle(
-            name='Seat',
-            fontName=bold_font_name,
-            fontSize=9,
-            alignment=1,
-            textColor=colors.black
-        )
+        'Header': PdfResources.style('ticket_header'),
+        'Title': PdfResources.style('ticket_title'),
+        'Info': PdfResources.style('ticket_info'),
+        'Small': PdfResources.style('ticket_small'),
+        'Seat': PdfResources.style('ticket_seat'),
     }
 
     # === ЗАГОЛОВОК ===
@@ -146,9 +93,7 @@ def generate_enhanced_ticket_pdf(tickets):
     elements.append(Spacer(1, 0.2 * cm))
 
     # Горизонтальная линия
-    elements.append(Table([['']], colWidths=[doc.width], style=[
-        ('LINEABOVE', (0, 0), (-1, -1), 1, colors.black)
-    ]))
+    elements.append(Table([['']], colWidths=[doc.width], style=PdfResources.table_style('ticket_divider')))
     elements.append(Spacer(1, 0.2 * cm))
 
     # === ФИЛЬМ ===
@@ -182,13 +127,7 @@ def generate_enhanced_ticket_pdf(tickets):
         ])
 
     seats_table = Table(seats_data, colWidths=[2 * cm, 2 * cm, 2 * cm], repeatRows=1)
-    seats_table.setStyle(TableStyle([
-        ('FONTNAME', (0, 0), (-1, 0), bold_font_name),
-        ('FONTSIZE', (0, 0), (-1, 0), 9),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
+    seats_table.setStyle(PdfResources.table_style('ticket_seats'))
     elements.append(seats_table)
     elements.append(Spacer(1, 0.2 * cm))
 
@@ -198,37 +137,13 @@ def generate_enhanced_ticket_pdf(tickets):
     elements.append(Spacer(1, 0.3 * cm))
 
     # === QR-КОД ===
-    qr_data = {
-        "ticket_id": tickets[0].id,
-        "group_id": tickets[0].group_id,
-        "film": first_ticket.screening.movie.title,
-        "datetime": first_ticket.screening.start_time.isoformat(),
-        "hall": first_ticket.screening.hall.name,
-        "seats": ", ".join(f"{t.seat.row}-{t.seat.number}" for t in tickets),
-        "total_price": total_price,
-        "user": f"{first_ticket.user.name} {first_ticket.user.surname}",
-        "cinema": "Кинотеатр Премьера"
-    }
-
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=6,
-        border=1,
-    )
-    qr.add_data(str(qr_data))
-    qr.make(fit=True)
-
-    qr_img = qr.make_image(fill_color="black", back_color="white")
-    qr_buffer = BytesIO()
-    qr_img.save(qr_buffer, format="PNG")
-    qr_buffer.seek(0)
+    if qr_png is None:
+        qr_png = generate_ticket_qr_png(tickets)
+    qr_buffer = BytesIO(qr_png)
 
     # QR-код по центру
     qr_table = Table([[Image(qr_buffer, width=3.5 * cm, height=3.5 * cm)]], colWidths=[doc.width])
-    qr_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-    ]))
+    qr_table.setStyle(PdfResources.table_style('centered'))
     elements.append(qr_table)
     elements.append(Spacer(1, 0.1 * cm))
 
@@ -238,27 +153,15 @@ def generate_enhanced_ticket_pdf(tickets):
     elements.append(Spacer(1, 0.2 * cm))
 
     # === ПРАВИЛА ===
-    rules_text = """
-    • Билет действителен только на указанный сеанс
-    • Приходите за 15 минут до начала
-    • Сохраняйте билет до конца сеанса
-    """
-    elements.append(Paragraph(rules_text, minimal_styles['Small']))
+    elements.append(Paragraph(TICKET_RULES_TEXT, minimal_styles['Small']))
 
     # === ИНФОРМАЦИЯ О ВОЗВРАТЕ ===
     elements.append(Spacer(1, 0.2 * cm))
-    refund_text = """
-    <b>Политика возврата билетов:</b><br/>
-    • Возврат возможен не позднее чем за 30 минут до начала сеанса<br/>
-    • Возвращается полная стоимость билета<br/>
-    • Для возврата обратитесь в личном кабинете<br/>
-    • Возврат обрабатывается в течение 24 часов
-    """
-    elements.append(Paragraph(refund_text, minimal_styles['Small']))
+    elements.append(Paragraph(TICKET_REFUND_TEXT, minimal_styles['Small']))
     elements.append(Spacer(1, 0.2 * cm))
 
     # Контакты
-    elements.append(Paragraph("📞 +7 (950) 080-19-02", minimal_styles['Small']))
+    elements.append(Paragraph(TICKET_CONTACTS_TEXT, minimal_styles['Small']))
 
     doc.build(elements)
     buffer.seek(0)
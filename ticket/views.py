@@ -11,12 +11,13 @@ from django.contrib.auth import login, authenticate, logout, update_session_auth
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.hashers import make_password
 from django.db.models import Q
-from django.http import HttpResponse
+from django.http import HttpResponse, Http404
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils import timezone
 from django.views.decorators.http import require_POST
 
+from .cache_utils import HomePageCache
 from .email_utils import send_verification_email
 from .forms import MovieForm, HallForm, ScreeningForm, UserUpdateForm
 from .forms import PasswordResetForm, EmailChangeForm
@@ -24,7 +25,8 @@ from .forms import RegistrationForm, LoginForm
 from .models import PasswordResetRequest, AgeRating
 from .models import PendingRegistration
 from .models import Screening, Ticket, Seat, Movie, Hall, User
-from .utils import generate_enhanced_ticket_pdf, generate_ticket_pdf
+from .notification_utils import TelegramNotificationQueue
+from .ticket_artifact_utils import TicketArtifactStore
 from django.utils import timezone
 from datetime import datetime
 from django.http import JsonResponse
@@ -32,6 +34,8 @@ import json
 from decimal import Decimal
 import random
 from .report_utils import ReportGenerator
+from .seat_hold_utils import SeatHoldService
+from .seat_utils import SeatMapService, SeatTakenError
 
 logger = logging.getLogger(__name__)
 from .logging_utils import OperationLogger
@@ -317,6 +321,22 @@ def user_login(request):
 
 
 def home(request):
+    # Анонимным посетителям отдаем готовую страницу из кэша без обращения к БД
+    cache_key = HomePageCache.get_key(request)
+    if cache_key:
+        content = HomePageCache.get(cache_key)
+        if content is not None:
+            return HttpResponse(content)
+
+    response = render_home(request)
+
+    if cache_key and response.status_code == 200:
+        HomePageCache.set(cache_key, response.content)
+    return response
+
+
+def render_home(request):
+    """Построение главной страницы с фильтрами"""
     local_now = timezone.localtime(timezone.now())
     today = local_now.date()
 
@@ -344,7 +364,7 @@ def home(request):
         })
 
     # Получаем все фильмы
-    movies = Movie.objects.prefetch_related('screening_set__hall').select_related('genre', 'age_rating').all()
+    movies = Movie.objects.select_related('genre', 'age_rating').all()
 
     # Применяем текстовые фильтры
     if search_query:
@@ -359,35 +379,34 @@ def home(request):
     if age_rating_filter:  # Новый фильтр
         movies = movies.filter(age_rating__name=age_rating_filter)
 
-    # Собираем данные для каждого фильма
-    movies_data = []
-
-    for movie in movies:
-        # Базовый фильтр для сеансов
-        screenings_filter = Q(
-            start_time__date=selected_date,
-            start_time__gt=local_now  # Только будущие сеансы
-        )
+    # Все сеансы на выбранную дату одним запросом (фильтры фильмов - подзапросом)
+    screenings = Screening.objects.filter(
+        movie__in=movies,
+        start_time__date=selected_date,
+        start_time__gt=local_now  # Только будущие сеансы
+    ).select_related('hall').order_by('start_time')
 
-        # Применяем фильтр по залу если выбран
-        if hall_filter:
-            screenings_filter &= Q(hall_id=hall_filter)
+    # Применяем фильтр по залу если выбран
+    if hall_filter:
+        screenings = screenings.filter(hall_id=hall_filter)
 
-        # Получаем сеансы на выбранную дату с учетом всех фильтров
-        screenings_on_date = movie.screening_set.filter(screenings_filter).order_by('start_time')
+    # Группируем сеансы по фильмам (уже отсортированы по времени)
+    screenings_by_movie = {}
+    for screening in screenings:
+        screenings_by_movie.setdefault(screening.movie_id, []).append(screening)
 
-        # Получаем ближайшие сеансы (максимум 3)
-        upcoming_screenings = screenings_on_date[:3]
+    # Собираем данные для каждого фильма
+    movies_data = []
 
-        # Определяем самый ранний сеанс для сортировки
-        earliest_screening = screenings_on_date.first()
+    for movie in movies:
+        movie_screenings = screenings_by_movie.get(movie.id, [])
 
         movies_data.append({
             'movie': movie,
-            'upcoming_screenings': upcoming_screenings,
-            'screening_count': screenings_on_date.count(),
-            'earliest_screening': earliest_screening,
-            'has_screenings_today': screenings_on_date.exists()
+            'upcoming_screenings': movie_screenings[:3],  # Ближайшие сеансы (максимум 3)
+            'screening_count': len(movie_screenings),
+            'earliest_screening': movie_screenings[0] if movie_screenings else None,
+            'has_screenings_today': bool(movie_screenings)
         })
 
     # Сортируем фильмы:
@@ -473,21 +492,14 @@ def user_logout(request):
 
 
 def screening_detail(request, screening_id):
-    screening = get_object_or_404(Screening, pk=screening_id)
-    seats = Seat.objects.filter(hall=screening.hall).order_by('row', 'number')
-    booked_tickets = Ticket.objects.filter(screening=screening)
-    booked_seat_ids = [ticket.seat.id for ticket in booked_tickets]
-
-    rows = {}
-    for seat in seats:
-        if seat.row not in rows:
-            rows[seat.row] = []
-        rows[seat.row].append(seat)
+    screening = get_object_or_404(Screening.objects.select_related('movie', 'hall'), pk=screening_id)
+    seat_map = SeatMapService.get_seat_map(screening, request.user)
 
     return render(request, 'ticket/screening_detail.html', {
         'screening': screening,
-        'rows': rows,
-        'booked_seat_ids': booked_seat_ids,
+        'rows': seat_map['rows'],
+        'booked_seat_ids': seat_map['booked_seat_ids'],
+        'held_seat_ids': seat_map['held_seat_ids'],
         'is_guest': not request.user.is_authenticated  # Добавляем флаг гостя
     })
 
@@ -512,29 +524,34 @@ def book_tickets(request):
         messages.error(request, "Выберите хотя бы одно место.")
         return redirect('screening_detail', screening_id=screening_id)
 
-    screening = get_object_or_404(Screening, pk=screening_id)
+    screening = get_object_or_404(Screening.objects.select_related('movie', 'hall'), pk=screening_id)
 
-    # Проверяем доступность мест
-    for seat_id in seat_ids:
-        seat = get_object_or_404(Seat, pk=seat_id)
-        if Ticket.objects.filter(screening=screening, seat=seat).exists():
-            messages.error(request, f"Место {seat.row}-{seat.number} уже занято.")
-            return redirect('screening_detail', screening_id=screening_id)
+    try:
+        seat_ids = list(dict.fromkeys(int(seat_id) for seat_id in seat_ids))
+    except (TypeError, ValueError):
+        raise Http404("Место не найдено")
+
+    # Места зала из кэшированной схемы - чужие и несуществующие места отклоняем
+    seats = SeatMapService.get_hall_seats(screening.hall, seat_ids)
+    if len(seats) != len(seat_ids):
+        raise Http404("Место не найдено")
+
+    # Места, которые сейчас оформляют другие покупатели
+    held_seat_ids = SeatHoldService.get_conflicts(screening, seat_ids, request.user)
+    if held_seat_ids:
+        seat = seats[min(held_seat_ids, key=seat_ids.index)]
+        messages.error(request, f"Место {seat.row}-{seat.number} временно забронировано другим покупателем.")
+        return redirect('screening_detail', screening_id=screening_id)
 
-    # Создаем группу билетов с одним group_id
+    # Создаем группу билетов с одним group_id одной транзакцией
     group_id = str(uuid.uuid4())
+    try:
+        tickets = SeatMapService.book_seats(request.user, screening, seats, group_id)
+    except SeatTakenError as e:
+        messages.error(request, str(e))
+        return redirect('screening_detail', screening_id=screening_id)
 
-    # Создаем билеты с одним group_id
-    tickets = []
-    for seat_id in seat_ids:
-        seat = get_object_or_404(Seat, pk=seat_id)
-        ticket = Ticket.objects.create(
-            user=request.user,
-            screening=screening,
-            seat=seat,
-            group_id=group_id
-        )
-        tickets.append(ticket)
+    SeatHoldService.release_seats(screening, seat_ids, request.user)
 
     # ЛОГИРОВАНИЕ ПОКУПКИ БИЛЕТОВ
     OperationLogger.log_operation(
@@ -548,25 +565,16 @@ def book_tickets(request):
             'screening_id': screening_id,
             'movie_title': screening.movie.title,
             'seat_count': len(tickets),
-            'total_price': sum(ticket.screening.price for ticket in tickets),
+            'total_price': float(screening.price * len(tickets)),
             'group_id': group_id
         }
     )
 
-    # Отправляем уведомление в Telegram
-    if tickets:
-        try:
-            from ticket.telegram_bot.bot import get_bot
-            import asyncio
-
-            async def send_notification():
-                bot = get_bot()
-                if bot and request.user.is_telegram_verified:
-                    await bot.send_ticket_notification(request.user, tickets)
-
-            asyncio.run(send_notification())
-        except Exception as e:
-            logger.error(f"Failed to send Telegram notification: {e}")
+    # Уведомление в Telegram отправит процесс бота
+    try:
+        TelegramNotificationQueue.enqueue_purchase(request.user, tickets)
+    except Exception as e:
+        logger.error(f"Failed to queue Telegram notification: {e}")
 
     return redirect(f'{reverse("screening_detail", args=[screening_id])}?purchase_success=true&group_id={group_id}')
 
@@ -580,17 +588,13 @@ def download_ticket(request):
         return redirect('home')
 
     # Получаем все билеты из группы
-    tickets = Ticket.objects.filter(group_id=group_id, user=request.user)
+    tickets = TicketArtifactStore.get_group_tickets(group_id, user=request.user)
 
-    if not tickets.exists():
+    if not tickets:
         return redirect('home')
 
-    pdf_buffer = generate_ticket_pdf(tickets)
-
-    response = HttpResponse(pdf_buffer.getvalue(), content_type='application/pdf')
     filename = f"билет_{tickets[0].screening.movie.title}_{group_id[:8]}.pdf"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    return response
+    return TicketArtifactStore.pdf_response(request, tickets, filename)
 
 
 @login_required
@@ -606,7 +610,7 @@ def download_ticket_single(request, ticket_id):
 
     # Если билет входит в группу, скачиваем всю группу
     if ticket.group_id:
-        tickets = Ticket.objects.filter(group_id=ticket.group_id, user=request.user)
+        tickets = TicketArtifactStore.get_group_tickets(ticket.group_id, user=request.user)
     else:
         tickets = [ticket]
 
@@ -629,17 +633,13 @@ def download_ticket_single(request, ticket_id):
     )
 
     try:
-        # ИСПОЛЬЗУЕМ УЛУЧШЕННУЮ ГЕНЕРАЦИЮ
-        pdf_buffer = generate_enhanced_ticket_pdf(tickets)
-        response = HttpResponse(pdf_buffer.getvalue(), content_type='application/pdf')
-
         if len(tickets) > 1:
             filename = f"билет_{ticket.screening.movie.title}_{ticket.group_id[:8]}.pdf"
         else:
             filename = f"билет_{ticket.screening.movie.title}_{ticket.id}.pdf"
 
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
+        # Готовый PDF из хранилища билетов (повторное скачивание - 304 по ETag)
+        return TicketArtifactStore.pdf_response(request, tickets, filename)
     except Exception as e:
         logger.error(f"Ошибка генерации PDF: {str(e)}")
         messages.error(request, "Ошибка при генерации билета. Пожалуйста, попробуйте позже.")
@@ -648,9 +648,9 @@ def download_ticket_single(request, ticket_id):
 
 @login_required
 def download_ticket_group(request, group_id):
-    tickets = Ticket.objects.filter(group_id=group_id, user=request.user)
+    tickets = TicketArtifactStore.get_group_tickets(group_id, user=request.user)
 
-    if not tickets.exists():
+    if not tickets:
         messages.error(request, "Билеты не найдены.")
         return redirect('profile')
 
@@ -682,11 +682,8 @@ def download_ticket_group(request, group_id):
     )
 
     try:
-        pdf_buffer = generate_enhanced_ticket_pdf(tickets)
-        response = HttpResponse(pdf_buffer.getvalue(), content_type='application/pdf')
         filename = f"билет_{tickets[0].screening.movie.title}_{group_id[:8]}.pdf"
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
+        return TicketArtifactStore.pdf_response(request, tickets, filename)
     except Exception as e:
         logger.error(f"Ошибка генерации PDF: {str(e)}")
         messages.error(request, "Ошибка при генерации билета. Пожалуйста, попробуйте позже.")
@@ -1282,26 +1279,58 @@ def movie_detail(request, movie_id):
 
 def screening_partial(request, screening_id):
     """Возвращает HTML для частичной информации о сеансе"""
-    screening = get_object_or_404(Screening, pk=screening_id)
-
-    # Получаем занятые места для этого сеанса
-    booked_tickets = Ticket.objects.filter(screening=screening)
-    booked_seat_ids = [ticket.seat.id for ticket in booked_tickets]
-
-    # Получаем места зала
-    seats = Seat.objects.filter(hall=screening.hall).order_by('row', 'number')
+    screening = get_object_or_404(Screening.objects.select_related('movie', 'hall'), pk=screening_id)
 
-    # Группируем по рядам
-    rows = {}
-    for seat in seats:
-        if seat.row not in rows:
-            rows[seat.row] = []
-        rows[seat.row].append(seat)
+    # Схема зала и занятые места - общий сервис с бронированием
+    seat_map = SeatMapService.get_seat_map(screening, request.user)
 
     return render(request, 'ticket/screening_partial.html', {
         'screening': screening,
-        'rows': rows,
-        'booked_seat_ids': booked_seat_ids
+        'rows': seat_map['rows'],
+        'booked_seat_ids': seat_map['booked_seat_ids'],
+        'held_seat_ids': seat_map['held_seat_ids']
+    })
+
+
+@login_required
+@require_POST
+def hold_seats(request, screening_id):
+    """Временная бронь места на время оформления покупки (AJAX)"""
+    screening = get_object_or_404(Screening.objects.select_related('hall'), pk=screening_id)
+
+    try:
+        seat_ids = list(dict.fromkeys(int(seat_id) for seat_id in json.loads(request.POST.get('seat_ids', '[]'))))
+    except (TypeError, ValueError):
+        return JsonResponse({'success': False, 'error': 'Некорректный список мест'}, status=400)
+
+    seats = SeatMapService.get_hall_seats(screening.hall, seat_ids)
+    if len(seats) != len(seat_ids):
+        return JsonResponse({'success': False, 'error': 'Место не найдено'}, status=404)
+
+    if request.POST.get('action') == 'release':
+        SeatHoldService.release_seats(screening, seat_ids, request.user)
+        return JsonResponse({'success': True, 'released': seat_ids})
+
+    taken_seat_ids = SeatMapService.get_taken_seat_ids(screening, seat_ids)
+    if taken_seat_ids:
+        return JsonResponse({
+            'success': False,
+            'error': 'Место уже занято.',
+            'unavailable': sorted(taken_seat_ids)
+        }, status=409)
+
+    success, conflicts, error = SeatHoldService.hold_seats(screening, seat_ids, request.user)
+    if not success:
+        return JsonResponse({
+            'success': False,
+            'error': error,
+            'unavailable': sorted(conflicts)
+        }, status=409)
+
+    return JsonResponse({
+        'success': True,
+        'held': seat_ids,
+        'expires_in': SeatHoldService.get_ttl()
     })
 
 